@@ -11,9 +11,8 @@
 # --------------------------------------------------------------------------------
 
 import streamlit as st
-from streamlit_option_menu import option_menu
 import database as db
-import views as v  # Usa o alias 'v' para as views
+import views as v  # Usa o alias 'v' para as views (cada página é importada no primeiro uso)
 
 # --- Configuração da Página ---
 st.set_page_config(
@@ -24,9 +23,58 @@ st.set_page_config(
 
 # --- Inicialização da Conexão com o Banco de Dados ---
 conn = db.init_connection()
+# Aplica as invalidações de cache publicadas pelos outros processos (no máximo uma consulta a cada 2 s)
+db.poll_cache_events()
 
 
 # --- Funções de Autenticação (ATUALIZADAS) ---
+
+# Parâmetro da URL com o token da sessão persistente (sobrevive a recarregar a página)
+SESSION_PARAM = "sessao"
+
+
+def sign_in(user_data, token):
+    """Marca a sessão do Streamlit como logada e guarda o token na URL."""
+    st.session_state["logged_in"] = True
+    st.session_state["user_info"] = user_data
+    # Guarda o estado da flag na sessão
+    st.session_state["force_password_change"] = user_data.get('force_password_change', False)
+    if token:
+        st.session_state["session_token"] = token
+        st.query_params[SESSION_PARAM] = token
+    # Garante que a view de reset seja desativada após o login
+    if 'show_reset_view' in st.session_state:
+        del st.session_state['show_reset_view']
+
+
+def restore_session():
+    """
+    Sem login nesta conexão, retoma a sessão do token da URL (recarga, nova aba
+    ou reconexão) sem bcrypt. Com login, confere se a sessão não foi revogada.
+    """
+    if st.session_state.get("logged_in", False):
+        token = st.session_state.get("session_token")
+        if token is None:
+            return
+        if db.validate_session(conn, token) is None:
+            # Sessão vencida ou revogada (ex.: usuário desativado)
+            for key in list(st.session_state.keys()):
+                del st.session_state[key]
+            st.query_params.pop(SESSION_PARAM, None)
+            st.rerun()
+        elif st.query_params.get(SESSION_PARAM) != token:
+            st.query_params[SESSION_PARAM] = token
+        return
+
+    token = st.query_params.get(SESSION_PARAM)
+    if token:
+        user_data = db.validate_session(conn, token)
+        if user_data:
+            sign_in(user_data, token)
+        else:
+            st.query_params.pop(SESSION_PARAM, None)
+
+
 def login_form():
     """Exibe o formulário de login."""
 
@@ -49,6 +97,12 @@ def login_form():
         """, unsafe_allow_html=True)
 
     st.header(login_title)
+
+    # Aviso deixado por outra tela (ex.: reset de senha) antes de voltar ao login
+    login_notice = st.session_state.pop('login_notice', None)
+    if login_notice:
+        st.success(login_notice)
+
     with st.form("login_form"):
         email = st.text_input("Email", placeholder="Digite seu email")
         password = st.text_input("Senha", type="password", placeholder="Digite sua senha")
@@ -72,13 +126,7 @@ def login_form():
             user_data = db.check_login(conn, email, password)
 
             if user_data:
-                st.session_state["logged_in"] = True
-                st.session_state["user_info"] = user_data
-                # Guarda o estado da flag na sessão
-                st.session_state["force_password_change"] = user_data.get('force_password_change', False)
-                # Garante que a view de reset seja desativada após o login
-                if 'show_reset_view' in st.session_state:
-                    del st.session_state['show_reset_view']
+                sign_in(user_data, db.create_session(conn, user_data['id']))
                 st.rerun()
             else:
                 st.error("Email ou senha incorretos. Verifique também se seu usuário está 'ativo'.")
@@ -94,9 +142,13 @@ def logout():
         if user_info:
             details = f"Usuário '{user_info['email']}' (ID: {user_info['id']}) efetuou logout."
             # Chama log_action sem IP/User-Agent
-            db.log_action(conn, user_info['id'], 'USER_LOGOUT', details)
+            db.log_action(conn, user_info['id'], 'USER_LOGOUT', details, db.ENTITY_USER, user_info['id'])
+        token = st.session_state.get("session_token")
+        if token:
+            db.revoke_session(conn, token)
     except Exception as e:
         print(f"Erro durante o logout: {e}")
+    st.query_params.pop(SESSION_PARAM, None)
 
     # Limpa toda a sessão, incluindo 'show_reset_view' se existir
     for key in list(st.session_state.keys()):
@@ -106,106 +158,125 @@ def logout():
 
 # --- Estrutura Principal do App ---
 
-# Inicializa o estado de controle da view de reset
-if 'show_reset_view' not in st.session_state:
-    st.session_state['show_reset_view'] = False
-
-# Verifica se está logado OU se deve mostrar a view de reset
-if not st.session_state.get("logged_in", False):
-    if st.session_state['show_reset_view']:
-        v.show_reset_page(conn)  # Chama a página de reset
+# Cada rerun é medido (tempo total, funções do banco, consultas e linhas) para a página de Desempenho
+with db.track_rerun():
+    # Grava em lote as métricas dos reruns anteriores, se a persistência estiver ligada
+    if db.get_setting(conn, 'perf_persist_enabled') == '1':
+        db.flush_perf_records(conn)
     else:
-        login_form()  # Mostra o formulário de login
-else:
-    # --- Lógica para utilizadores logados ---
-    user_info = st.session_state["user_info"]
-    permission_level = user_info.get("permission_level")
-    # Pega o estado da flag da sessão
-    must_change_password = st.session_state.get("force_password_change", False)
-
-    # --- LÓGICA DE REDIRECIONAMENTO ---
-    if must_change_password:
-        selected_display_name = "Meu Perfil"  # Força a seleção do perfil
-        st.warning("É necessário definir uma nova senha antes de continuar.", icon="⚠️")
+        db.discard_pending_perf_records()
+    # Consultas lentas do rerun anterior: EXPLAIN e gravação em 'slow_queries'
+    db.flush_slow_queries(conn)
+
+    # Inicializa o estado de controle da view de reset
+    if 'show_reset_view' not in st.session_state:
+        st.session_state['show_reset_view'] = False
+
+    # Retoma a sessão persistente da URL ou encerra a que foi revogada
+    restore_session()
+
+    # Verifica se está logado OU se deve mostrar a view de reset
+    if not st.session_state.get("logged_in", False):
+        if st.session_state['show_reset_view']:
+            v.show_reset_page(conn)  # Chama a página de reset
+        else:
+            login_form()  # Mostra o formulário de login
     else:
-        selected_display_name = None  # Deixa o menu decidir
-
-    with st.sidebar:
-        st.subheader(f"Olá, {user_info['name']}!")
-
-        PAGE_MAP = {
-            "page_home": ("Dashboard", "house-fill"),
-            "page_perfil": ("Meu Perfil", "person-fill"),
-            "page_setores": ("Gerenciar Setores", "buildings-fill"),
-            "page_gerenciamento": ("Gerenciar Usuários", "people-fill"),
-            "page_permissoes": ("Gerenciar Permissões", "shield-lock-fill"),
-            "page_logs": ("Trilha de Auditoria", "clock-history"),
-            "page_personalizacao": ("Personalizar", "palette-fill")
-        }
-        ordered_pages = ["page_home", "page_perfil", "page_setores",
-                         "page_gerenciamento", "page_permissoes", "page_logs",
-                         "page_personalizacao"]
-
-        menu_options = []
-        icons = []
-        default_index = 0
-
-        for i, page_name in enumerate(ordered_pages):
-            # Apenas mostra o menu se a senha NÃO precisar ser trocada, OU se for a página de perfil
-            if (not must_change_password or page_name == "page_perfil") and db.check_page_access(conn, page_name,
-                                                                                                 permission_level):
-                display_name, icon = PAGE_MAP[page_name]
-                menu_options.append(display_name)
-                icons.append(icon)
-                # Define o índice padrão se for a página de perfil E a senha precisar ser trocada
-                if must_change_password and display_name == "Meu Perfil":
-                    default_index = len(menu_options) - 1  # Será sempre 0 neste caso
-
-        if menu_options:
-            # Se a seleção foi forçada (must_change_password), usa o valor fixo
-            # Caso contrário, permite que o option_menu determine a seleção
-            if selected_display_name is None:
-                selected_display_name = option_menu(
-                    menu_title="Menu Principal", options=menu_options,
-                    icons=icons, menu_icon="cast", default_index=default_index,
-                )
+        # --- Lógica para utilizadores logados ---
+        # O menu lateral só é importado após o login: a tela de login não precisa dele
+        from streamlit_option_menu import option_menu
+
+        user_info = st.session_state["user_info"]
+        permission_level = user_info.get("permission_level")
+        # Pega o estado da flag da sessão
+        must_change_password = st.session_state.get("force_password_change", False)
+
+        # --- LÓGICA DE REDIRECIONAMENTO ---
+        if must_change_password:
+            selected_display_name = "Meu Perfil"  # Força a seleção do perfil
+            st.warning("É necessário definir uma nova senha antes de continuar.", icon="⚠️")
         else:
-            # Isso só deve acontecer se o utilizador não tiver permissão nem para o perfil
-            selected_display_name = None
-            st.warning("Você não tem permissão para acessar nenhuma página.")
-
-        # Oculta o botão de logout se a senha precisar ser trocada
-        if not must_change_password:
-            if st.button("Sair", use_container_width=True):
-                logout()
-
-    # --- Roteamento ---
-    selected_page_name = None
-    for tech_name, (display_name, icon) in PAGE_MAP.items():
-        if display_name == selected_display_name:
-            selected_page_name = tech_name
-            break
-
-    # Chama a função da página correta
-    if selected_page_name == "page_perfil":
-        v.show_perfil_page(conn)
-    elif must_change_password:
-        # Se a senha precisa ser trocada e a página selecionada NÃO É "Meu Perfil",
-        # exibe o aviso em vez de renderizar a página.
-        # A página de perfil já foi tratada acima.
-        st.warning("Acesso restrito. Por favor, altere sua senha na página 'Meu Perfil'.")
-    elif selected_page_name == "page_home":
-        v.show_home_page(conn)
-    elif selected_page_name == "page_setores":
-        v.show_setores_page(conn)
-    elif selected_page_name == "page_gerenciamento":
-        v.show_gerenciamento_page(conn)
-    elif selected_page_name == "page_permissoes":
-        v.show_permissoes_page(conn)
-    elif selected_page_name == "page_logs":
-        v.show_logs_page(conn)
-    elif selected_page_name == "page_personalizacao":
-        v.show_personalizacao_page(conn)
-    elif selected_display_name:
-        st.error("Página não encontrada.")
+            selected_display_name = None  # Deixa o menu decidir
+
+        with st.sidebar:
+            st.subheader(f"Olá, {user_info['name']}!")
+
+            PAGE_MAP = {
+                "page_home": ("Dashboard", "house-fill"),
+                "page_perfil": ("Meu Perfil", "person-fill"),
+                "page_setores": ("Gerenciar Setores", "buildings-fill"),
+                "page_gerenciamento": ("Gerenciar Usuários", "people-fill"),
+                "page_permissoes": ("Gerenciar Permissões", "shield-lock-fill"),
+                "page_logs": ("Trilha de Auditoria", "clock-history"),
+                "page_personalizacao": ("Personalizar", "palette-fill"),
+                "page_desempenho": ("Desempenho", "speedometer2")
+            }
+            ordered_pages = ["page_home", "page_perfil", "page_setores",
+                             "page_gerenciamento", "page_permissoes", "page_logs",
+                             "page_personalizacao", "page_desempenho"]
+
+            menu_options = []
+            icons = []
+            default_index = 0
+
+            for i, page_name in enumerate(ordered_pages):
+                # Apenas mostra o menu se a senha NÃO precisar ser trocada, OU se for a página de perfil
+                if (not must_change_password or page_name == "page_perfil") and db.check_page_access(conn, page_name,
+                                                                                                     permission_level):
+                    display_name, icon = PAGE_MAP[page_name]
+                    menu_options.append(display_name)
+                    icons.append(icon)
+                    # Define o índice padrão se for a página de perfil E a senha precisar ser trocada
+                    if must_change_password and display_name == "Meu Perfil":
+                        default_index = len(menu_options) - 1  # Será sempre 0 neste caso
+
+            if menu_options:
+                # Se a seleção foi forçada (must_change_password), usa o valor fixo
+                # Caso contrário, permite que o option_menu determine a seleção
+                if selected_display_name is None:
+                    selected_display_name = option_menu(
+                        menu_title="Menu Principal", options=menu_options,
+                        icons=icons, menu_icon="cast", default_index=default_index,
+                    )
+            else:
+                # Isso só deve acontecer se o utilizador não tiver permissão nem para o perfil
+                selected_display_name = None
+                st.warning("Você não tem permissão para acessar nenhuma página.")
+
+            # Oculta o botão de logout se a senha precisar ser trocada
+            if not must_change_password:
+                if st.button("Sair", use_container_width=True):
+                    logout()
+
+        # --- Roteamento ---
+        selected_page_name = None
+        for tech_name, (display_name, icon) in PAGE_MAP.items():
+            if display_name == selected_display_name:
+                selected_page_name = tech_name
+                break
+
+        # Chama a função da página correta
+        if selected_page_name == "page_perfil":
+            v.show_perfil_page(conn)
+        elif must_change_password:
+            # Se a senha precisa ser trocada e a página selecionada NÃO É "Meu Perfil",
+            # exibe o aviso em vez de renderizar a página.
+            # A página de perfil já foi tratada acima.
+            st.warning("Acesso restrito. Por favor, altere sua senha na página 'Meu Perfil'.")
+        elif selected_page_name == "page_home":
+            v.show_home_page(conn)
+        elif selected_page_name == "page_setores":
+            v.show_setores_page(conn)
+        elif selected_page_name == "page_gerenciamento":
+            v.show_gerenciamento_page(conn)
+        elif selected_page_name == "page_permissoes":
+            v.show_permissoes_page(conn)
+        elif selected_page_name == "page_logs":
+            v.show_logs_page(conn)
+        elif selected_page_name == "page_personalizacao":
+            v.show_personalizacao_page(conn)
+        elif selected_page_name == "page_desempenho":
+            v.show_desempenho_page(conn)
+        elif selected_display_name:
+            st.error("Página não encontrada.")
 
@@ -0,0 +1,80 @@
+# --------------------------------------------------------------------------------
+# cache_bus_lag.py (Benchmark: atraso de propagação do barramento de cache)
+#
+# Descrição:
+# Simula várias réplicas do Streamlit: cada processo "réplica" consulta a
+# tabela 'cache_events' no ritmo de um rerun e registra o atraso entre a
+# publicação de um evento (por outro processo) e a invalidação local. Usa o
+# banco de benchmark (ver benchmarks/common.py).
+#
+#   python benchmarks/cache_bus_lag.py [--replicas 3] [--events 50] [--poll-interval 2.0]
+# --------------------------------------------------------------------------------
+
+import argparse
+import json
+import multiprocessing
+import random
+import time
+
+import common
+from database import cache_bus
+
+TOPIC = 'benchmark'
+
+
+def _replica(events, poll_interval, ready, results):
+    cache_bus.POLL_INTERVAL = poll_interval
+    cache_bus.configure_cache_bus(common.connect)
+    received = []
+    cache_bus.subscribe(TOPIC, lambda: received.append(time.monotonic()))
+    cache_bus.poll_cache_events(force=True)  # registra o id inicial
+    ready.set()
+    deadline = time.monotonic() + events * 0.2 + poll_interval * 5 + 10
+    while len(received) < events and time.monotonic() < deadline:
+        cache_bus.poll_cache_events()
+        time.sleep(0.05)  # intervalo entre "reruns"
+    results.put(cache_bus.get_cache_bus_metrics())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--poll-interval", type=float, default=cache_bus.POLL_INTERVAL)
+    args = parser.parse_args()
+
+    common.connect()  # garante a estrutura antes de iniciar as réplicas
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    readies = [ctx.Event() for _ in range(args.replicas)]
+    replicas = [ctx.Process(target=_replica, args=(args.events, args.poll_interval, ready, results))
+                for ready in readies]
+    for process in replicas:
+        process.start()
+    for ready in readies:
+        ready.wait(60)
+
+    conn = common.connect()
+    cursor = conn.cursor()
+    for _ in range(args.events):
+        cache_bus.publish(cursor, TOPIC)
+        conn.commit()
+        time.sleep(random.uniform(0.05, 0.15))
+    cursor.close()
+
+    report = [results.get(timeout=120) for _ in replicas]
+    for process in replicas:
+        process.join()
+
+    print(json.dumps({
+        'replicas': args.replicas,
+        'eventos': args.events,
+        'intervalo_consulta_s': args.poll_interval,
+        'atraso_medio_ms': [r['atraso_medio_ms'] for r in report],
+        'atraso_max_ms': [r['atraso_max_ms'] for r in report],
+        'eventos_aplicados': [r['eventos_aplicados'] for r in report],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
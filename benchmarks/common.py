@@ -0,0 +1,102 @@
+# --------------------------------------------------------------------------------
+# common.py (Utilitários Compartilhados dos Benchmarks)
+#
+# Descrição:
+# Conexão com o MySQL/MariaDB de benchmark e criação da estrutura de tabelas.
+# A conexão é configurada por variáveis de ambiente, para não depender do
+# .streamlit/secrets.toml de produção:
+#
+#   BENCH_MYSQL_HOST (localhost), BENCH_MYSQL_PORT (3306), BENCH_MYSQL_USER (root),
+#   BENCH_MYSQL_PASSWORD (vazio), BENCH_MYSQL_DATABASE (projeto_benchmark)
+#
+# Com BENCH_BACKEND=sqlite, os benchmarks usam o banco embutido no arquivo
+# BENCH_SQLITE_PATH (benchmarks/results/benchmark.db), sem servidor.
+# --------------------------------------------------------------------------------
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+import database as db
+from database import sqlite_backend
+
+
+def bench_config():
+    return {
+        'host': os.environ.get("BENCH_MYSQL_HOST", "localhost"),
+        'port': int(os.environ.get("BENCH_MYSQL_PORT", "3306")),
+        'user': os.environ.get("BENCH_MYSQL_USER", "root"),
+        'password': os.environ.get("BENCH_MYSQL_PASSWORD", ""),
+        'database': os.environ.get("BENCH_MYSQL_DATABASE", "projeto_benchmark"),
+    }
+
+
+def bench_backend():
+    return os.environ.get("BENCH_BACKEND", "mysql")
+
+
+def sqlite_path():
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "benchmark.db")
+    return os.environ.get("BENCH_SQLITE_PATH", default)
+
+
+def _connect_sqlite(recreate):
+    path = sqlite_path()
+    if recreate:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return sqlite_backend.connect(path)
+
+
+def _connect_mysql(recreate):
+    config = bench_config()
+    database = config.pop('database')
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    if recreate:
+        cursor.execute(f"DROP DATABASE IF EXISTS {database}")
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+    conn.database = database
+    cursor.close()
+    return conn
+
+
+def connect(recreate=False):
+    """Conecta ao banco de benchmark, criando-o (e, se pedido, recriando-o do zero)."""
+    conn = _connect_sqlite(recreate) if bench_backend() == "sqlite" else _connect_mysql(recreate)
+    cursor = conn.cursor()
+    db._create_all_tables(cursor)
+    db._apply_migrations(cursor)
+    conn.commit()
+    cursor.close()
+    return conn
+
+
+def seed_users(conn, count, batch_size=5000):
+    """Insere 'count' utilizadores sintéticos (hash fixo, para não pagar o bcrypt)."""
+    fixed_hash = db.hash_password("Benchmark@123").decode('utf-8')
+    levels = ["padrão", "técnico", "admin"]
+    cursor = conn.cursor()
+    for start in range(0, count, batch_size):
+        rows = [
+            (f"Usuário {i:07d} Silva", f"(11) 9{i % 10000:04d}-{i % 10000:04d}", f"usuario{i}@benchmark.local",
+             fixed_hash, levels[i % 3], 'ativo' if i % 10 else 'inativo')
+            for i in range(start, min(start + batch_size, count))
+        ]
+        cursor.executemany(
+            "INSERT INTO users (name, phone, email, password, permission_level, status, force_password_change) "
+            "VALUES (%s, %s, %s, %s, %s, %s, FALSE)", rows
+        )
+        conn.commit()
+    cursor.close()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,91 @@
+# --------------------------------------------------------------------------------
+# fetch_frames.py (Benchmark: leitura de resultados em DataFrame)
+#
+# Descrição:
+# Compara, para 10.000, 100.000 e 1.000.000 de impressoras sintéticas, o tempo
+# e a memória de "SELECT * FROM printers" lido com pd.read_sql (conexão crua do
+# mysql.connector, conversão valor a valor no conector) e com read_frame
+# (cursor raw + conversão por coluna no Arrow), com colunas NumPy e Arrow.
+#
+#   python benchmarks/fetch_frames.py [--sizes 10000 100000 1000000] [--runs 3]
+# --------------------------------------------------------------------------------
+
+import argparse
+import json
+import time
+import warnings
+
+import common
+import pandas as pd
+from database.frames import read_frame, PRINTERS_SCHEMA
+
+QUERY = "SELECT * FROM printers"
+
+
+def seed_printers(conn, count, batch_size=5000):
+    """Insere 'count' impressoras sintéticas, com alguns valores nulos de toner e verificação."""
+    cursor = conn.cursor()
+    for start in range(0, count, batch_size):
+        rows = [
+            (f"Unidade {i % 12}", "HP", f"LaserJet M{400 + i % 30}", f"Torre {i % 3}", f"Setor {i % 40}",
+             f"PAT{i:08d}", f"IMP-{i:07d}", f"imp{i}.local", f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+             ('Online', 'Offline', 'Desconhecido')[i % 3], "Pronta",
+             None if i % 17 == 0 else i % 101, i % 97, i % 89, i % 83, 1000 + i,
+             None if i % 13 == 0 else f"2024-01-{1 + i % 28:02d} 10:{i % 60:02d}:00")
+            for i in range(start, min(start + batch_size, count))
+        ]
+        cursor.executemany(
+            "INSERT INTO printers (unidade, fabricante, modelo, localizacao, setor, patrimonio, nome, host, endereco_ip, "
+            "status, status_detalhado, toner_preto, toner_ciano, toner_magenta, toner_amarelo, contagem_paginas, "
+            "ultima_verificacao) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", rows
+        )
+        conn.commit()
+    cursor.close()
+
+
+def _read_sql(conn):
+    with warnings.catch_warnings():
+        # pandas avisa que só testa conexões SQLAlchemy; é o caminho usado antes
+        warnings.simplefilter("ignore", UserWarning)
+        return pd.read_sql(QUERY, conn)
+
+
+READERS = {
+    'pd.read_sql': _read_sql,
+    'read_frame': lambda conn: read_frame(conn, QUERY, schema=PRINTERS_SCHEMA),
+    'read_frame(arrow=True)': lambda conn: read_frame(conn, QUERY, schema=PRINTERS_SCHEMA, arrow=True),
+}
+
+
+def measure(conn, reader, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        df = reader(conn)
+        samples.append(time.perf_counter() - started)
+    return {
+        'p50_s': round(common.percentile(samples, 0.5), 3),
+        'min_s': round(min(samples), 3),
+        'memoria_mb': round(df.memory_usage(deep=True).sum() / 1024 ** 2, 1),
+        'linhas': len(df),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    report = {}
+    for size in args.sizes:
+        conn = common.connect(recreate=True)
+        seed_printers(conn, size)
+        report[size] = {name: measure(conn, reader, args.runs) for name, reader in READERS.items()}
+        conn.close()
+        print(f"{size:>8} impressoras: {report[size]}")
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
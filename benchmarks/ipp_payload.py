@@ -0,0 +1,108 @@
+# --------------------------------------------------------------------------------
+# ipp_payload.py (Benchmark: consulta IPP completa x enxuta)
+#
+# Descrição:
+# Compara, para cada impressora informada, os bytes transferidos e o tempo de
+# parsing do Get-Printer-Attributes completo (o que ipp.printer() pede) com a
+# consulta enxuta de ipp_utils. Em seguida, repete verificações de todas as
+# impressoras com uma sessão HTTP por consulta (antes) e com a sessão
+# compartilhada com keep-alive do poller (depois), mostrando os handshakes e
+# a latência de cada verificação. Aponte para a frota de teste local, ex.:
+#
+#   python benchmarks/ipp_payload.py ipp://localhost:8631/ipp/print ipp://localhost:8632/ipp/print
+# --------------------------------------------------------------------------------
+
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyipp import IPP
+from pyipp.const import DEFAULT_PRINTER_ATTRIBUTES
+from pyipp.enums import IppOperation
+from pyipp.parser import parse
+import ipp_utils
+
+REPEAT = 20
+POLL_ROUNDS = 5
+
+
+async def _measure(uri, attributes, parser):
+    message = {"operation-attributes-tag": {"requested-attributes": attributes}}
+    async with IPP(uri) as ipp:
+        response = await ipp.raw(IppOperation.GET_PRINTER_ATTRIBUTES, message)
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        parser(response)
+    return len(response), (time.perf_counter() - started) / REPEAT
+
+
+def _traced_session():
+    """Sessão descartável com os mesmos contadores de conexões do poller (comportamento anterior)."""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(ipp_utils._on_connection_created)
+    trace_config.on_connection_reuseconn.append(ipp_utils._on_connection_reused)
+    return aiohttp.ClientSession(trace_configs=[trace_config])
+
+
+async def _query_with_own_session(uri):
+    async with _traced_session() as session:
+        return await ipp_utils._get_raw_printer_data(uri, session)
+
+
+async def _query_with_shared_session(uri):
+    return await ipp_utils._get_raw_printer_data(uri, await ipp_utils._get_shared_session())
+
+
+async def _poll_rounds(uris, query):
+    """Executa POLL_ROUNDS verificações concorrentes da frota; retorna (handshakes, segundos) por verificação."""
+    rounds = []
+    for _ in range(POLL_ROUNDS):
+        created_before = ipp_utils.POLL_STATS['connections_created']
+        started = time.perf_counter()
+        await asyncio.gather(*(query(uri) for uri in uris))
+        rounds.append((ipp_utils.POLL_STATS['connections_created'] - created_before, time.perf_counter() - started))
+    return rounds
+
+
+async def compare_sessions(uris):
+    before = await _poll_rounds(uris, _query_with_own_session)
+    after = await _poll_rounds(uris, _query_with_shared_session)
+    await (await ipp_utils._get_shared_session()).close()
+
+    print(f"\n{'verificação':>11} {'handshakes antes':>17} {'handshakes depois':>18} {'latência antes':>15} {'latência depois':>16}")
+    for i, ((created_before, seconds_before), (created_after, seconds_after)) in enumerate(zip(before, after), 1):
+        print(f"{i:>11} {created_before:>17} {created_after:>18} {seconds_before * 1000:>13.1f}ms {seconds_after * 1000:>14.1f}ms")
+    total_before = sum(seconds for _, seconds in before)
+    total_after = sum(seconds for _, seconds in after)
+    print(f"\nHandshakes: {sum(c for c, _ in before)} -> {sum(c for c, _ in after)} | "
+          f"latência média por verificação: {total_before / POLL_ROUNDS * 1000:.1f}ms -> {total_after / POLL_ROUNDS * 1000:.1f}ms")
+
+
+async def main(uris):
+    totals = {'completa': [0, 0.0], 'enxuta': [0, 0.0]}
+    print(f"{'impressora':40} {'bytes completa':>15} {'bytes enxuta':>13} {'parse completa':>15} {'parse enxuta':>13}")
+    for uri in uris:
+        full_bytes, full_parse = await _measure(uri, DEFAULT_PRINTER_ATTRIBUTES, parse)
+        lean_bytes, lean_parse = await _measure(uri, ipp_utils.REQUESTED_ATTRIBUTES, ipp_utils._parse_attributes)
+        totals['completa'][0] += full_bytes
+        totals['completa'][1] += full_parse
+        totals['enxuta'][0] += lean_bytes
+        totals['enxuta'][1] += lean_parse
+        print(f"{uri:40} {full_bytes:>15} {lean_bytes:>13} {full_parse * 1e6:>13.1f}µs {lean_parse * 1e6:>11.1f}µs")
+
+    if uris:
+        full, lean = totals['completa'], totals['enxuta']
+        print(f"\nRedução de bytes: {100 * (1 - lean[0] / full[0]):.1f}% | "
+              f"redução do parsing: {100 * (1 - lean[1] / full[1]):.1f}%")
+        await compare_sessions(uris)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Uso: python benchmarks/ipp_payload.py <uri_ou_ip> [<uri_ou_ip> ...]")
+    asyncio.run(main(sys.argv[1:]))
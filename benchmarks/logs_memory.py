@@ -0,0 +1,75 @@
+# --------------------------------------------------------------------------------
+# logs_memory.py (Benchmark: memória do DataFrame da trilha de auditoria)
+#
+# Descrição:
+# Insere registros de log sintéticos (poucas ações e autores distintos, como
+# em produção) e compara os bytes por linha do DataFrame da página de
+# Auditoria lido como antes (pd.read_sql, texto repetido em cada linha) e
+# como agora (get_all_logs: categorias + datetime64), coluna a coluna.
+#
+#   python benchmarks/logs_memory.py [--rows 200000] [--users 50]
+# --------------------------------------------------------------------------------
+
+import argparse
+import json
+import warnings
+
+import common
+import pandas as pd
+import database as db
+from database.frames import frame_memory_report
+
+ACTIONS = ["LOGIN", "LOGOUT", "CRIAR_USUARIO", "EDITAR_USUARIO", "ALTERAR_STATUS_USUARIO", "RESET_SENHA",
+           "CRIAR_SETOR", "EDITAR_SETOR", "CRIAR_IMPRESSORA", "EDITAR_IMPRESSORA", "ALTERAR_PERMISSAO",
+           "ALTERAR_CONFIGURACAO", "IMPORTAR_USUARIOS", "DESCOBRIR_IMPRESSORAS"]
+
+QUERY = """
+    SELECT l.log_timestamp AS 'Data e Hora', l.action_type AS 'Tipo de Ação', l.details AS 'Detalhes',
+           u.name AS 'Nome do Usuário', u.email AS 'Email do Usuário'
+    FROM user_logs l LEFT JOIN users u ON l.performing_user_id = u.id
+    ORDER BY l.log_timestamp DESC
+"""
+
+
+def seed_logs(conn, count, user_count, batch_size=5000):
+    common.seed_users(conn, user_count)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM users")
+    user_ids = [row[0] for row in cursor.fetchall()]
+    for start in range(0, count, batch_size):
+        rows = [
+            (None if i % 25 == 0 else user_ids[i % len(user_ids)], ACTIONS[i % len(ACTIONS)],
+             f"Registro sintético {i} para medir a memória da auditoria.",
+             f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00")
+            for i in range(start, min(start + batch_size, count))
+        ]
+        cursor.executemany(
+            "INSERT INTO user_logs (performing_user_id, action_type, details, log_timestamp) VALUES (%s, %s, %s, %s)",
+            rows
+        )
+        conn.commit()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    conn = common.connect(recreate=True)
+    seed_logs(conn, args.rows, args.users)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        before_df = pd.read_sql(QUERY, conn)
+    after_df = db.get_all_logs(conn)
+    conn.close()
+
+    report = {'antes': frame_memory_report(before_df), 'depois': frame_memory_report(after_df)}
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Bytes por linha: {report['antes']['bytes_por_linha']} -> {report['depois']['bytes_por_linha']}")
+
+
+if __name__ == "__main__":
+    main()
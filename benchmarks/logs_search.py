@@ -0,0 +1,93 @@
+# --------------------------------------------------------------------------------
+# logs_search.py (Benchmark: busca textual nos detalhes da auditoria)
+#
+# Descrição:
+# Insere milhões de registros de log sintéticos (detalhes citando impressoras
+# e e-mails) e compara a latência da primeira página da busca da página de
+# Auditoria (search_logs: MATCH ... AGAINST no índice FULLTEXT + LIKE de
+# confirmação) com o LIKE '%termo%' puro, que varre a tabela inteira.
+#
+#   python benchmarks/logs_search.py [--rows 2000000] [--runs 5] [--skip-seed]
+# --------------------------------------------------------------------------------
+
+import argparse
+import json
+import time
+
+import common
+import database as db
+
+TERMS = ["IMP-0042-TORRE", "usuario777@benchmark.local", "patrimonio PAT00012345", "toner trocado setor 17"]
+
+LIKE_QUERY = """
+    SELECT l.log_timestamp, l.action_type, l.details, u.name, u.email
+    FROM user_logs l LEFT JOIN users u ON l.performing_user_id = u.id
+    WHERE l.details LIKE %s ORDER BY l.log_timestamp DESC, l.id DESC LIMIT 50
+"""
+LIKE_COUNT = "SELECT COUNT(*) FROM user_logs l WHERE l.details LIKE %s"
+
+
+def seed_logs(conn, count, batch_size=10000):
+    common.seed_users(conn, 1000)
+    cursor = conn.cursor()
+    for start in range(0, count, batch_size):
+        rows = [
+            (1 + i % 1000, ("PRINTER_UPDATED", "USER_DATA_UPDATED", "SECTOR_UPDATED")[i % 3],
+             (f"Impressora 'IMP-{i % 5000:04d}-TORRE' atualizada; patrimonio PAT{i:08d}; "
+              f"toner trocado setor {i % 60} por usuario{i % 1000}@benchmark.local"),
+             f"202{4 + i % 2}-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00")
+            for i in range(start, min(start + batch_size, count))
+        ]
+        cursor.executemany(
+            "INSERT INTO user_logs (performing_user_id, action_type, details, log_timestamp) VALUES (%s, %s, %s, %s)",
+            rows
+        )
+        conn.commit()
+    cursor.close()
+
+
+def _timed(func, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return round(common.percentile(samples, 0.5) * 1000, 1)
+
+
+def _like_page(conn, term):
+    cursor = conn.cursor()
+    pattern = f"%{term}%"
+    cursor.execute(LIKE_COUNT, (pattern,))
+    cursor.fetchall()
+    cursor.execute(LIKE_QUERY, (pattern,))
+    cursor.fetchall()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true", help="reutiliza os dados da execução anterior")
+    args = parser.parse_args()
+
+    conn = common.connect(recreate=not args.skip_seed)
+    if not args.skip_seed:
+        seed_logs(conn, args.rows)
+
+    report = {}
+    for term in TERMS:
+        _, total = db.search_logs(conn, term, limit=50)
+        report[term] = {
+            'resultados': total,
+            'fulltext_p50_ms': _timed(lambda: db.search_logs(conn, term, limit=50), args.runs),
+            'like_p50_ms': _timed(lambda: _like_page(conn, term), args.runs),
+        }
+        print(f"{term!r}: {report[term]}")
+    conn.close()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# --------------------------------------------------------------------------------
+# prepared_statements.py (Benchmark: instruções preparadas sob concorrência)
+#
+# Descrição:
+# Várias threads, cada uma com a sua conexão, repetem a consulta do login
+# (por e-mail) e a gravação do log de login: primeiro com cursores comuns
+# (texto SQL enviado e analisado a cada chamada) e depois pelas instruções
+# preparadas do registro (database/statements.py). Compara a vazão, a
+# latência p50/p95 e os contadores do servidor (Com_stmt_prepare,
+# Com_stmt_execute e Com_select/Com_insert pelo protocolo de texto).
+#
+#   python benchmarks/prepared_statements.py [--threads 8] [--calls 2000] [--users 5000]
+# --------------------------------------------------------------------------------
+
+import argparse
+import json
+import threading
+import time
+
+import common
+from database.logs import log_row
+from database.statements import STATEMENTS, run_statement, get_statement_metrics
+
+STATUS_KEYS = ("Com_stmt_prepare", "Com_stmt_execute", "Com_stmt_close", "Com_select", "Com_insert")
+
+
+def _server_status(conn):
+    cursor = conn.cursor()
+    cursor.execute("SHOW GLOBAL STATUS WHERE Variable_name IN (%s, %s, %s, %s, %s)", STATUS_KEYS)
+    status = {name: int(value) for name, value in cursor.fetchall()}
+    cursor.close()
+    return status
+
+
+def _text_call(conn, email):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(STATEMENTS['check_login'][0], (email,))
+    cursor.fetchall()
+    cursor.execute(STATEMENTS['log_action'][0], log_row(None, 'USER_LOGIN', f"Benchmark de login de {email}."))
+    cursor.close()
+
+
+def _prepared_call(conn, email):
+    run_statement(conn, 'check_login', (email,), fetch=True)
+    run_statement(conn, 'log_action', log_row(None, 'USER_LOGIN', f"Benchmark de login de {email}."))
+
+
+def _run(call, threads, calls, user_count):
+    samples = [[] for _ in range(threads)]
+
+    def worker(index):
+        conn = common.connect()
+        for i in range(calls):
+            email = f"usuario{(index * calls + i) % user_count}@benchmark.local"
+            started = time.perf_counter()
+            call(conn, email)
+            samples[index].append(time.perf_counter() - started)
+            if i % 100 == 99:
+                conn.commit()
+        conn.commit()
+        conn.close()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    all_samples = [s for thread_samples in samples for s in thread_samples]
+    return {
+        'chamadas_por_segundo': round(len(all_samples) / elapsed, 1),
+        'p50_ms': round(common.percentile(all_samples, 0.5) * 1000, 3),
+        'p95_ms': round(common.percentile(all_samples, 0.95) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=2000, help="chamadas (consulta + log) por thread")
+    parser.add_argument("--users", type=int, default=5000)
+    args = parser.parse_args()
+
+    conn = common.connect(recreate=True)
+    common.seed_users(conn, args.users)
+
+    report = {}
+    for label, call in (("texto", _text_call), ("preparada", _prepared_call)):
+        before = _server_status(conn)
+        report[label] = _run(call, args.threads, args.calls, args.users)
+        after = _server_status(conn)
+        report[label]['servidor'] = {key: after.get(key, 0) - before.get(key, 0) for key in STATUS_KEYS}
+        print(f"{label}: {report[label]}")
+    conn.close()
+
+    report['registro'] = get_statement_metrics()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
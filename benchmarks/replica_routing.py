@@ -0,0 +1,85 @@
+# --------------------------------------------------------------------------------
+# replica_routing.py (Verificação do roteamento leitura/escrita)
+#
+# Descrição:
+# Exercita o RoutedConnection contra duas instâncias locais de MySQL/MariaDB
+# (principal e réplica já configuradas com replicação). A principal é a do
+# benchmarks/common.py; a réplica é indicada por:
+#
+#   BENCH_MYSQL_REPLICA_HOST (localhost), BENCH_MYSQL_REPLICA_PORT (3307)
+#
+# Verifica que: leituras vão para a réplica; a sessão que acabou de escrever
+# lê da principal (leia-suas-escritas); outra sessão volta à réplica assim que
+# a escrita é replicada; um limite de atraso negativo força a principal.
+#
+#   python benchmarks/replica_routing.py [--reads 200]
+# --------------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import time
+import uuid
+
+import common
+import mysql.connector
+import database as db
+from database import routing
+
+
+def _replica_connect():
+    config = common.bench_config()
+    config['host'] = os.environ.get("BENCH_MYSQL_REPLICA_HOST", "localhost")
+    config['port'] = int(os.environ.get("BENCH_MYSQL_REPLICA_PORT", "3307"))
+    return mysql.connector.connect(**config)
+
+
+def _as_session(session_id):
+    routing._session_id = lambda: session_id
+
+
+def _timed_reads(conn, reads):
+    started = time.perf_counter()
+    for _ in range(reads):
+        db.get_all_sectors(conn)
+    return (time.perf_counter() - started) * 1000 / reads
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    primary = common.connect()
+    conn = db.RoutedConnection(primary, [("replica", _replica_connect)])
+    sector = {'location_tower': 'Torre A', 'location_floor': '1', 'sector_name': f"Setor {uuid.uuid4().hex[:8]}",
+              'cost_center': '', 'manager_name': '', 'manager_contact': ''}
+
+    _as_session("sessao-escrita")
+    ok, message = db.add_sector(conn, sector, None)
+    assert ok, message
+    writer_sees_it = sector['sector_name'] in set(db.get_all_sectors(conn)['sector_name'])
+    ryw = conn.metrics['leia_suas_escritas']
+
+    _as_session("outra-sessao")
+    deadline = time.monotonic() + 30
+    while sector['sector_name'] not in set(db.get_all_sectors(conn)['sector_name']) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    replicated_after_s = round(30 - (deadline - time.monotonic()), 3)
+    replica_read_ms = _timed_reads(conn, args.reads)
+
+    conn.max_lag_seconds = -1
+    primary_read_ms = _timed_reads(conn, args.reads)
+
+    print(json.dumps({
+        'sessao_que_escreveu_le_a_propria_escrita': writer_sees_it,
+        'leituras_leia_suas_escritas': ryw,
+        'replicado_apos_s': replicated_after_s,
+        'leitura_media_replica_ms': round(replica_read_ms, 3),
+        'leitura_media_principal_ms': round(primary_read_ms, 3),
+        'metricas': db.get_routing_metrics(conn),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
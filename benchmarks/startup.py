@@ -0,0 +1,122 @@
+# --------------------------------------------------------------------------------
+# startup.py (Benchmark: partida a frio até o formulário de login)
+#
+# Descrição:
+# Mede, em processos novos, o tempo entre o início do processo e o fim da
+# primeira renderização do formulário de login (AppTest do Streamlit contra o
+# banco de benchmark, ver benchmarks/common.py). Com --eager, o processo
+# importa antes tudo o que o app importava na partida (todas as páginas,
+# pandas, menu e e-mail), para comparar com o carregamento sob demanda.
+# Com --importtime, mostra o relatório de tempo de importação (-X importtime)
+# do caminho de login, por módulo e agrupado por pacote.
+#
+#   python benchmarks/startup.py [--runs 5] [--eager]
+#   python benchmarks/startup.py --importtime [--top 25]
+# --------------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import common
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importações feitas antes desta otimização por "import views" e pelo app.py
+EAGER_IMPORTS = """
+import pandas, bcrypt, streamlit_option_menu, utils.email_utils
+import views.home, views.perfil, views.setores, views.gerenciamento
+import views.permissoes, views.logs, views.personalizacao, views.reset
+"""
+
+CHILD_SCRIPT = """
+import os, sys, time, json
+sys.path.insert(0, os.environ["BENCH_ROOT"])
+os.chdir(os.environ["BENCH_ROOT"])
+if os.environ.get("BENCH_EAGER"):
+    exec(os.environ["BENCH_EAGER_IMPORTS"])
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=120)
+app.secrets["mysql"] = json.loads(os.environ["BENCH_MYSQL"])
+app.run()
+assert not app.exception, app.exception
+assert app.text_input[0].label == "Email", "formulário de login não renderizado"
+print(json.dumps({"render_s": time.time() - float(os.environ["BENCH_T0"]),
+                  "pandas_carregado": "pandas" in sys.modules}))
+"""
+
+# O que o processo do Streamlit importa até exibir o login
+LOGIN_PATH_IMPORTS = "import streamlit, database, views"
+
+
+def _child_env(eager):
+    env = dict(os.environ, BENCH_ROOT=ROOT, BENCH_MYSQL=json.dumps(common.bench_config()),
+               BENCH_EAGER_IMPORTS=EAGER_IMPORTS, BENCH_T0=repr(time.time()))
+    if eager:
+        env["BENCH_EAGER"] = "1"
+    return env
+
+
+def measure(runs, eager):
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", CHILD_SCRIPT], env=_child_env(eager),
+                                capture_output=True, text=True, check=True)
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    renders = [sample['render_s'] for sample in samples]
+    return {
+        'modo': 'eager' if eager else 'sob demanda',
+        'execucoes': runs,
+        'p50_s': round(common.percentile(renders, 0.5), 3),
+        'min_s': round(min(renders), 3),
+        'max_s': round(max(renders), 3),
+        'pandas_carregado': samples[-1]['pandas_carregado'],
+    }
+
+
+def importtime_report(top):
+    """Executa o caminho de login com -X importtime e agrega o tempo próprio por pacote."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", LOGIN_PATH_IMPORTS],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative_us), int(self_us), name.strip()))
+
+    by_package = defaultdict(int)
+    for _, self_us, name in modules:
+        by_package[name.split(".")[0]] += self_us
+
+    total_ms = sum(self_us for _, self_us, _ in modules) / 1000
+    print(f"Tempo total de importação do caminho de login: {total_ms:.1f} ms\n")
+    print("Por pacote (tempo próprio somado):")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  {package}")
+    print("\nMódulos mais caros (tempo acumulado):")
+    for cumulative_us, self_us, name in sorted(modules, reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  (próprio {self_us / 1000:7.1f} ms)  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--eager", action="store_true")
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.importtime:
+        importtime_report(args.top)
+        return
+    common.connect()  # garante a estrutura do banco antes das medições
+    print(json.dumps(measure(args.runs, args.eager), indent=2))
+
+
+if __name__ == "__main__":
+    main()
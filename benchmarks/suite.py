@@ -0,0 +1,678 @@
+# --------------------------------------------------------------------------------
+# suite.py (Suíte de Benchmarks do Pacote 'database')
+#
+# Descrição:
+# Mede todas as funções exportadas por database/__init__.py que recebem a
+# conexão, sobre um banco com volumes realistas (por padrão 50 mil usuários,
+# 5 mil impressoras, 300 setores, 10 milhões de logs e a matriz completa de
+# permissões). Cada função tem aquecimento e N execuções medidas; leituras são
+# medidas com os caches do processo limpos antes de cada chamada ('frio') e
+# sem limpar ('quente'). O resultado é um relatório JSON com p50/p95/p99 por
+# função, identificado pelo commit, que pode ser comparado com o de outro
+# commit para encontrar regressões:
+#
+#   python benchmarks/suite.py                         # semeia e mede tudo
+#   python benchmarks/suite.py --skip-seed --only check_login,get_all_users
+#   python benchmarks/suite.py --skip-seed --compare benchmarks/results/suite-abc1234.json
+#   python benchmarks/suite.py --start-server          # sobe um MariaDB local via Docker
+#   python benchmarks/suite.py --backend sqlite --compare benchmarks/results/suite-abc1234.json
+#
+# O banco usado é o de benchmarks/common.py (variáveis BENCH_MYSQL_* ou, com
+# --backend sqlite, o arquivo de BENCH_SQLITE_PATH). Comparar o relatório do
+# SQLite com o do MySQL do mesmo commit mostra a latência de cada backend.
+# Funções exportadas sem caso de benchmark aparecem em 'sem_caso' no relatório.
+# --------------------------------------------------------------------------------
+
+import argparse
+import datetime
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import common
+import mysql.connector
+import database as db
+from database.frames import USERS_SCHEMA
+from database.sessions import forget_cached_sessions
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PASSWORD = "Benchmark@123"
+DOCKER_IMAGE = "mariadb:11"
+DOCKER_NAME = "projeto-benchmark-mariadb"
+
+LEVELS = ["padrão", "técnico", "admin"]
+ACTIONS = ["USER_LOGIN", "USER_LOGOUT", "PRINTER_UPDATED", "USER_DATA_UPDATED", "SECTOR_UPDATED",
+           "PASSWORD_RESET_REQUESTED", "SETTING_UPDATED", "PERMISSION_CHANGED", "PRINTER_CREATED"]
+
+CASES = {}
+
+
+def case(kind="leitura", heavy=False):
+    """
+    Registra um caso de benchmark. A função recebe o contexto e o número da
+    execução, faz a preparação (não medida) e retorna a chamada a ser medida.
+    """
+    def register(func):
+        CASES[func.__name__.removeprefix("bench_")] = (func, kind, heavy)
+        return func
+    return register
+
+
+class Context:
+    """Conexão e dados semeados usados para montar os argumentos de cada caso."""
+
+    def __init__(self, conn, volumes):
+        self.conn = conn
+        self.volumes = volumes
+        cursor = conn.cursor()
+        # Só os registros semeados: os criados pelos casos de escrita (em execuções
+        # anteriores com --skip-seed) não entram nos rodízios de ids
+        cursor.execute("SELECT MIN(id), MAX(id) FROM users WHERE email LIKE 'usuario%@benchmark.local'")
+        self.user_min, self.user_max = cursor.fetchone()
+        cursor.execute("SELECT id, sector_name FROM sectors WHERE sector_name LIKE 'Setor 0%' ORDER BY id")
+        self.sectors = cursor.fetchall()
+        cursor.execute("SELECT MIN(id), MAX(id) FROM printers WHERE patrimonio LIKE 'PAT%'")
+        self.printer_min, self.printer_max = cursor.fetchone()
+        cursor.close()
+        conn.commit()
+        self.admin_id = self.user_min
+        self.run_tag = time.strftime("%Y%m%d%H%M%S")
+        self.fixed_hash = db.hash_password(PASSWORD).decode('utf-8')
+        self.tokens = []
+        self.claimed = []
+
+    def user_id(self, i):
+        # A última décima parte dos usuários é reservada aos casos que alteram senha/status
+        span = (self.user_max - self.user_min + 1) * 9 // 10
+        return self.user_min + (i * 7919) % span
+
+    def spare_user_id(self, i):
+        span = (self.user_max - self.user_min + 1) // 10
+        return self.user_max - (i % span)
+
+    def email(self, i):
+        return f"usuario{(self.user_id(i) - self.user_min)}@benchmark.local"
+
+    def printer_id(self, i):
+        return self.printer_min + (i * 104729) % (self.printer_max - self.printer_min + 1)
+
+    def sector(self, i):
+        return self.sectors[(i * 31) % len(self.sectors)]
+
+
+# --- Semeadura ---
+
+def seed_sectors(conn, count):
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO sectors (location_tower, location_floor, sector_name, cost_center, manager_name, manager_contact) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        [(f"Torre {'ABCD'[i % 4]}", f"{i % 20}º andar", f"Setor {i:04d}", f"CC{i:05d}",
+          f"Gestor {i}", f"gestor{i}@benchmark.local") for i in range(count)]
+    )
+    conn.commit()
+    cursor.close()
+
+
+def seed_printers(conn, count, sector_count, batch_size=5000):
+    cursor = conn.cursor()
+    for start in range(0, count, batch_size):
+        cursor.executemany(
+            "INSERT INTO printers (unidade, fabricante, modelo, localizacao, setor, patrimonio, nome, host, endereco_ip, "
+            "status, toner_preto, contagem_paginas, ultima_verificacao) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())",
+            [(f"Unidade {i % 12}", ("HP", "Brother", "Ricoh", "Lexmark")[i % 4], f"Modelo {i % 40}",
+              f"Sala {i % 300}", f"Setor {i % sector_count:04d}", f"PAT{i:08d}", f"IMP-{i:05d}",
+              f"imp{i:05d}.benchmark.local", f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+              ("Online", "Offline", "Desconhecido")[i % 3], i % 101, i * 37)
+             for i in range(start, min(start + batch_size, count))]
+        )
+        conn.commit()
+    cursor.close()
+
+
+def seed_logs(conn, count, user_count, printer_count, batch_size=20000):
+    """Logs sintéticos distribuídos pelos últimos dois anos, com as colunas de entidade já preenchidas."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(id) FROM users")
+    first_user = cursor.fetchone()[0]
+    now = datetime.datetime.now().replace(microsecond=0)
+    for start in range(0, count, batch_size):
+        rows = []
+        for i in range(start, min(start + batch_size, count)):
+            action = ACTIONS[i % len(ACTIONS)]
+            user_id = first_user + (i * 13) % user_count
+            if action == "PRINTER_UPDATED" or action == "PRINTER_CREATED":
+                entity, entity_id = "printer", str(1 + i % printer_count)
+                details = f"Usuário (ID: {user_id}) atualizou a impressora 'IMP-{i % printer_count:05d}' (ID: {entity_id})."
+            else:
+                entity, entity_id = "user", str(user_id)
+                details = f"Utilizador 'usuario{user_id - first_user}@benchmark.local' (ID: {user_id}) executou {action}."
+            timestamp = now - datetime.timedelta(seconds=(count - i) * 63072000 // count)
+            rows.append((user_id, action, details, entity, entity_id, timestamp))
+        cursor.executemany(
+            "INSERT INTO user_logs (performing_user_id, action_type, details, entity_type, entity_id, log_timestamp) "
+            "VALUES (%s, %s, %s, %s, %s, %s)", rows
+        )
+        conn.commit()
+        print(f"  logs: {min(start + batch_size, count)}/{count}", end="\r", flush=True)
+    # As entidades já vêm preenchidas: o preenchimento retroativo começa depois delas
+    cursor.execute("REPLACE INTO maintenance_state (state_key, state_value) SELECT 'user_logs_entities', COALESCE(MAX(id), 0) FROM user_logs")
+    conn.commit()
+    cursor.close()
+    print()
+
+
+def seed(conn, volumes):
+    started = time.perf_counter()
+    timings = {}
+    for label, step in (
+        ("usuarios", lambda: common.seed_users(conn, volumes['usuarios'])),
+        ("setores", lambda: seed_sectors(conn, volumes['setores'])),
+        ("impressoras", lambda: seed_printers(conn, volumes['impressoras'], volumes['setores'])),
+        ("permissoes_e_configuracoes", lambda: (db.populate_initial_permissions(conn), db.populate_initial_settings(conn))),
+        ("logs", lambda: seed_logs(conn, volumes['logs'], volumes['usuarios'], volumes['impressoras'])),
+        ("agregado_de_logs", lambda: db.refresh_logs_rollup(conn)),
+    ):
+        step_started = time.perf_counter()
+        print(f"Semeando {label}...")
+        step()
+        timings[label] = round(time.perf_counter() - step_started, 1)
+    timings['total'] = round(time.perf_counter() - started, 1)
+    return timings
+
+
+# --- Casos: leituras ---
+
+@case()
+def bench_check_login(ctx, i):
+    email = ctx.email(i)
+    return lambda: db.check_login(ctx.conn, email, PASSWORD)
+
+@case()
+def bench_check_page_access(ctx, i):
+    return lambda: db.check_page_access(ctx.conn, "page_logs", LEVELS[i % 3])
+
+@case()
+def bench_get_setting(ctx, i):
+    return lambda: db.get_setting(ctx.conn, "login_title")
+
+@case()
+def bench_get_all_settings(ctx, i):
+    return lambda: db.get_all_settings(ctx.conn)
+
+@case()
+def bench_find_user_by_email(ctx, i):
+    email = ctx.email(i)
+    return lambda: db.find_user_by_email(ctx.conn, email)
+
+@case()
+def bench_find_existing_emails(ctx, i):
+    emails = [ctx.email(i + k) for k in range(500)]
+    return lambda: db.find_existing_emails(ctx.conn, emails)
+
+@case()
+def bench_get_all_users(ctx, i):
+    return lambda: db.get_all_users(ctx.conn)
+
+@case()
+def bench_search_users(ctx, i):
+    term = ("silva", "usuario12", "(11) 9", "0004")[i % 4]
+    return lambda: db.search_users(ctx.conn, term, limit=25, offset=25 * (i % 3))
+
+@case()
+def bench_search_ids(ctx, i):
+    entity, term = (("users", "silva"), ("printers", "imp-01"), ("sectors", "torre"))[i % 3]
+    return lambda: db.search_ids(ctx.conn, entity, term, 25)
+
+@case()
+def bench_get_all_sectors(ctx, i):
+    return lambda: db.get_all_sectors(ctx.conn, only_active=bool(i % 2))
+
+@case()
+def bench_get_all_printers(ctx, i):
+    return lambda: db.get_all_printers(ctx.conn)
+
+@case()
+def bench_get_printers_changed_since(ctx, i):
+    since = datetime.datetime.now() - datetime.timedelta(minutes=5)
+    return lambda: db.get_printers_changed_since(ctx.conn, since)
+
+@case()
+def bench_get_printer_health(ctx, i):
+    return lambda: db.get_printer_health(ctx.conn)
+
+@case()
+def bench_get_skipped_printers(ctx, i):
+    return lambda: db.get_skipped_printers(ctx.conn)
+
+@case()
+def bench_get_all_page_permissions(ctx, i):
+    return lambda: db.get_all_page_permissions(ctx.conn)
+
+@case(heavy=True)
+def bench_get_all_logs(ctx, i):
+    return lambda: db.get_all_logs(ctx.conn)
+
+@case()
+def bench_search_logs(ctx, i):
+    term = ("IMP-00042", "usuario777@benchmark.local", "atualizou impressora", "USER_LOGIN")[i % 4]
+    return lambda: db.search_logs(ctx.conn, term, limit=50)
+
+@case()
+def bench_get_entity_history(ctx, i):
+    entity_type, entity_id = (("user", ctx.user_id(i)), ("printer", ctx.printer_id(i) - ctx.printer_min + 1))[i % 2]
+    return lambda: db.get_entity_history(ctx.conn, entity_type, entity_id)
+
+@case()
+def bench_get_logs_activity(ctx, i):
+    start = datetime.date.today() - datetime.timedelta(days=90)
+    return lambda: db.get_logs_activity(ctx.conn, start)
+
+@case()
+def bench_get_slow_queries(ctx, i):
+    return lambda: db.get_slow_queries(ctx.conn)
+
+@case()
+def bench_get_routing_metrics(ctx, i):
+    return lambda: db.get_routing_metrics(ctx.conn)
+
+@case()
+def bench_reader(ctx, i):
+    return lambda: db.reader(ctx.conn)
+
+@case()
+def bench_read_frame(ctx, i):
+    return lambda: db.read_frame(ctx.conn, "SELECT id, name, email, phone, permission_level, status FROM users",
+                                 schema=USERS_SCHEMA)
+
+@case()
+def bench_validate_session(ctx, i):
+    token = ctx.tokens[i % len(ctx.tokens)]
+    return lambda: db.validate_session(ctx.conn, token)
+
+
+# --- Casos: escritas ---
+
+@case("escrita")
+def bench_log_action(ctx, i):
+    return lambda: db.log_action(ctx.conn, ctx.admin_id, "USER_LOGIN", f"Benchmark {ctx.run_tag} #{i}.", "user", ctx.admin_id)
+
+@case("escrita")
+def bench_add_user(ctx, i):
+    email = f"novo{ctx.run_tag}_{i}@benchmark.local"
+    return lambda: db.add_user(ctx.conn, f"Novo Usuário {i}", "(11) 90000-0000", email, "padrão", ctx.admin_id)
+
+@case("escrita")
+def bench_add_users_bulk(ctx, i):
+    users = [{'name': f"Importado {i}-{k}", 'phone': "", 'email': f"import{ctx.run_tag}_{i}_{k}@benchmark.local",
+              'permission_level': "padrão", 'password_hash': ctx.fixed_hash} for k in range(200)]
+    return lambda: db.add_users_bulk(ctx.conn, users, ctx.admin_id)
+
+@case("escrita")
+def bench_update_user(ctx, i):
+    user_id = ctx.user_id(i)
+    email = f"usuario{user_id - ctx.user_min}@benchmark.local"
+    return lambda: db.update_user(ctx.conn, user_id, f"Usuário {user_id - ctx.user_min:07d} Silva", f"(11) 9{i % 10000:04d}-0000",
+                                  email, LEVELS[(user_id - ctx.user_min) % 3], ctx.admin_id)
+
+@case("escrita")
+def bench_update_user_status(ctx, i):
+    user_id = ctx.spare_user_id(i)
+    return lambda: db.update_user_status(ctx.conn, user_id, ("inativo", "ativo")[i % 2], ctx.admin_id)
+
+@case("escrita")
+def bench_update_user_password(ctx, i):
+    user_id = ctx.spare_user_id(0)
+    cursor = ctx.conn.cursor()
+    cursor.execute("UPDATE users SET password = %s WHERE id = %s", (ctx.fixed_hash, user_id))
+    ctx.conn.commit()
+    cursor.close()
+    return lambda: db.update_user_password(ctx.conn, user_id, PASSWORD, f"Nova@{ctx.run_tag}{i}", user_id)
+
+@case("escrita")
+def bench_reset_user_password(ctx, i):
+    email = f"usuario{ctx.spare_user_id(i + 1) - ctx.user_min}@benchmark.local"
+    return lambda: db.reset_user_password(ctx.conn, email, ctx.admin_id)
+
+@case("escrita")
+def bench_create_session(ctx, i):
+    return lambda: db.create_session(ctx.conn, ctx.user_id(i))
+
+@case("escrita")
+def bench_revoke_session(ctx, i):
+    token = db.create_session(ctx.conn, ctx.user_id(i))
+    return lambda: db.revoke_session(ctx.conn, token)
+
+@case("escrita")
+def bench_create_default_admin_if_needed(ctx, i):
+    return lambda: db.create_default_admin_if_needed(ctx.conn)
+
+@case("escrita")
+def bench_add_sector(ctx, i):
+    data = {'location_tower': "Torre Z", 'location_floor': "1", 'sector_name': f"Setor Novo {ctx.run_tag}-{i}",
+            'cost_center': "", 'manager_name': "", 'manager_contact': ""}
+    return lambda: db.add_sector(ctx.conn, data, ctx.admin_id)
+
+@case("escrita")
+def bench_update_sector(ctx, i):
+    sector_id, name = ctx.sector(i)
+    data = {'location_tower': "Torre A", 'location_floor': f"{i % 20}º andar", 'sector_name': name,
+            'cost_center': f"CC{i:05d}", 'manager_name': f"Gestor {i}", 'manager_contact': ""}
+    return lambda: db.update_sector(ctx.conn, sector_id, data, ctx.admin_id)
+
+@case("escrita")
+def bench_update_sector_status(ctx, i):
+    sector_id, name = ctx.sector(i)
+    return lambda: db.update_sector_status(ctx.conn, sector_id, name, "ativo", ctx.admin_id)
+
+def _printer_data(i, printer_id=None):
+    return {'id': printer_id, 'unidade': f"Unidade {i % 12}", 'fabricante': "HP", 'modelo': f"Modelo {i % 40}",
+            'localizacao': f"Sala {i % 300}", 'setor': f"Setor {i % 300:04d}", 'patrimonio': None,
+            'nome': f"IMP-{i:05d}", 'host': f"imp{i:05d}.benchmark.local", 'endereco_ip': f"10.200.{i // 256 % 256}.{i % 256}"}
+
+@case("escrita")
+def bench_add_printer(ctx, i):
+    data = _printer_data(i)
+    data['patrimonio'] = f"NOVO{ctx.run_tag}{i:06d}"
+    return lambda: db.add_printer(ctx.conn, data, ctx.admin_id)
+
+@case("escrita")
+def bench_update_printer(ctx, i):
+    printer_id = ctx.printer_id(i)
+    data = _printer_data(i, printer_id)
+    data['patrimonio'] = f"PAT{printer_id - ctx.printer_min:08d}"
+    return lambda: db.update_printer(ctx.conn, printer_id, data, ctx.admin_id)
+
+@case("escrita")
+def bench_update_printer_status(ctx, i):
+    return lambda: db.update_printer_status(ctx.conn, ctx.printer_id(i), ("Online", "Offline")[i % 2])
+
+@case("escrita")
+def bench_update_printer_details(ctx, i):
+    data = {'id': ctx.printer_id(i), 'status': "Online", 'status_detalhado': "Pronta", 'toner_preto': i % 101,
+            'toner_ciano': -1, 'toner_magenta': -1, 'toner_amarelo': -1, 'contagem_paginas': 100000 + i,
+            'ultima_verificacao': datetime.datetime.now()}
+    return lambda: db.update_printer_details(ctx.conn, data)
+
+@case("escrita")
+def bench_update_printers_details(ctx, i):
+    # Uma verificação completa de 200 impressoras, metade com valores alterados
+    now = datetime.datetime.now()
+    rows = [{'id': ctx.printer_id(i + k), 'status': "Online", 'status_detalhado': "Pronta",
+             'toner_preto': (i + k) % 101 if k % 2 else 50, 'toner_ciano': -1, 'toner_magenta': -1,
+             'toner_amarelo': -1, 'contagem_paginas': 100000, 'ultima_verificacao': now} for k in range(200)]
+    return lambda: db.update_printers_details(ctx.conn, rows)
+
+@case("escrita")
+def bench_register_discovered_printers(ctx, i):
+    new_printers = [{'fabricante': "HP", 'modelo': "Descoberta", 'nome': f"DESC-{ctx.run_tag}-{i}-{k}",
+                     'host': None, 'endereco_ip': f"10.250.{i % 256}.{k}"} for k in range(20)]
+    ip_changes = [(ctx.printer_id(i + k), None, f"10.201.{i % 256}.{k}") for k in range(20)]
+    return lambda: db.register_discovered_printers(ctx.conn, new_printers, ip_changes, ctx.admin_id)
+
+@case("escrita")
+def bench_save_printer_health(ctx, i):
+    rows = [(ctx.printer_id(i + k), ("fechado", "aberto")[k % 2], k % 5, None, None) for k in range(200)]
+    return lambda: db.save_printer_health(ctx.conn, rows)
+
+@case("escrita")
+def bench_update_page_permission(ctx, i):
+    return lambda: db.update_page_permission(ctx.conn, "page_desempenho", "técnico", bool(i % 2), ctx.admin_id)
+
+@case("escrita")
+def bench_populate_initial_permissions(ctx, i):
+    return lambda: db.populate_initial_permissions(ctx.conn)
+
+@case("escrita")
+def bench_populate_initial_settings(ctx, i):
+    return lambda: db.populate_initial_settings(ctx.conn)
+
+@case("escrita")
+def bench_set_setting(ctx, i):
+    return lambda: db.set_setting(ctx.conn, "benchmark_setting", str(i), ctx.admin_id)
+
+@case("escrita")
+def bench_set_multiple_settings(ctx, i):
+    settings = {f"benchmark_setting_{k}": str(i) for k in range(10)}
+    return lambda: db.set_multiple_settings(ctx.conn, settings, ctx.admin_id)
+
+@case("escrita")
+def bench_enqueue_email(ctx, i):
+    return lambda: db.enqueue_email(ctx.conn, f"destino{i}@benchmark.local", "Benchmark", "Corpo da mensagem.")
+
+@case("escrita")
+def bench_enqueue_emails(ctx, i):
+    messages = [(f"lote{i}_{k}@benchmark.local", "Benchmark", "Corpo da mensagem.") for k in range(100)]
+    return lambda: db.enqueue_emails(ctx.conn, messages)
+
+@case("escrita")
+def bench_claim_due_emails(ctx, i):
+    def call():
+        claimed = db.claim_due_emails(ctx.conn, 50)
+        ctx.claimed.extend(message['id'] for message in claimed or [])
+        return claimed
+    return call
+
+@case("escrita")
+def bench_mark_email_sent(ctx, i):
+    email_id = ctx.claimed.pop() if ctx.claimed else 0
+    return lambda: db.mark_email_sent(ctx.conn, email_id)
+
+@case("escrita")
+def bench_mark_email_failed(ctx, i):
+    email_id = ctx.claimed.pop() if ctx.claimed else 0
+    return lambda: db.mark_email_failed(ctx.conn, email_id, "Falha simulada", 60)
+
+@case("escrita")
+def bench_refresh_logs_rollup(ctx, i):
+    return lambda: db.refresh_logs_rollup(ctx.conn)
+
+@case("escrita")
+def bench_backfill_log_entities(ctx, i):
+    return lambda: db.backfill_log_entities(ctx.conn)
+
+@case("escrita")
+def bench_flush_perf_records(ctx, i):
+    return lambda: db.flush_perf_records(ctx.conn, force=True)
+
+@case("escrita")
+def bench_flush_slow_queries(ctx, i):
+    return lambda: db.flush_slow_queries(ctx.conn)
+
+
+# --- Medição ---
+
+def clear_process_caches():
+    """Descarta os caches em memória do processo, para medir a ida ao banco."""
+    db.clear_read_cache()
+    for cached in (db.get_setting, db.get_all_settings, db.check_page_access):
+        cached.clear()
+    for entity in ("users", "printers", "sectors"):
+        db.invalidate_index(entity)
+    forget_cached_sessions()
+
+
+def exported_conn_functions():
+    """Funções exportadas pelo pacote cujo primeiro parâmetro é a conexão (as que a suíte deve cobrir)."""
+    names = []
+    for name, value in vars(db).items():
+        if name.startswith('_') or isinstance(value, type) or not callable(value):
+            continue
+        func = inspect.unwrap(value)
+        if not getattr(func, '__module__', '').startswith('database'):
+            continue
+        try:
+            params = list(inspect.signature(func).parameters)
+        except (TypeError, ValueError):
+            continue
+        if params and params[0] in ('conn', '_conn'):
+            names.append(name)
+    return sorted(names)
+
+
+def _failed(result):
+    return result is False or (isinstance(result, tuple) and bool(result) and result[0] is False)
+
+
+def measure(ctx, func, runs, warmup, cold):
+    samples = []
+    failures = 0
+    for i in range(warmup + runs):
+        if cold:
+            clear_process_caches()
+        call = func(ctx, i)
+        started = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            samples.append(elapsed)
+            failures += _failed(result)
+    return {
+        'execucoes': runs,
+        'falhas': failures,
+        'p50_ms': round(common.percentile(samples, 0.50) * 1000, 3),
+        'p95_ms': round(common.percentile(samples, 0.95) * 1000, 3),
+        'p99_ms': round(common.percentile(samples, 0.99) * 1000, 3),
+        'media_ms': round(sum(samples) / len(samples) * 1000, 3),
+        'min_ms': round(min(samples) * 1000, 3),
+        'max_ms': round(max(samples) * 1000, 3),
+    }
+
+
+def _git_commit():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-modificado" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def compare(report, baseline_path, threshold):
+    """Imprime a variação do p50 de cada função em relação ao relatório de base; retorna as regressões."""
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = []
+    print(f"\nComparação com {baseline['commit']} ({baseline.get('backend', 'mysql')}) (limite de regressão: +{threshold:.0%} no p50)")
+    for name, modes in sorted(report['funcoes'].items()):
+        for mode, stats in modes.items():
+            if mode == 'tipo':
+                continue
+            before = baseline.get('funcoes', {}).get(name, {}).get(mode)
+            if not before or not before['p50_ms']:
+                continue
+            change = stats['p50_ms'] / before['p50_ms'] - 1
+            flag = "REGRESSÃO" if change > threshold else ""
+            print(f"  {name:<36} {mode:<6} {before['p50_ms']:>10.3f} -> {stats['p50_ms']:>10.3f} ms  {change:+7.1%} {flag}")
+            if flag:
+                regressions.append((name, mode, round(change, 3)))
+    return regressions
+
+
+def start_server():
+    """Sobe um MariaDB descartável via Docker na porta de BENCH_MYSQL_PORT e espera aceitar conexões."""
+    port = common.bench_config()['port']
+    subprocess.run(["docker", "run", "-d", "--rm", "--name", DOCKER_NAME, "-p", f"{port}:3306",
+                    "-e", "MARIADB_ALLOW_EMPTY_ROOT_PASSWORD=1", DOCKER_IMAGE], check=True)
+    deadline = time.monotonic() + 120
+    while True:
+        try:
+            common.connect().close()
+            return
+        except mysql.connector.Error:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--printers", type=int, default=5000)
+    parser.add_argument("--sectors", type=int, default=300)
+    parser.add_argument("--logs", type=int, default=10000000)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--heavy-runs", type=int, default=3, help="execuções das funções que leem a trilha inteira")
+    parser.add_argument("--only", help="lista de funções separadas por vírgula")
+    parser.add_argument("--skip-seed", action="store_true", help="reutiliza os dados da execução anterior")
+    parser.add_argument("--backend", choices=("mysql", "sqlite"), default=common.bench_backend())
+    parser.add_argument("--start-server", action="store_true", help="sobe um MariaDB local via Docker (removido no fim)")
+    parser.add_argument("--output", help="arquivo do relatório (padrão: benchmarks/results/suite-<commit>.json)")
+    parser.add_argument("--compare", help="relatório de outro commit para comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="aumento do p50 considerado regressão")
+    args = parser.parse_args()
+    os.environ["BENCH_BACKEND"] = args.backend
+    # O SQLite é um arquivo local: não há servidor para subir
+    args.start_server = args.start_server and args.backend == "mysql"
+
+    if args.start_server:
+        start_server()
+    try:
+        conn = common.connect(recreate=not args.skip_seed)
+        volumes = {'usuarios': args.users, 'impressoras': args.printers, 'setores': args.sectors, 'logs': args.logs}
+        seed_timings = None if args.skip_seed else seed(conn, volumes)
+
+        db.configure_sessions("chave-de-benchmark")
+        ctx = Context(conn, volumes)
+        ctx.tokens = [db.create_session(conn, ctx.user_id(i)) for i in range(50)]
+
+        selected = args.only.split(",") if args.only else list(CASES)
+        unknown = [name for name in selected if name not in CASES]
+        if unknown:
+            parser.error(f"sem caso de benchmark: {', '.join(unknown)}")
+
+        results = {}
+        for name in selected:
+            func, kind, heavy = CASES[name]
+            runs = args.heavy_runs if heavy else args.runs
+            warmup = min(args.warmup, 1) if heavy else args.warmup
+            results[name] = {'tipo': kind}
+            modes = ("frio", "quente") if kind == "leitura" else ("frio",)
+            for mode in modes:
+                results[name][mode] = measure(ctx, func, runs, warmup, cold=(mode == "frio"))
+            summary = "  ".join(f"{mode}: p50 {results[name][mode]['p50_ms']} ms" for mode in modes)
+            print(f"{name:<36} {summary}")
+
+        server_version = conn.get_server_info()
+        conn.close()
+    finally:
+        if args.start_server:
+            subprocess.run(["docker", "stop", DOCKER_NAME], check=False)
+
+    report = {
+        'commit': _git_commit(),
+        'data': datetime.datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'backend': args.backend,
+        'servidor': server_version,
+        'volumes': volumes,
+        'semeadura_s': seed_timings,
+        'config': {'aquecimento': args.warmup, 'execucoes': args.runs, 'execucoes_pesadas': args.heavy_runs},
+        'funcoes': results,
+        'sem_caso': [name for name in exported_conn_functions() if name not in CASES],
+    }
+
+    suffix = "" if args.backend == "mysql" else f"-{args.backend}"
+    output = args.output or os.path.join(RESULTS_DIR, f"suite-{report['commit']}{suffix}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2, ensure_ascii=False)
+    print(f"\nRelatório gravado em {output}")
+    if report['sem_caso']:
+        print(f"Funções exportadas sem caso de benchmark: {', '.join(report['sem_caso'])}")
+
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# --------------------------------------------------------------------------------
+# users_page.py (Benchmark: rerun da página de Gerenciamento de Usuários)
+#
+# Descrição:
+# Mede o tempo de um rerun completo de show_gerenciamento_page (com e sem
+# termo de busca) para 100, 5.000 e 50.000 usuários, usando o AppTest do
+# Streamlit contra o banco de benchmark (ver benchmarks/common.py).
+#
+#   python benchmarks/users_page.py [--sizes 100 5000 50000] [--runs 10]
+# --------------------------------------------------------------------------------
+
+import argparse
+import os
+import json
+import time
+
+import common
+from streamlit.testing.v1 import AppTest
+
+PAGE_SCRIPT = """
+import os, sys
+sys.path.insert(0, os.environ["BENCH_DIR"])
+import streamlit as st
+import common
+from views.gerenciamento import show_gerenciamento_page
+
+@st.cache_resource
+def _conn():
+    return common.connect()
+
+st.session_state.setdefault("user_info", {"id": 1, "name": "Admin", "permission_level": "admin"})
+show_gerenciamento_page(_conn())
+"""
+
+
+def measure(runs, search_term):
+    app = AppTest.from_string(PAGE_SCRIPT, default_timeout=120)
+    app.run()  # aquecimento (imports, conexão)
+    if search_term:
+        app.text_input(key="search_user_manag").set_value(search_term)
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        app.run()
+        samples.append(time.perf_counter() - started)
+    return {
+        'p50_ms': round(common.percentile(samples, 0.50) * 1000, 1),
+        'p95_ms': round(common.percentile(samples, 0.95) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 5000, 50000])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ["BENCH_DIR"] = os.path.dirname(os.path.abspath(__file__))
+    report = {}
+    for size in args.sizes:
+        conn = common.connect(recreate=True)
+        common.seed_users(conn, size)
+        conn.close()
+        report[size] = {
+            'sem_busca': measure(args.runs, ""),
+            'com_busca': measure(args.runs, "Usuário 00001"),
+        }
+        print(f"{size:>6} usuários: {report[size]}")
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
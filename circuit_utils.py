@@ -0,0 +1,120 @@
+# --------------------------------------------------------------------------------
+# circuit_utils.py (Módulo de Disjuntores por Impressora)
+#
+# Autor: Emerson A. Silva
+# Data: 24/10/2025
+#
+# Descrição:
+# Máquina de estados (fechado / aberto / semiaberto) por impressora, mantida
+# em memória e persistida na tabela 'printer_health'. O estado é relido do
+# banco antes de cada verificação e só os circuitos alterados por ela são
+# gravados, para que processos diferentes não sobrescrevam as contagens de
+# falhas e os prazos uns dos outros. Impressoras que falham
+# repetidamente (sem ping ou, respondendo ao ping, sem IPP) têm o circuito
+# aberto e deixam de ser verificadas até o fim do período de espera, quando
+# recebem uma única sondagem: o ping e, se ele responder, a consulta IPP.
+# --------------------------------------------------------------------------------
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import database as db
+
+CLOSED = 'fechado'
+OPEN = 'aberto'
+HALF_OPEN = 'semiaberto'
+
+# Falhas consecutivas necessárias para abrir o circuito
+FAILURE_THRESHOLD = 3
+# Período de espera inicial; dobra a cada nova falha com o circuito aberto
+BASE_COOLDOWN = timedelta(minutes=5)
+MAX_COOLDOWN = timedelta(hours=6)
+
+
+@dataclass
+class PrinterCircuit:
+    printer_id: int
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    open_until: datetime | None = None
+    last_reason: str | None = None
+
+    def allow_request(self, now):
+        """Indica se a impressora deve ser verificada; passa de aberto para semiaberto ao fim da espera."""
+        if self.state == OPEN:
+            if self.open_until and now < self.open_until:
+                return False
+            self.state = HALF_OPEN
+        return True
+
+    def record_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_until = None
+        self.last_reason = None
+
+    def record_failure(self, reason, now):
+        self.consecutive_failures += 1
+        self.last_reason = reason
+        if self.state == HALF_OPEN or self.consecutive_failures >= FAILURE_THRESHOLD:
+            extra = max(0, self.consecutive_failures - FAILURE_THRESHOLD)
+            cooldown = min(BASE_COOLDOWN * (2 ** extra), MAX_COOLDOWN)
+            self.state = OPEN
+            self.open_until = now + cooldown
+
+    def skip_reason(self):
+        """Texto exibido no dashboard para explicar por que a impressora foi ignorada."""
+        until = self.open_until.strftime('%d/%m %H:%M') if self.open_until else '-'
+        return (f"Ignorada: {self.consecutive_failures} falhas seguidas "
+                f"({self.last_reason or 'sem resposta'}); nova tentativa após {until}")
+
+
+_circuits = {}
+# Último estado lido ou gravado de cada circuito, para gravar só o que mudou
+_persisted = {}
+_lock = threading.Lock()
+# Estado de um circuito sem linha em 'printer_health' (não precisa ser gravado)
+_DEFAULT_SNAPSHOT = (CLOSED, 0, None, None)
+
+
+def _snapshot(circuit):
+    return (circuit.state, circuit.consecutive_failures, circuit.open_until, circuit.last_reason)
+
+
+def load_circuits(conn):
+    """
+    Recarrega do banco o estado persistido dos circuitos. Chamada antes de cada
+    verificação, para partir do que os outros processos gravaram.
+    """
+    rows = db.get_printer_health(conn)
+    with _lock:
+        _circuits.clear()
+        _persisted.clear()
+        for row in rows:
+            circuit = _circuits[row['printer_id']] = PrinterCircuit(
+                printer_id=row['printer_id'],
+                state=row['circuit_state'],
+                consecutive_failures=row['consecutive_failures'],
+                open_until=row['open_until'],
+                last_reason=row['last_reason'],
+            )
+            _persisted[circuit.printer_id] = _snapshot(circuit)
+
+
+def get_circuit(printer_id):
+    """Retorna (criando se necessário) o circuito em memória de uma impressora."""
+    with _lock:
+        circuit = _circuits.get(printer_id)
+        if circuit is None:
+            circuit = _circuits[printer_id] = PrinterCircuit(printer_id=printer_id)
+        return circuit
+
+
+def save_circuits(conn):
+    """Persiste em lote apenas os circuitos alterados desde a última leitura ou gravação."""
+    with _lock:
+        changed = {c.printer_id: _snapshot(c) for c in _circuits.values()
+                   if _snapshot(c) != _persisted.get(c.printer_id, _DEFAULT_SNAPSHOT)}
+    if changed and db.save_printer_health(conn, [(printer_id, *snapshot) for printer_id, snapshot in changed.items()]):
+        with _lock:
+            _persisted.update(changed)
@@ -5,24 +5,73 @@
 # Versão atualizada para incluir o novo submódulo de configurações (settings).
 # --------------------------------------------------------------------------------
 
+import secrets
+import threading
 import streamlit as st
+import pandas as pd
 import mysql.connector
 
+# Copy-on-Write: as cópias rasas entregues por read_cache.cached_read não
+# propagam alterações do chamador para o DataFrame em cache. A partir do
+# pandas 3 ele é sempre ligado (e a opção, descontinuada, só gera um aviso).
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
 # Importa as funções dos submódulos para expô-las no nível do pacote
 from .users import (
     hash_password, check_password, generate_strong_password, add_user, check_login,
     create_default_admin_if_needed, get_all_users, update_user_status,
-    update_user_password, reset_user_password,find_user_by_email,update_user
+    update_user_password, reset_user_password,find_user_by_email,update_user,
+    generate_hashed_passwords, find_existing_emails, add_users_bulk, search_users
+)
+from .printers import (
+    get_all_printers, add_printer, update_printer, update_printer_status, update_printer_details, update_printers_details,
+    register_discovered_printers, get_printers_changed_since, get_printer_health, save_printer_health, get_skipped_printers
 )
-from .printers import get_all_printers, add_printer, update_printer, update_printer_status, update_printer_details
 from .sectors import get_all_sectors, add_sector, update_sector, update_sector_status
 from .permissions import (
     check_page_access, get_all_page_permissions, update_page_permission,
     populate_initial_permissions
 )
-from .logs import log_action, get_all_logs
+from .logs import (
+    log_action, get_all_logs, search_logs, get_entity_history, backfill_log_entities,
+    ENTITY_USER, ENTITY_PRINTER, ENTITY_SECTOR, ENTITY_SETTING, ENTITY_PAGE_PERMISSION
+)
+from .rollups import refresh_logs_rollup, get_logs_activity
+from .search_index import search_ids, get_search_index_metrics, invalidate_index
+from .read_cache import clear_read_cache, get_read_cache_metrics
+from .cache_bus import configure_cache_bus, poll_cache_events, get_cache_bus_metrics
+from .routing import RoutedConnection, reader, get_routing_metrics, DEFAULT_MAX_LAG_SECONDS
+from .sessions import configure_sessions, create_session, validate_session, revoke_session
+from .frames import read_frame
+from .statements import get_statement_metrics
+from . import sqlite_backend
+from .outbox import SECRET_PLACEHOLDER, configure_outbox, enqueue_email, enqueue_emails, claim_due_emails, mark_email_sent, mark_email_failed
 # --- 1. IMPORTA AS NOVAS FUNÇÕES DE SETTINGS ---
 from .settings import get_setting, get_all_settings, set_setting, populate_initial_settings, set_multiple_settings
+from .instrumentation import (
+    configure_instrumentation, instrument, instrument_page, track_rerun, InstrumentedConnection,
+    get_perf_records, flush_perf_records, discard_pending_perf_records,
+    get_query_fingerprint_stats, flush_slow_queries, get_slow_queries, SLOW_QUERY_THRESHOLD_MS
+)
+
+# --- Instrumentação: toda função exportada que recebe a conexão é medida por rerun ---
+
+def _instrument_package_functions():
+    import inspect
+    for name, value in list(globals().items()):
+        if name.startswith('_') or isinstance(value, type) or not callable(value):
+            continue
+        if not getattr(value, '__module__', '').startswith(__name__ + '.'):
+            continue
+        try:
+            params = list(inspect.signature(value).parameters)
+        except (TypeError, ValueError):
+            continue
+        if params and params[0] in ('conn', '_conn'):
+            globals()[name] = instrument(value, name)
+
+_instrument_package_functions()
 
 # --- Lógica de Criação de Tabelas (Centralizada) ---
 
@@ -31,13 +80,13 @@ def _create_all_tables(cursor):
     # (As criações das tabelas users, printers, logs, sectors, permissions permanecem as mesmas)
     # ...
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255) NOT NULL, phone VARCHAR(20), email VARCHAR(255) UNIQUE NOT NULL, password VARCHAR(255) NOT NULL, permission_level ENUM('admin', 'padrão', 'técnico') NOT NULL, status ENUM('ativo', 'inativo') NOT NULL DEFAULT 'ativo',force_password_change int)
+        CREATE TABLE IF NOT EXISTS users (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(255) NOT NULL, phone VARCHAR(20), email VARCHAR(255) UNIQUE NOT NULL, password VARCHAR(255) NOT NULL, permission_level ENUM('admin', 'padrão', 'técnico') NOT NULL, status ENUM('ativo', 'inativo') NOT NULL DEFAULT 'ativo',force_password_change int, INDEX idx_users_name (name), INDEX idx_users_phone (phone))
     """)
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS printers (id INT AUTO_INCREMENT PRIMARY KEY, unidade VARCHAR(255), fabricante VARCHAR(255), modelo VARCHAR(255), localizacao VARCHAR(255), setor VARCHAR(255), patrimonio VARCHAR(255) UNIQUE, nome VARCHAR(255), host VARCHAR(255), endereco_ip VARCHAR(45), status ENUM('Online', 'Offline', 'Desconhecido') NOT NULL DEFAULT 'Desconhecido', status_detalhado VARCHAR(255) DEFAULT 'Não verificado', toner_preto INT DEFAULT -1, toner_ciano INT DEFAULT -1, toner_magenta INT DEFAULT -1, toner_amarelo INT DEFAULT -1, contagem_paginas INT DEFAULT -1, ultima_verificacao TIMESTAMP NULL)
+        CREATE TABLE IF NOT EXISTS printers (id INT AUTO_INCREMENT PRIMARY KEY, unidade VARCHAR(255), fabricante VARCHAR(255), modelo VARCHAR(255), localizacao VARCHAR(255), setor VARCHAR(255), patrimonio VARCHAR(255) UNIQUE, nome VARCHAR(255), host VARCHAR(255), endereco_ip VARCHAR(45), status ENUM('Online', 'Offline', 'Desconhecido') NOT NULL DEFAULT 'Desconhecido', status_detalhado VARCHAR(255) DEFAULT 'Não verificado', toner_preto INT DEFAULT -1, toner_ciano INT DEFAULT -1, toner_magenta INT DEFAULT -1, toner_amarelo INT DEFAULT -1, contagem_paginas INT DEFAULT -1, ultima_verificacao TIMESTAMP NULL, updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6), INDEX idx_printers_updated_at (updated_at))
     """)
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_logs (id INT AUTO_INCREMENT PRIMARY KEY, log_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, performing_user_id INT, action_type VARCHAR(50) NOT NULL, details TEXT, FOREIGN KEY (performing_user_id) REFERENCES users(id) ON DELETE SET NULL)
+        CREATE TABLE IF NOT EXISTS user_logs (id INT AUTO_INCREMENT PRIMARY KEY, log_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, performing_user_id INT, action_type VARCHAR(50) NOT NULL, details TEXT, entity_type VARCHAR(30) NULL, entity_id VARCHAR(100) NULL, changes JSON NULL, INDEX idx_user_logs_entity (entity_type, entity_id, log_timestamp), FOREIGN KEY (performing_user_id) REFERENCES users(id) ON DELETE SET NULL)
     """)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS sectors (id INT AUTO_INCREMENT PRIMARY KEY, location_tower VARCHAR(100) NOT NULL, location_floor VARCHAR(100) NOT NULL, sector_name VARCHAR(255) NOT NULL UNIQUE, cost_center VARCHAR(100), manager_name VARCHAR(255), manager_contact VARCHAR(255), status ENUM('ativo', 'inativo') NOT NULL DEFAULT 'ativo')
@@ -54,21 +103,174 @@ def _create_all_tables(cursor):
         )
     """)
 
+    # Estado do disjuntor (circuit breaker) de monitoramento de cada impressora
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS printer_health (printer_id INT PRIMARY KEY, circuit_state ENUM('fechado', 'aberto', 'semiaberto') NOT NULL DEFAULT 'fechado', consecutive_failures INT NOT NULL DEFAULT 0, open_until TIMESTAMP NULL, last_reason VARCHAR(255), FOREIGN KEY (printer_id) REFERENCES printers(id) ON DELETE CASCADE)
+    """)
+
+    # Versão de cada tabela, incrementada a cada escrita (chave do cache de leitura)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (table_name VARCHAR(64) PRIMARY KEY, version BIGINT UNSIGNED NOT NULL DEFAULT 0)
+    """)
+
+    # Sessões de login persistentes (ver sessions.py); o token fica só como hash
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_sessions (token_hash CHAR(64) PRIMARY KEY, user_id INT NOT NULL, created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, last_seen_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, expires_at TIMESTAMP NOT NULL, revoked_at TIMESTAMP NULL, INDEX idx_user_sessions_user (user_id, revoked_at), FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE)
+    """)
+
+    # Marcas d'água de rotinas de manutenção incrementais (ex.: último id de log agregado)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_state (state_key VARCHAR(100) PRIMARY KEY, state_value BIGINT NOT NULL DEFAULT 0, updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP)
+    """)
+
+    # Agregado diário da trilha de auditoria (ver rollups.py); usuário 0 = sem autor
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_logs_daily (log_date DATE NOT NULL, action_type VARCHAR(50) NOT NULL, performing_user_id INT NOT NULL DEFAULT 0, log_count INT UNSIGNED NOT NULL DEFAULT 0, PRIMARY KEY (log_date, action_type, performing_user_id))
+    """)
+
+    # Eventos de invalidação de cache entre processos (ver cache_bus.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cache_events (id BIGINT AUTO_INCREMENT PRIMARY KEY, topic VARCHAR(64) NOT NULL, origin VARCHAR(64) NOT NULL, created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6), INDEX idx_cache_events_created (created_at))
+    """)
+
+    # Métricas de desempenho por rerun (gravação opcional, ver instrumentation.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS perf_reruns (id BIGINT AUTO_INCREMENT PRIMARY KEY, recorded_at TIMESTAMP NOT NULL, page VARCHAR(100) NOT NULL, wall_ms DECIMAL(12,3) NOT NULL, db_ms DECIMAL(12,3) NOT NULL, query_count INT NOT NULL, rows_fetched INT NOT NULL, INDEX idx_perf_reruns_page (page, recorded_at))
+    """)
+
+    # Comandos SQL acima do limite de tempo, com parâmetros e plano de execução
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS slow_queries (id BIGINT AUTO_INCREMENT PRIMARY KEY, captured_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, fingerprint_hash CHAR(32) NOT NULL, fingerprint TEXT NOT NULL, statement MEDIUMTEXT NOT NULL, params TEXT, duration_ms DECIMAL(12,3) NOT NULL, page VARCHAR(100), explain_plan TEXT, INDEX idx_slow_queries_fingerprint (fingerprint_hash, captured_at))
+    """)
+
+    # Fila durável de e-mails enviada pelo remetente em segundo plano
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS email_outbox (id INT AUTO_INCREMENT PRIMARY KEY, recipient VARCHAR(255) NOT NULL, subject VARCHAR(255) NOT NULL, body TEXT, secret TEXT, status ENUM('pendente', 'enviando', 'enviado', 'falhou') NOT NULL DEFAULT 'pendente', attempts INT NOT NULL DEFAULT 0, next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, claim_token CHAR(32), claimed_at TIMESTAMP NULL, last_error VARCHAR(500), created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, sent_at TIMESTAMP NULL, INDEX idx_outbox_status (status, next_attempt_at), INDEX idx_outbox_claim (claim_token))
+    """)
+
+# --- Migrações de Estruturas Já Existentes ---
+
+def _ensure_column(cursor, table, column, definition):
+    """Adiciona uma coluna a uma tabela existente, caso ela ainda não exista."""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column)
+    )
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _ensure_index(cursor, table, index_name, index_ddl):
+    """Cria um índice em uma tabela existente, caso ele ainda não exista."""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, index_name)
+    )
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"ALTER TABLE {table} ADD {index_ddl}")
+
+def _apply_migrations(cursor):
+    """Atualiza bancos criados por versões anteriores do sistema."""
+    # Versão da linha para o feed incremental do painel de status das impressoras
+    _ensure_column(cursor, 'printers', 'updated_at', "TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)")
+    _ensure_index(cursor, 'printers', 'idx_printers_updated_at', "INDEX idx_printers_updated_at (updated_at)")
+    # Índices da busca paginada de utilizadores (email já é UNIQUE)
+    _ensure_index(cursor, 'users', 'idx_users_name', "INDEX idx_users_name (name)")
+    _ensure_index(cursor, 'users', 'idx_users_phone', "INDEX idx_users_phone (phone)")
+    # Busca textual nos detalhes da auditoria e paginação por data (a primeira
+    # criação do FULLTEXT reconstrói a tabela user_logs uma única vez)
+    _ensure_index(cursor, 'user_logs', 'ft_user_logs_details', "FULLTEXT INDEX ft_user_logs_details (details)")
+    _ensure_index(cursor, 'user_logs', 'idx_user_logs_timestamp', "INDEX idx_user_logs_timestamp (log_timestamp)")
+    # Referência estruturada à entidade afetada (os logs antigos são preenchidos em segundo plano)
+    _ensure_column(cursor, 'user_logs', 'entity_type', "VARCHAR(30) NULL")
+    _ensure_column(cursor, 'user_logs', 'entity_id', "VARCHAR(100) NULL")
+    _ensure_column(cursor, 'user_logs', 'changes', "JSON NULL")
+    _ensure_index(cursor, 'user_logs', 'idx_user_logs_entity', "INDEX idx_user_logs_entity (entity_type, entity_id, log_timestamp)")
+    # Senha temporária cifrada, separada do corpo dos e-mails na fila (ver outbox.py)
+    _ensure_column(cursor, 'email_outbox', 'secret', "TEXT NULL")
+
+# --- Chave de assinatura das sessões ---
+
+def _session_signing_key(conn):
+    """
+    Usa [session] secret_key do secrets.toml, se houver; senão, uma chave
+    aleatória gravada no banco na primeira execução e lida por todos os processos.
+    Também é a chave da qual deriva a cifra das senhas na fila de e-mails.
+    """
+    configured = st.secrets.get("session", {}).get("secret_key")
+    if configured:
+        return configured
+    cursor = conn.cursor()
+    cursor.execute("INSERT IGNORE INTO system_settings (setting_key, setting_value) VALUES ('session_signing_key', %s)",
+                   (secrets.token_hex(32),))
+    cursor.execute("SELECT setting_value FROM system_settings WHERE setting_key = 'session_signing_key'")
+    signing_key = cursor.fetchone()[0]
+    conn.commit()
+    cursor.close()
+    return signing_key
+
+# --- Preenchimento das entidades dos logs antigos ---
+
+def _backfill_log_entities_worker():
+    """Processa os logs antigos em lotes, com conexão própria, até não restar nenhum."""
+    try:
+        conn = open_connection()
+        while backfill_log_entities(conn):
+            pass
+        conn.close()
+    except mysql.connector.Error as err:
+        print(f"Preenchimento das entidades dos logs interrompido: {err}")
+
+def start_log_entity_backfill():
+    """Inicia o preenchimento em uma thread, para não atrasar a primeira renderização."""
+    thread = threading.Thread(target=_backfill_log_entities_worker, name="log-entities-backfill", daemon=True)
+    thread.start()
+    return thread
+
 # --- Função de Inicialização Principal ---
 
+def open_connection():
+    """
+    Abre uma nova conexão com o banco já configurado, sem verificar a estrutura.
+    Usada por tarefas em segundo plano, que não podem compartilhar a conexão da interface.
+    """
+    if "sqlite" in st.secrets:
+        return sqlite_backend.connect(st.secrets["sqlite"]["path"])
+    db_config = st.secrets["mysql"]
+    return mysql.connector.connect(host=db_config["host"], user=db_config["user"],
+                                   password=db_config["password"], database=db_config["database"])
+
+def _replica_connects(db_config):
+    """
+    Lê a lista opcional 'replica_hosts' (["host" ou "host:porta", ...]) da seção [mysql].
+    As réplicas usam o mesmo usuário, senha e banco do servidor principal.
+    """
+    connects = []
+    for address in db_config.get("replica_hosts", []):
+        host, _, port = address.partition(":")
+        connects.append((address, lambda host=host, port=int(port or 3306): mysql.connector.connect(
+            host=host, port=port, user=db_config["user"], password=db_config["password"], database=db_config["database"])))
+    return connects
+
 @st.cache_resource
 def init_connection():
     """Inicializa a conexão e garante que toda a estrutura do banco de dados exista."""
     try:
-        db_config = st.secrets["mysql"]
-        conn = mysql.connector.connect(host=db_config["host"], user=db_config["user"], password=db_config["password"])
-        cursor = conn.cursor()
-        
-        db_name = db_config["database"]
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
-        conn.database = db_name
+        if "sqlite" in st.secrets:
+            # Instalação de uma única máquina: banco embutido, criado no primeiro acesso (sem réplicas)
+            db_config = {}
+            conn = sqlite_backend.connect(st.secrets["sqlite"]["path"])
+            cursor = conn.cursor()
+        else:
+            db_config = st.secrets["mysql"]
+            conn = mysql.connector.connect(host=db_config["host"], user=db_config["user"], password=db_config["password"])
+            cursor = conn.cursor()
+
+            db_name = db_config["database"]
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+            conn.database = db_name
 
         _create_all_tables(cursor)
+        _apply_migrations(cursor)
         conn.commit()
         cursor.close()
         
@@ -76,8 +278,20 @@ def init_connection():
         create_default_admin_if_needed(conn)
         populate_initial_permissions(conn)
         populate_initial_settings(conn) # <-- NOVO
+        configure_cache_bus(open_connection)
+        configure_instrumentation(open_connection)
+        signing_key = _session_signing_key(conn)
+        configure_sessions(signing_key, open_connection)
+        configure_outbox(signing_key)
+        start_log_entity_backfill()
+
+        # Com réplicas configuradas, as leituras analíticas passam a ser roteadas para elas
+        replicas = _replica_connects(db_config)
+        if replicas:
+            conn = RoutedConnection(conn, replicas, float(db_config.get("replica_max_lag_seconds", DEFAULT_MAX_LAG_SECONDS)))
 
-        return conn
+        # Cursores instrumentados: consultas e linhas lidas entram nas métricas do rerun
+        return InstrumentedConnection(conn)
     except mysql.connector.Error as err:
         st.error(f"Erro crítico ao conectar ou configurar o MySQL: {err}")
         return None
@@ -0,0 +1,168 @@
+# --------------------------------------------------------------------------------
+# cache_bus.py (Módulo de Barramento de Invalidação de Cache)
+#
+# Descrição:
+# Mantém coerentes os caches de vários processos do Streamlit atrás de um
+# balanceador. Cada escrita publica um evento na tabela 'cache_events' (na
+# mesma transação); cada processo consulta periodicamente os eventos com id
+# maior que o último visto e executa as invalidações registradas para o tópico.
+# O processo que fez a escrita invalida os próprios caches diretamente, como antes.
+# A consulta usa uma conexão própria em autocommit, para não ficar presa ao
+# snapshot de uma transação aberta na conexão compartilhada da interface.
+# Ids do AUTO_INCREMENT podem ser gravados fora de ordem (uma transação mais
+# lenta grava um id menor depois): os ids pulados ficam pendentes e são
+# procurados de novo nas consultas seguintes, até aparecerem ou vencerem.
+# --------------------------------------------------------------------------------
+
+import os
+import socket
+import threading
+import time
+import uuid
+import mysql.connector
+
+# Intervalo mínimo entre duas consultas à tabela de eventos (em segundos)
+POLL_INTERVAL = 2.0
+# Eventos mais antigos que isso são apagados (nenhum processo ativo ainda precisa deles)
+RETENTION_HOURS = 24
+CLEANUP_INTERVAL = 3600
+# Por quanto tempo um id pulado ainda é esperado (transação aberta); depois
+# disso é descartado (ids de transações desfeitas nunca aparecem)
+GAP_TIMEOUT_SECONDS = 60
+# Saltos maiores que isso (ex.: após a limpeza dos eventos antigos) não são rastreados
+MAX_TRACKED_GAP = 1000
+
+# Identifica este processo: os eventos que ele mesmo publicou já foram aplicados localmente
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[:64]
+
+_subscribers = {}
+_lock = threading.Lock()
+_connect = None
+_bus_conn = None
+_last_seen_id = None
+_gaps = {}
+_last_poll = 0.0
+_last_cleanup = 0.0
+_metrics = {'consultas': 0, 'eventos_aplicados': 0, 'eventos_atrasados': 0,
+            'atraso_ultimo_ms': 0.0, 'atraso_max_ms': 0.0, 'atraso_total_ms': 0.0}
+
+
+def configure_cache_bus(connect):
+    """Define a função que abre a conexão própria do barramento (ex.: database.open_connection)."""
+    global _connect, _bus_conn, _last_seen_id
+    with _lock:
+        _connect = connect
+        _bus_conn = None
+        _last_seen_id = None
+        _gaps.clear()
+
+
+def subscribe(topic, callback):
+    """Registra 'callback' para ser executado quando um evento de 'topic' for recebido."""
+    with _lock:
+        _subscribers.setdefault(topic, []).append(callback)
+
+
+def publish(cursor, *topics):
+    """
+    Publica eventos de invalidação. Deve ser chamada com o cursor da escrita,
+    antes do commit, para que o evento só exista se a alteração for gravada.
+    """
+    cursor.executemany("INSERT INTO cache_events (topic, origin) VALUES (%s, %s)", [(topic, PROCESS_ID) for topic in topics])
+
+
+def _dispatch(topic):
+    for callback in _subscribers.get(topic, ()):
+        try:
+            callback()
+        except Exception as e:
+            print(f"Erro ao invalidar cache do tópico '{topic}': {e}")
+
+
+def _bus_connection():
+    global _bus_conn
+    if _bus_conn is None or not _bus_conn.is_connected():
+        _bus_conn = _connect()
+        _bus_conn.autocommit = True
+    return _bus_conn
+
+
+def poll_cache_events(force=False):
+    """
+    Aplica os eventos publicados por outros processos desde a última consulta.
+    Limitada a uma consulta a cada POLL_INTERVAL, salvo 'force'.
+    Na primeira chamada apenas registra o id atual: os caches ainda estão vazios.
+    Retorna a quantidade de eventos aplicados.
+    """
+    global _last_seen_id, _last_poll, _last_cleanup
+    if _connect is None:
+        return 0
+    now = time.monotonic()
+    if not force and now - _last_poll < POLL_INTERVAL:
+        return 0
+
+    with _lock:
+        _last_poll = now
+        try:
+            cursor = _bus_connection().cursor()
+            if _last_seen_id is None:
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM cache_events")
+                _last_seen_id = cursor.fetchone()[0]
+                cursor.close()
+                return 0
+
+            # Ids pulados que não apareceram a tempo não são mais esperados
+            for gap_id, noticed in list(_gaps.items()):
+                if now - noticed > GAP_TIMEOUT_SECONDS:
+                    del _gaps[gap_id]
+            # Relê a partir do menor id pendente; os já aplicados são ignorados abaixo.
+            # O atraso é calculado pelo próprio servidor, imune a diferenças de relógio entre máquinas
+            cursor.execute(
+                "SELECT id, topic, origin, TIMESTAMPDIFF(MICROSECOND, created_at, NOW(6)) FROM cache_events WHERE id > %s ORDER BY id",
+                (min(_gaps) - 1 if _gaps else _last_seen_id,)
+            )
+            events = cursor.fetchall()
+
+            if now - _last_cleanup > CLEANUP_INTERVAL:
+                _last_cleanup = now
+                cursor.execute(f"DELETE FROM cache_events WHERE created_at < NOW() - INTERVAL {RETENTION_HOURS} HOUR")
+            cursor.close()
+        except mysql.connector.Error as err:
+            print(f"Erro ao consultar eventos de cache: {err}")
+            return 0
+
+        _metrics['consultas'] += 1
+        applied = 0
+        for event_id, topic, origin, lag_us in events:
+            if event_id > _last_seen_id:
+                # Os ids entre o último visto e este ainda podem estar em transações abertas
+                if event_id - _last_seen_id <= MAX_TRACKED_GAP:
+                    for gap_id in range(_last_seen_id + 1, event_id):
+                        _gaps[gap_id] = now
+                _last_seen_id = event_id
+            elif _gaps.pop(event_id, None) is not None:
+                _metrics['eventos_atrasados'] += 1
+            else:
+                continue  # já aplicado em uma consulta anterior
+            if origin == PROCESS_ID:
+                continue
+            _dispatch(topic)
+            applied += 1
+            lag_ms = (lag_us or 0) / 1000
+            _metrics['eventos_aplicados'] += 1
+            _metrics['atraso_ultimo_ms'] = lag_ms
+            _metrics['atraso_max_ms'] = max(_metrics['atraso_max_ms'], lag_ms)
+            _metrics['atraso_total_ms'] += lag_ms
+        return applied
+
+
+def get_cache_bus_metrics():
+    """Consultas feitas, eventos aplicados e atraso de propagação (último, máximo e médio)."""
+    with _lock:
+        metrics = dict(_metrics)
+        metrics['ultimo_id'] = _last_seen_id
+        metrics['ids_pendentes'] = len(_gaps)
+        metrics['topicos'] = sorted(_subscribers)
+    applied = metrics.pop('atraso_total_ms')
+    metrics['atraso_medio_ms'] = round(applied / metrics['eventos_aplicados'], 3) if metrics['eventos_aplicados'] else 0.0
+    return metrics
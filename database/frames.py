@@ -0,0 +1,134 @@
+# --------------------------------------------------------------------------------
+# frames.py (Módulo de Leitura Colunar de Resultados)
+#
+# Descrição:
+# Substitui o pd.read_sql sobre a conexão DBAPI crua (caminho não suportado
+# pelo pandas, que emite avisos e monta tuplas Python linha a linha). O cursor
+# é aberto em modo raw (bytes, sem conversão por valor no conector) e cada
+# coluna é convertida de uma vez pelo Arrow, com o tipo explícito do esquema
+# conhecido. Sem pyarrow instalado, usa o cursor comum e aplica os mesmos tipos.
+# --------------------------------------------------------------------------------
+
+import importlib.util
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Tipos de coluna aceitos nos esquemas:
+#   'int'      inteiro sem nulos (int64)        'Int64'  inteiro que pode ser nulo
+#   'float'    float64                          'bool'   booleano (TINYINT/BOOLEAN)
+#   'str'      texto (tipo 'str' do pandas)     'datetime' datetime64[us]
+#   'category' texto de poucos valores distintos (códigos inteiros + dicionário)
+
+USERS_SCHEMA = {'id': 'int', 'name': 'str', 'phone': 'str', 'email': 'str',
+                'permission_level': 'str', 'status': 'str'}
+SECTORS_SCHEMA = {'id': 'int', 'location_tower': 'str', 'location_floor': 'str', 'sector_name': 'str',
+                  'cost_center': 'str', 'manager_name': 'str', 'manager_contact': 'str', 'status': 'str'}
+PRINTERS_SCHEMA = {'id': 'int', 'unidade': 'str', 'fabricante': 'str', 'modelo': 'str', 'localizacao': 'str',
+                   'setor': 'str', 'patrimonio': 'str', 'nome': 'str', 'host': 'str', 'endereco_ip': 'str',
+                   'status': 'str', 'status_detalhado': 'str', 'toner_preto': 'Int64', 'toner_ciano': 'Int64',
+                   'toner_magenta': 'Int64', 'toner_amarelo': 'Int64', 'contagem_paginas': 'Int64',
+                   'ultima_verificacao': 'datetime', 'updated_at': 'datetime'}
+PERMISSIONS_SCHEMA = {'page_name': 'str', 'permission_level': 'str', 'can_access': 'bool'}
+LOGS_SCHEMA = {'Data e Hora': 'datetime', 'Tipo de Ação': 'category', 'Detalhes': 'str',
+               'Nome do Usuário': 'category', 'Email do Usuário': 'category'}
+
+
+def _arrow_target(kind):
+    return {
+        'int': pa.int64(), 'Int64': pa.int64(), 'float': pa.float64(), 'bool': pa.int8(),
+        'str': pa.string(), 'datetime': pa.timestamp('us'),
+    }.get(kind, pa.string())
+
+
+def _arrow_column(values, kind):
+    """Converte uma coluna de bytes (modo raw) para um array Arrow do tipo pedido."""
+    array = pa.array(values, type=pa.binary()).cast(pa.string())
+    target = _arrow_target(kind)
+    if kind == 'datetime':
+        # A data zero do MySQL ('0000-00-00 ...') vira None no conector; aqui vira nulo
+        zero_date = pc.starts_with(array, '0000-00-00')
+        array = pc.if_else(zero_date, pa.scalar(None, pa.string()), array)
+    if target != pa.string():
+        array = array.cast(target)
+    if kind == 'bool':
+        array = array.cast(pa.bool_())
+    if kind == 'category':
+        array = array.dictionary_encode()
+    return array
+
+
+def _to_pandas(array, kind, arrow):
+    if arrow:
+        return pd.arrays.ArrowExtensionArray(array)
+    if kind == 'int' and array.null_count == 0:
+        return array.to_numpy()
+    if kind in ('int', 'Int64'):
+        return pd.array(array.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get))
+    if kind == 'bool' and array.null_count:
+        return pd.array(array.to_pandas(types_mapper={pa.bool_(): pd.BooleanDtype()}.get))
+    if kind == 'str':
+        return pd.array(array.to_pandas(), dtype='str')
+    return array.to_pandas()
+
+
+_PANDAS_DTYPES = {'int': 'int64', 'Int64': 'Int64', 'float': 'float64', 'bool': 'bool',
+                  'str': 'str', 'datetime': 'datetime64[us]', 'category': 'category'}
+
+
+def _read_frame_rows(conn, query, params, schema):
+    """Caminho sem pyarrow: cursor comum, DataFrame a partir das tuplas e tipos explícitos."""
+    cursor = conn.cursor()
+    cursor.execute(query, params or ())
+    names = [column[0] for column in cursor.description]
+    rows = cursor.fetchall()
+    cursor.close()
+    df = pd.DataFrame.from_records(rows, columns=names)
+    dtypes = {name: _PANDAS_DTYPES[kind] for name, kind in schema.items() if name in df.columns}
+    # Como no caminho Arrow, 'int' e 'bool' com NULL viram as versões anuláveis
+    for name, dtype in dtypes.items():
+        if dtype in ('int64', 'bool') and df[name].isna().any():
+            dtypes[name] = 'Int64' if dtype == 'int64' else 'boolean'
+    return df.astype(dtypes)
+
+
+def read_frame(conn, query, params=None, schema=None, arrow=False):
+    """
+    Executa 'query' e retorna um DataFrame com os tipos de 'schema'
+    ({coluna: tipo}; colunas fora do esquema viram texto). Com arrow=True,
+    as colunas ficam em memória Arrow (pd.ArrowDtype), sem cópia para NumPy.
+    """
+    schema = schema or {}
+    if not HAS_ARROW:
+        return _read_frame_rows(conn, query, params, schema)
+
+    cursor = conn.cursor(raw=True)
+    cursor.execute(query, params or ())
+    names = [column[0] for column in cursor.description]
+    rows = cursor.fetchall()
+    cursor.close()
+
+    columns = zip(*rows) if rows else ([] for _ in names)
+    data = {}
+    for name, values in zip(names, columns):
+        kind = schema.get(name, 'str')
+        data[name] = _to_pandas(_arrow_column(values, kind), kind, arrow)
+    return pd.DataFrame(data, columns=names)
+
+
+def frame_memory_report(df):
+    """Bytes ocupados por coluna e por linha (memory_usage com deep=True, inclui o texto)."""
+    usage = df.memory_usage(index=True, deep=True)
+    rows = max(len(df), 1)
+    return {
+        'linhas': len(df),
+        'bytes_total': int(usage.sum()),
+        'bytes_por_linha': round(usage.sum() / rows, 1),
+        'colunas': {str(column): {'dtype': str(df[column].dtype) if column in df else 'índice',
+                                  'bytes_por_linha': round(size / rows, 1)}
+                    for column, size in usage.items()},
+    }
@@ -0,0 +1,448 @@
+# --------------------------------------------------------------------------------
+# instrumentation.py (Módulo de Instrumentação de Desempenho)
+#
+# Descrição:
+# Mede onde o tempo de cada rerun do app.py é gasto: tempo total, tempo e
+# número de chamadas de cada função do pacote 'database', consultas SQL
+# executadas e linhas lidas, e a página renderizada. Cada rerun vira um
+# registro em um buffer circular do processo (opcionalmente gravado em lotes
+# na tabela 'perf_reruns'), exibido na página de Desempenho.
+# Todo comando SQL também é agregado por assinatura (literais removidos) e os
+# que passam do limite de tempo são gravados em 'slow_queries' com o EXPLAIN.
+# As gravações usam uma conexão própria: a conexão compartilhada da interface
+# pode ter a transação de outra sessão em andamento, que não pode ser
+# confirmada nem desfeita daqui.
+# O custo é de alguns microssegundos por chamada, para poder ficar ligado em produção.
+# --------------------------------------------------------------------------------
+
+import functools
+import hashlib
+import heapq
+import json
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import mysql.connector
+
+# Quantidade de reruns mantidos em memória
+BUFFER_SIZE = 2000
+# Consultas mais lentas guardadas por rerun
+SLOWEST_PER_RERUN = 5
+# Registros acumulados antes de uma gravação em lote na tabela 'perf_reruns'
+PERSIST_BATCH_SIZE = 50
+
+# Comandos acima deste tempo são capturados com parâmetros e EXPLAIN
+SLOW_QUERY_THRESHOLD_MS = 200.0
+# Amostras recentes por assinatura usadas no cálculo do p95
+FINGERPRINT_SAMPLES = 512
+# Capturas lentas aguardando gravação (o excesso é descartado)
+MAX_PENDING_SLOW = 100
+# Comandos com dados sensíveis: os parâmetros não são gravados
+_SENSITIVE = re.compile(r"password|email_outbox", re.IGNORECASE)
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE")
+
+_buffer = deque(maxlen=BUFFER_SIZE)
+_pending = []
+_pending_lock = threading.Lock()
+_local = threading.local()
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+_pending_slow = []
+_connect = None
+_metrics_conn = None
+_metrics_conn_lock = threading.Lock()
+
+
+def configure_instrumentation(connect):
+    """
+    Define a função que abre a conexão própria da gravação das métricas (ex.:
+    database.open_connection). Sem ela, grava na conexão recebida.
+    """
+    global _connect, _metrics_conn
+    with _metrics_conn_lock:
+        _connect = connect
+        _metrics_conn = None
+
+
+def _metrics_connection(conn):
+    """Conexão das gravações; chamada com _metrics_conn_lock adquirido."""
+    global _metrics_conn
+    if _connect is None:
+        return _unwrap(conn)
+    if _metrics_conn is None or not _metrics_conn.is_connected():
+        _metrics_conn = _connect()
+    return _metrics_conn
+
+
+class RerunRecord:
+    """Medições de um rerun; preenchido pelos wrappers enquanto o script executa."""
+
+    __slots__ = ('started_at', 'started', 'page', 'wall_ms', 'db_ms', 'queries', 'rows', 'calls', 'slowest', '_depth')
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.page = None
+        self.wall_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.calls = {}
+        self.slowest = []
+        self._depth = 0
+
+    def add_query(self, elapsed_ms, statement):
+        self.queries += 1
+        entry = (elapsed_ms, statement)
+        if len(self.slowest) < SLOWEST_PER_RERUN:
+            heapq.heappush(self.slowest, entry)
+        elif elapsed_ms > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def as_dict(self):
+        return {
+            'inicio': self.started_at,
+            'pagina': self.page or 'login',
+            'total_ms': self.wall_ms,
+            'banco_ms': self.db_ms,
+            'consultas': self.queries,
+            'linhas': self.rows,
+            'chamadas': self.calls,
+            'consultas_lentas': sorted(self.slowest, reverse=True),
+        }
+
+
+def _current():
+    return getattr(_local, 'record', None)
+
+
+@contextmanager
+def track_rerun():
+    """Envolve um rerun completo do app.py (inclusive quando termina por st.rerun/st.stop)."""
+    record = RerunRecord()
+    _local.record = record
+    try:
+        yield record
+    finally:
+        _local.record = None
+        record.wall_ms = (time.perf_counter() - record.started) * 1000
+        data = record.as_dict()
+        _buffer.append(data)
+        with _pending_lock:
+            _pending.append(data)
+            del _pending[:-BUFFER_SIZE]
+
+
+def instrument(func, name=None):
+    """Envolve uma função do pacote 'database', somando tempo e chamadas no rerun atual."""
+    name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        record = _current()
+        if record is None:
+            return func(*args, **kwargs)
+        record._depth += 1
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            record._depth -= 1
+            stats = record.calls.get(name)
+            if stats is None:
+                record.calls[name] = [1, elapsed_ms]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed_ms
+            # Chamadas aninhadas já estão contidas no tempo da chamada externa
+            if record._depth == 0:
+                record.db_ms += elapsed_ms
+
+    # Funções com st.cache_data: mantém .clear() acessível pelo wrapper
+    if hasattr(func, 'clear'):
+        wrapper.clear = func.clear
+    return wrapper
+
+
+def instrument_page(func, page_name):
+    """Envolve uma função show_*_page, registrando qual página o rerun renderizou."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        record = _current()
+        if record is not None:
+            record.page = page_name
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+# --- Assinaturas de consultas ---
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(statement):
+    """
+    Normaliza um comando SQL para agregação: remove literais (texto e números),
+    reduz listas de parâmetros 'IN (%s, %s, ...)' a '(...)' e espaços repetidos.
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(...)", normalized.replace("%s", "?"))
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+class QueryStats:
+    __slots__ = ('count', 'total_ms', 'max_ms', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=FINGERPRINT_SAMPLES)
+
+    def add(self, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        self.samples.append(elapsed_ms)
+
+    def p95(self):
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def _record_statement(statement, params, elapsed_ms, many=False):
+    statement = str(statement)
+    key = fingerprint(statement)
+    with _fingerprints_lock:
+        stats = _fingerprints.get(key)
+        if stats is None:
+            stats = _fingerprints[key] = QueryStats()
+        stats.add(elapsed_ms)
+
+    record = _current()
+    if record is not None:
+        record.add_query(elapsed_ms, key[:300])
+
+    if elapsed_ms >= SLOW_QUERY_THRESHOLD_MS:
+        if _SENSITIVE.search(statement):
+            params_text = "[omitidos]"
+        elif many:
+            params_text = f"[{len(params) if params is not None else 0} linhas em lote]"
+        else:
+            params_text = repr(params)[:2000]
+        capture = {
+            'fingerprint': key, 'statement': statement, 'params': None if many else params,
+            'params_text': params_text, 'duration_ms': elapsed_ms,
+            'page': record.page if record is not None else None, 'many': many,
+        }
+        with _fingerprints_lock:
+            if len(_pending_slow) < MAX_PENDING_SLOW:
+                _pending_slow.append(capture)
+
+
+def get_query_fingerprint_stats():
+    """Estatísticas por assinatura: contagem, tempo total, médio, máximo e p95 (ms)."""
+    with _fingerprints_lock:
+        items = [(key, stats.count, stats.total_ms, stats.max_ms, stats.p95()) for key, stats in _fingerprints.items()]
+    return [
+        {'assinatura': key, 'execucoes': count, 'total_ms': total_ms, 'medio_ms': total_ms / count,
+         'max_ms': max_ms, 'p95_ms': p95}
+        for key, count, total_ms, max_ms, p95 in sorted(items, key=lambda item: -item[2])
+    ]
+
+
+def _explain(cursor, capture):
+    if capture['many'] or not capture['statement'].lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    cursor.execute("EXPLAIN " + capture['statement'], capture['params'] or ())
+    columns = [column[0] for column in cursor.description]
+    return json.dumps([dict(zip(columns, row)) for row in cursor.fetchall()], default=str)
+
+
+def flush_slow_queries(conn):
+    """
+    Grava em 'slow_queries' as capturas pendentes, com o EXPLAIN de cada uma.
+    Executada fora da consulta lenta (início do rerun seguinte), na conexão
+    própria das métricas (ver configure_instrumentation).
+    """
+    with _fingerprints_lock:
+        if not _pending_slow:
+            return 0
+        batch = _pending_slow[:]
+        _pending_slow.clear()
+    with _metrics_conn_lock:
+        try:
+            conn = _metrics_connection(conn)
+        except mysql.connector.Error as err:
+            print(f"Erro ao gravar consultas lentas: {err}")
+            return 0
+        try:
+            cursor = conn.cursor()
+            rows = []
+            for capture in batch:
+                try:
+                    plan = _explain(cursor, capture)
+                except mysql.connector.Error as err:
+                    plan = json.dumps({'erro': str(err)})
+                rows.append((hashlib.md5(capture['fingerprint'].encode('utf-8')).hexdigest(), capture['fingerprint'][:2000],
+                             capture['statement'][:10000], capture['params_text'], round(capture['duration_ms'], 3),
+                             capture['page'], plan))
+            cursor.executemany(
+                "INSERT INTO slow_queries (fingerprint_hash, fingerprint, statement, params, duration_ms, page, explain_plan) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)", rows
+            )
+            conn.commit()
+            cursor.close()
+            return len(rows)
+        except mysql.connector.Error as err:
+            conn.rollback()
+            print(f"Erro ao gravar consultas lentas: {err}")
+            return 0
+
+
+def get_slow_queries(conn, limit=50):
+    """Últimas consultas lentas capturadas (sem o plano, que é lido sob demanda)."""
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT id, captured_at, page, duration_ms, fingerprint, params, explain_plan FROM slow_queries "
+            "ORDER BY id DESC LIMIT %s", (int(limit),)
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    except mysql.connector.Error as err:
+        print(f"Erro ao buscar consultas lentas: {err}")
+        return []
+
+
+class InstrumentedCursor:
+    """Cursor que conta consultas, linhas lidas e o tempo de cada execução."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+        return False
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            _record_statement(operation, params, (time.perf_counter() - started) * 1000)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            _record_statement(operation, seq_params, (time.perf_counter() - started) * 1000, many=True)
+
+    def _count(self, rows):
+        record = _current()
+        if record is not None and rows:
+            record.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        record = _current()
+        if record is not None and row is not None:
+            record.rows += 1
+        return row
+
+
+class InstrumentedConnection:
+    """Conexão cujos cursores são instrumentados; o resto é repassado à conexão real."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def reader(self):
+        inner_reader = getattr(self._conn, 'reader', None)
+        return InstrumentedConnection(inner_reader()) if inner_reader else self
+
+
+def _unwrap(conn):
+    """Conexão real, para que a gravação das métricas não seja medida ela própria."""
+    while isinstance(conn, InstrumentedConnection):
+        conn = conn._conn
+    return conn
+
+
+def get_perf_records():
+    """Cópia dos registros de reruns em memória (mais antigos primeiro)."""
+    return list(_buffer)
+
+
+def flush_perf_records(conn, force=False):
+    """
+    Grava em lote na tabela 'perf_reruns' os registros acumulados desde a
+    última gravação, na conexão própria das métricas.
+    """
+    with _pending_lock:
+        if not _pending or (len(_pending) < PERSIST_BATCH_SIZE and not force):
+            return 0
+        batch = _pending[:]
+        _pending.clear()
+    rows = [(r['pagina'], round(r['total_ms'], 3), round(r['banco_ms'], 3), r['consultas'], r['linhas'],
+             time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(r['inicio']))) for r in batch]
+    with _metrics_conn_lock:
+        try:
+            conn = _metrics_connection(conn)
+        except mysql.connector.Error as err:
+            print(f"Erro ao gravar métricas de desempenho: {err}")
+            return 0
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT INTO perf_reruns (page, wall_ms, db_ms, query_count, rows_fetched, recorded_at) VALUES (%s, %s, %s, %s, %s, %s)",
+                rows
+            )
+            conn.commit()
+            cursor.close()
+            return len(rows)
+        except mysql.connector.Error as err:
+            conn.rollback()
+            print(f"Erro ao gravar métricas de desempenho: {err}")
+            return 0
+
+
+def discard_pending_perf_records():
+    """Descarta os registros ainda não gravados (persistência desligada)."""
+    with _pending_lock:
+        _pending.clear()
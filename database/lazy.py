@@ -0,0 +1,36 @@
+# --------------------------------------------------------------------------------
+# lazy.py (Módulo de Importação Sob Demanda)
+#
+# Descrição:
+# Adia a importação de dependências pesadas (ex.: pandas, ~0,5 s) até o
+# primeiro uso. O formulário de login não usa DataFrames, então um visitante
+# anônimo não paga esse custo na partida do processo.
+# --------------------------------------------------------------------------------
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Substituto de um módulo que só o importa no primeiro acesso a um atributo.
+    A importação passa pelo importlib (protegido pelo lock de importação do
+    Python), então é segura com várias sessões em threads diferentes.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._lazy_name = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._lazy_name)
+        value = getattr(module, attr)
+        # Guarda o atributo para que os próximos acessos não passem por aqui
+        setattr(self, attr, value)
+        return value
+
+
+def lazy_import(name):
+    """Retorna o módulo 'name' já carregado ou um LazyModule que o carrega no primeiro uso."""
+    return sys.modules.get(name) or LazyModule(name)
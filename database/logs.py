@@ -5,15 +5,53 @@
 # Contém as funções para registrar e buscar registros da trilha de auditoria.
 # --------------------------------------------------------------------------------
 
+import json
+import re
 import mysql.connector
-import pandas as pd
+from .lazy import lazy_import
+from .routing import reader
+from .frames import read_frame, LOGS_SCHEMA
+from .read_cache import bump_table_version, cached_read
+from .statements import STATEMENTS, run_statement
+from .sqlite_backend import is_sqlite
 
-def log_action(conn, performing_user_id, action_type, details):
-    """Registra uma ação na tabela de logs."""
+pd = lazy_import("pandas")
+
+# Tipos de entidade referenciados pelos logs (colunas entity_type/entity_id)
+ENTITY_USER = 'user'
+ENTITY_PRINTER = 'printer'
+ENTITY_SECTOR = 'sector'
+ENTITY_SETTING = 'setting'
+ENTITY_PAGE_PERMISSION = 'page_permission'
+
+def log_row(performing_user_id, action_type, details, entity_type=None, entity_id=None, changes=None):
+    """Monta a tupla de um registro de log na ordem das colunas usadas por insert_log_rows."""
+    payload = json.dumps(changes, ensure_ascii=False, default=str) if changes else None
+    return (performing_user_id, action_type, details, entity_type,
+            None if entity_id is None else str(entity_id), payload)
+
+def insert_log_rows(cursor, rows):
+    """
+    Grava registros de log (tuplas de log_row) com o cursor informado, em um
+    único INSERT de várias linhas, e incrementa a versão de 'user_logs'. Não
+    faz commit: os logs entram na mesma transação da alteração que descrevem.
+    """
+    cursor.executemany(STATEMENTS['log_action'][0], rows)
+    bump_table_version(cursor, 'user_logs')
+
+def log_action(conn, performing_user_id, action_type, details, entity_type=None, entity_id=None, changes=None):
+    """
+    Registra, em uma transação própria, uma ação que não altera outros dados
+    (ex.: login e logout). 'entity_type'/'entity_id' identificam o registro
+    afetado (colunas indexadas, para o histórico por entidade) e 'changes' é um
+    dicionário opcional com os campos gravados, salvo como JSON. Alterações de
+    dados registram o log pela unidade de trabalho (ver unit_of_work.py).
+    """
     try:
+        # Instrução preparada: um login ou logout a cada poucos segundos em horário de pico
+        run_statement(conn, 'log_action', log_row(performing_user_id, action_type, details, entity_type, entity_id, changes))
         cursor = conn.cursor()
-        query = "INSERT INTO user_logs (performing_user_id, action_type, details) VALUES (%s, %s, %s)"
-        cursor.execute(query, (performing_user_id, action_type, details))
+        bump_table_version(cursor, 'user_logs')
         conn.commit()
         cursor.close()
     except mysql.connector.Error as err:
@@ -24,8 +62,11 @@ def log_action(conn, performing_user_id, action_type, details):
 def get_all_logs(conn):
     """
     Busca todos os registros de log, unindo com a tabela de usuários para
-    obter o nome e email do autor da ação.
+    obter o nome e email do autor da ação. Ação, nome e email vêm como
+    categorias e a data como datetime64; o DataFrame é compartilhado entre as
+    sessões pelo cache de leitura e não deve ser alterado no lugar.
     """
+    conn = reader(conn)
     try:
         # A query usa LEFT JOIN para garantir que logs de usuários deletados ainda apareçam
         query = """
@@ -42,8 +83,176 @@ def get_all_logs(conn):
             ORDER BY
                 l.log_timestamp DESC
         """
-        return pd.read_sql(query, conn)
+        return cached_read(conn, ('user_logs', 'users'), 'get_all_logs',
+                           lambda: read_frame(conn, query, schema=LOGS_SCHEMA))
     except mysql.connector.Error as err:
         print(f"Erro ao buscar logs: {err}")
         return pd.DataFrame()
 
+
+# Tamanho mínimo de palavra indexada pelo FULLTEXT do InnoDB (innodb_ft_min_token_size)
+FT_MIN_TOKEN_SIZE = 3
+# Lista de palavras ignoradas padrão do InnoDB: exigi-las com '+' não encontraria nada
+FT_STOPWORDS = frozenset((
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how', 'i', 'in',
+    'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what', 'when', 'where', 'who',
+    'will', 'with', 'und', 'www',
+))
+
+def _fulltext_query(term):
+    """
+    Converte o termo digitado em uma busca booleana que exige todas as palavras
+    indexáveis (ex.: "x@empresa.com" -> '+"empresa"'). Retorna None quando nenhuma
+    palavra do termo está no índice (ex.: "RH-01"); nesse caso só o LIKE se aplica.
+    """
+    words = [word for word in re.findall(r"\w+", term.lower())
+             if len(word) >= FT_MIN_TOKEN_SIZE and word not in FT_STOPWORDS]
+    return " ".join(f'+"{word}"' for word in words) or None
+
+def search_logs(conn, search_term, user_name=None, action_type=None, start=None, end=None, limit=50, offset=0):
+    """
+    Busca paginada nos detalhes da trilha de auditoria, com os mesmos filtros
+    da página (usuário, ação e período). O índice FULLTEXT de 'details' reduz
+    as linhas candidatas (MATCH ... AGAINST) e o LIKE confirma o termo exato,
+    já que o índice separa "RH-01" ou "x@y.com" em palavras (no SQLite, que não
+    tem FULLTEXT, só o LIKE é usado). Com limit=None retorna todos os
+    resultados. Retorna (DataFrame da página, total).
+    """
+    conn = reader(conn)
+    conditions = ["l.details LIKE %s"]
+    params = ["%" + search_term.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"]
+    # O SQLite embutido não tem índice FULLTEXT: lá a busca é só pelo LIKE
+    boolean_query = None if is_sqlite(conn) else _fulltext_query(search_term)
+    if boolean_query:
+        conditions.insert(0, "MATCH(l.details) AGAINST (%s IN BOOLEAN MODE)")
+        params.insert(0, boolean_query)
+    if user_name:
+        conditions.append("u.name = %s")
+        params.append(user_name)
+    if action_type:
+        conditions.append("l.action_type = %s")
+        params.append(action_type)
+    if start is not None:
+        conditions.append("l.log_timestamp >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("l.log_timestamp <= %s")
+        params.append(end)
+
+    base = " FROM user_logs l LEFT JOIN users u ON l.performing_user_id = u.id WHERE " + " AND ".join(conditions)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*)" + base, params)
+        total = cursor.fetchone()[0]
+        cursor.close()
+
+        query = """
+            SELECT l.log_timestamp AS 'Data e Hora', l.action_type AS 'Tipo de Ação', l.details AS 'Detalhes',
+                   u.name AS 'Nome do Usuário', u.email AS 'Email do Usuário'
+        """ + base + " ORDER BY l.log_timestamp DESC, l.id DESC"
+        if limit is not None:
+            query += " LIMIT %s OFFSET %s"
+            params = params + [int(limit), int(offset)]
+        return read_frame(conn, query, params, schema=LOGS_SCHEMA), total
+    except mysql.connector.Error as err:
+        print(f"Erro ao buscar nos logs: {err}")
+        return pd.DataFrame(), 0
+
+# --- Referências estruturadas a entidades (histórico por entidade) ---
+
+# Frases gravadas em 'details' antes das colunas entity_type/entity_id, por ação:
+# (tipo de entidade, expressão com o grupo 'id' e, opcionalmente, campos alterados)
+_LEGACY_DETAIL_PATTERNS = {
+    'USER_CREATED': (ENTITY_USER, r"criou o novo utilizador '(?P<email>.*)' \(ID: (?P<id>\d+)\)"),
+    'USER_LOGIN': (ENTITY_USER, r"\(ID: (?P<id>\d+)\) efetuou login"),
+    'USER_LOGOUT': (ENTITY_USER, r"\(ID: (?P<id>\d+)\) efetuou logout"),
+    'USER_STATUS_CHANGED': (ENTITY_USER, r"status do usuário \(ID: (?P<id>\d+)\) para '(?P<status>[^']*)'"),
+    'PASSWORD_CHANGED': (ENTITY_USER, r"\(ID: (?P<id>\d+)\) alterou a própria senha"),
+    'PASSWORD_RESET_REQUESTED': (ENTITY_USER, r"para o utilizador '.*' \(ID: (?P<id>\d+)\)"),
+    'USER_DATA_UPDATED': (ENTITY_USER, r"dados do usuário \(ID: (?P<id>\d+)\)\. Novos dados: Nome='(?P<name>.*)', "
+                                       r"Telefone='(?P<phone>.*)', Email='(?P<email>.*)', Permissão='(?P<permission_level>.*)'\.$"),
+    'PRINTER_CREATED': (ENTITY_PRINTER, r"a impressora '.*' \(ID: (?P<id>\d+)\)"),
+    'PRINTER_UPDATED': (ENTITY_PRINTER, r"a impressora '.*' \(ID: (?P<id>\d+)\)"),
+    'SECTOR_CREATED': (ENTITY_SECTOR, r"o setor '.*' \(ID: (?P<id>\d+)\)"),
+    'SECTOR_UPDATED': (ENTITY_SECTOR, r"o setor '.*' \(ID: (?P<id>\d+)\)"),
+    'SECTOR_STATUS_CHANGED': (ENTITY_SECTOR, r"o setor '.*' \(ID: (?P<id>\d+)\) para '(?P<status>[^']*)'"),
+    'SETTING_UPDATED': (ENTITY_SETTING, r"a configuração '(?P<id>[^']*)'"),
+    'PERMISSION_CHANGED': (ENTITY_PAGE_PERMISSION,
+                           r"do nível '(?P<level>[^']*)' à página '(?P<page>[^']*)' para '(?P<access>[^']*)'"),
+}
+_LEGACY_DETAIL_REGEXES = {action: (entity_type, re.compile(pattern))
+                          for action, (entity_type, pattern) in _LEGACY_DETAIL_PATTERNS.items()}
+
+BACKFILL_KEY = 'user_logs_entities'
+
+def parse_log_entity(action_type, details):
+    """Extrai (entity_type, entity_id, changes) da frase de um log antigo, ou (None, None, None)."""
+    entry = _LEGACY_DETAIL_REGEXES.get(action_type)
+    match = entry[1].search(details or "") if entry else None
+    if not match:
+        return None, None, None
+    fields = match.groupdict()
+    if entry[0] == ENTITY_PAGE_PERMISSION:
+        return entry[0], f"{fields['page']}:{fields['level']}", {'can_access': fields['access'] == "CONCEDIDO"}
+    entity_id = fields.pop('id')
+    return entry[0], entity_id, fields or None
+
+def backfill_log_entities(conn, batch_size=5000):
+    """
+    Preenche entity_type/entity_id/changes de um lote de logs antigos (id acima
+    da marca d'água em 'maintenance_state'), interpretando a frase de 'details'.
+    Retorna quantos logs foram lidos; 0 quando não há mais nada a processar.
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute("INSERT IGNORE INTO maintenance_state (state_key, state_value) VALUES (%s, 0)", (BACKFILL_KEY,))
+        cursor.execute("SELECT state_value FROM maintenance_state WHERE state_key = %s FOR UPDATE", (BACKFILL_KEY,))
+        watermark = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT id, action_type, details, entity_type FROM user_logs WHERE id > %s ORDER BY id LIMIT %s",
+            (watermark, batch_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            cursor.close()
+            return 0
+
+        updates = []
+        for log_id, action_type, details, entity_type in rows:
+            if entity_type is not None:
+                continue  # gravado já com as colunas estruturadas
+            entity_type, entity_id, changes = parse_log_entity(action_type, details)
+            if entity_type:
+                payload = json.dumps(changes, ensure_ascii=False) if changes else None
+                updates.append((entity_type, entity_id, payload, log_id))
+        if updates:
+            cursor.executemany("UPDATE user_logs SET entity_type = %s, entity_id = %s, changes = %s WHERE id = %s", updates)
+            bump_table_version(cursor, 'user_logs')
+        cursor.execute("UPDATE maintenance_state SET state_value = %s WHERE state_key = %s", (rows[-1][0], BACKFILL_KEY))
+        conn.commit()
+        cursor.close()
+        return len(rows)
+    except mysql.connector.Error as err:
+        print(f"Erro no preenchimento das entidades dos logs: {err}")
+        conn.rollback()
+        return 0
+
+def get_entity_history(conn, entity_type, entity_id, limit=200):
+    """Histórico de uma entidade, mais recente primeiro (busca pelo índice de entity_type/entity_id)."""
+    conn = reader(conn)
+    query = """
+        SELECT l.log_timestamp AS 'Data e Hora', l.action_type AS 'Tipo de Ação', l.details AS 'Detalhes',
+               u.name AS 'Nome do Usuário', l.changes AS 'Alterações'
+        FROM user_logs l
+        LEFT JOIN users u ON l.performing_user_id = u.id
+        WHERE l.entity_type = %s AND l.entity_id = %s
+        ORDER BY l.log_timestamp DESC, l.id DESC
+        LIMIT %s
+    """
+    try:
+        return read_frame(conn, query, (entity_type, str(entity_id), int(limit)),
+                          schema={'Data e Hora': 'datetime', 'Tipo de Ação': 'category', 'Nome do Usuário': 'category'})
+    except mysql.connector.Error as err:
+        print(f"Erro ao buscar o histórico da entidade: {err}")
+        return pd.DataFrame()
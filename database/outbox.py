@@ -0,0 +1,156 @@
+# --------------------------------------------------------------------------------
+# outbox.py (Módulo da Fila de Saída de E-mails)
+#
+# Descrição:
+# Fila durável de e-mails ('email_outbox'). As páginas apenas enfileiram as
+# mensagens; o remetente em segundo plano (utils/email_utils.py) reserva,
+# envia e registra o resultado de cada uma, com novas tentativas e backoff.
+# Senhas temporárias não são gravadas no corpo: ele guarda o modelo com o
+# marcador {senha} e a senha fica cifrada (Fernet) na coluna 'secret', só
+# decifrada na reserva para envio e descartada ao enviar ou falhar.
+# --------------------------------------------------------------------------------
+
+import base64
+import hashlib
+import uuid
+import mysql.connector
+from cryptography.fernet import Fernet, InvalidToken
+
+# Reservas mais antigas que isso são consideradas abandonadas (processo encerrado no meio do envio)
+CLAIM_TIMEOUT_MINUTES = 10
+# Marcador do corpo substituído pela senha no momento do envio
+SECRET_PLACEHOLDER = "{senha}"
+
+_fernet = None
+
+
+def configure_outbox(secret_key):
+    """Define a chave da qual é derivada a cifra das senhas na fila (chamada uma vez na inicialização)."""
+    global _fernet
+    if isinstance(secret_key, str):
+        secret_key = secret_key.encode('utf-8')
+    _fernet = Fernet(base64.urlsafe_b64encode(hashlib.sha256(b"email_outbox:" + secret_key).digest()))
+
+def _encrypt(secret):
+    if secret is None:
+        return None
+    if _fernet is None:
+        raise RuntimeError("Fila de e-mails sem chave configurada (configure_outbox)")
+    return _fernet.encrypt(secret.encode('utf-8')).decode('ascii')
+
+def enqueue_email(conn, recipient, subject, body, secret=None):
+    """
+    Adiciona uma mensagem à fila de saída. Retorna True em caso de sucesso.
+    Com 'secret', o corpo deve conter o marcador {senha}.
+    """
+    return enqueue_emails(conn, [(recipient, subject, body, secret)])
+
+def enqueue_emails(conn, messages):
+    """
+    Adiciona várias mensagens (tuplas destinatário, assunto, corpo e, opcionalmente,
+    a senha do marcador {senha}) à fila em uma única transação.
+    """
+    if not messages:
+        return True
+    try:
+        rows = [(recipient, subject, body, _encrypt(secret[0] if secret else None))
+                for recipient, subject, body, *secret in messages]
+    except RuntimeError as err:
+        print(f"Erro ao enfileirar e-mail: {err}")
+        return False
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO email_outbox (recipient, subject, body, secret) VALUES (%s, %s, %s, %s)",
+            rows
+        )
+        conn.commit()
+        cursor.close()
+        return True
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"Erro ao enfileirar e-mail: {err}")
+        return False
+
+def claim_due_emails(conn, limit=50):
+    """
+    Reserva atomicamente até 'limit' mensagens prontas para envio e as retorna,
+    com a senha já decifrada em 'secret'. A reserva por token evita que dois
+    processos enviem a mesma mensagem.
+    """
+    token = uuid.uuid4().hex
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"""
+            UPDATE email_outbox SET status = 'enviando', claim_token = %s, claimed_at = NOW()
+            WHERE (status = 'pendente' AND next_attempt_at <= NOW())
+               OR (status = 'enviando' AND claimed_at < NOW() - INTERVAL {CLAIM_TIMEOUT_MINUTES} MINUTE)
+            ORDER BY id
+            LIMIT %s
+        """, (token, limit))
+        conn.commit()
+        cursor.execute(
+            "SELECT id, recipient, subject, body, secret, attempts FROM email_outbox WHERE claim_token = %s AND status = 'enviando' ORDER BY id",
+            (token,)
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"Erro ao reservar e-mails da fila: {err}")
+        return []
+
+    claimed = []
+    for row in rows:
+        if row['secret'] is not None:
+            try:
+                row['secret'] = _fernet.decrypt(row['secret'].encode('ascii')).decode('utf-8')
+            except (InvalidToken, AttributeError):
+                # Chave trocada (ou não configurada) desde o enfileiramento: a senha é irrecuperável
+                mark_email_failed(conn, row['id'], "Senha cifrada com outra chave; redefina a senha novamente")
+                continue
+        claimed.append(row)
+    return claimed
+
+def mark_email_sent(conn, email_id):
+    """Marca a mensagem como enviada e descarta o corpo e a senha cifrada."""
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE email_outbox SET status = 'enviado', body = NULL, secret = NULL, sent_at = NOW(), attempts = attempts + 1, last_error = NULL WHERE id = %s",
+            (email_id,)
+        )
+        conn.commit()
+        cursor.close()
+        return True
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"Erro ao marcar e-mail {email_id} como enviado: {err}")
+        return False
+
+def mark_email_failed(conn, email_id, error, retry_in_seconds=None):
+    """
+    Registra uma falha de envio. Com 'retry_in_seconds' a mensagem volta para a
+    fila após esse intervalo; sem ele, a falha é definitiva e o corpo e a senha
+    cifrada são descartados.
+    """
+    try:
+        cursor = conn.cursor()
+        if retry_in_seconds is None:
+            cursor.execute(
+                "UPDATE email_outbox SET status = 'falhou', body = NULL, secret = NULL, attempts = attempts + 1, last_error = %s WHERE id = %s",
+                (str(error)[:500], email_id)
+            )
+        else:
+            cursor.execute(
+                """UPDATE email_outbox SET status = 'pendente', attempts = attempts + 1, last_error = %s,
+                   next_attempt_at = NOW() + INTERVAL %s SECOND WHERE id = %s""",
+                (str(error)[:500], int(retry_in_seconds), email_id)
+            )
+        conn.commit()
+        cursor.close()
+        return True
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"Erro ao registrar falha do e-mail {email_id}: {err}")
+        return False
@@ -1,7 +1,13 @@
 import streamlit as st
-import pandas as pd
 import mysql.connector
-from .logs import log_action
+from .lazy import lazy_import
+from .logs import ENTITY_PAGE_PERMISSION
+from .unit_of_work import unit_of_work
+from .statements import run_statement
+from .cache_bus import publish, subscribe
+from .frames import read_frame, PERMISSIONS_SCHEMA
+
+pd = lazy_import("pandas")
 
 def populate_initial_permissions(conn):
     """Preenche a tabela de permissões com as regras padrão na primeira execução."""
@@ -24,7 +30,7 @@ def populate_initial_permissions(conn):
     pages = [
         "page_home", "page_perfil", "page_setores",
         "page_gerenciamento", "page_permissoes", "page_logs",
-        "page_personalizacao"
+        "page_personalizacao", "page_desempenho"
     ]
     levels = ["admin", "técnico", "padrão"]
 
@@ -36,7 +42,8 @@ def populate_initial_permissions(conn):
         "page_gerenciamento": ["admin"],
         "page_permissoes": ["admin"],
         "page_logs": ["admin"],
-        "page_personalizacao": ["admin"]
+        "page_personalizacao": ["admin"],
+        "page_desempenho": ["admin"]
 
     }
     
@@ -51,6 +58,7 @@ def populate_initial_permissions(conn):
         "INSERT IGNORE INTO page_permissions (page_name, permission_level, can_access) VALUES (%s, %s, %s)",
         rules_to_insert
     )
+    publish(cursor, 'page_permissions')
     conn.commit()
     cursor.close()
 
@@ -58,33 +66,33 @@ def populate_initial_permissions(conn):
 def check_page_access(_conn, page_name, permission_level):
     if not permission_level: return False
     try:
-        cursor = _conn.cursor(dictionary=True)
-        cursor.execute("SELECT can_access FROM page_permissions WHERE page_name = %s AND permission_level = %s", (page_name, permission_level))
-        result = cursor.fetchone()
-        cursor.close()
-        return result['can_access'] if result else False
+        rows = run_statement(_conn, 'check_page_access', (page_name, permission_level), fetch=True)
+        return rows[0]['can_access'] if rows else False
     except mysql.connector.Error as err:
         print(f"Erro ao checar permissão de página: {err}")
         return False
 
+# Alterações feitas por outros processos chegam pelo barramento de cache
+subscribe('page_permissions', check_page_access.clear)
+
 def get_all_page_permissions(conn):
     try:
-        return pd.read_sql("SELECT page_name, permission_level, can_access FROM page_permissions ORDER BY page_name, permission_level", conn)
+        return read_frame(conn, "SELECT page_name, permission_level, can_access FROM page_permissions ORDER BY page_name, permission_level",
+                          schema=PERMISSIONS_SCHEMA)
     except mysql.connector.Error as err:
         print(f"Erro ao buscar permissões: {err}")
         return pd.DataFrame()
 
 def update_page_permission(conn, page_name, permission_level, can_access, performing_user_id):
     try:
-        cursor = conn.cursor()
-        cursor.execute("UPDATE page_permissions SET can_access = %s WHERE page_name = %s AND permission_level = %s", (can_access, page_name, permission_level))
-        conn.commit()
-        cursor.close()
-        access_str = "CONCEDIDO" if can_access else "REMOVIDO"
-        details = f"Admin (ID: {performing_user_id}) alterou o acesso do nível '{permission_level}' à página '{page_name}' para '{access_str}'."
-        log_action(conn, performing_user_id, 'PERMISSION_CHANGED', details)
+        with unit_of_work(conn) as uow:
+            uow.cursor.execute("UPDATE page_permissions SET can_access = %s WHERE page_name = %s AND permission_level = %s", (can_access, page_name, permission_level))
+            publish(uow.cursor, 'page_permissions')
+            access_str = "CONCEDIDO" if can_access else "REMOVIDO"
+            details = f"Admin (ID: {performing_user_id}) alterou o acesso do nível '{permission_level}' à página '{page_name}' para '{access_str}'."
+            uow.log(performing_user_id, 'PERMISSION_CHANGED', details, ENTITY_PAGE_PERMISSION,
+                    f"{page_name}:{permission_level}", {'can_access': bool(can_access)})
         check_page_access.clear()
         return True, "Permissão atualizada com sucesso!"
     except mysql.connector.Error as err:
-        conn.rollback()
         return False, f"Erro ao atualizar permissão: {err}"
@@ -6,69 +6,96 @@
 # a nova função para atualizar os detalhes de monitoramento via SNMP.
 # --------------------------------------------------------------------------------
 
-import pandas as pd
 import mysql.connector
-from .logs import log_action
+from .lazy import lazy_import
+from .logs import ENTITY_PRINTER
+from .unit_of_work import unit_of_work
+from .statements import run_statement
+from .search_index import index_upsert, invalidate_index
+from .read_cache import bump_table_version, cached_read
+from .cache_bus import publish
+from .routing import reader
+from .frames import read_frame, PRINTERS_SCHEMA
+
+pd = lazy_import("pandas")
 
 def get_all_printers(conn):
     """Busca todas as impressoras cadastradas e retorna como DataFrame."""
+    conn = reader(conn)
     try:
-        return pd.read_sql("SELECT * FROM printers", conn)
+        return cached_read(conn, ('printers',), 'get_all_printers', lambda: read_frame(conn, "SELECT * FROM printers", schema=PRINTERS_SCHEMA))
     except mysql.connector.Error as err:
         print(f"Erro ao buscar impressoras: {err}")
         return pd.DataFrame()
 
+def get_printers_changed_since(conn, since=None):
+    """
+    Busca apenas as impressoras alteradas depois de 'since' (coluna indexada 'updated_at').
+    Sem 'since', retorna a tabela completa. Usada pelo painel de status ao vivo.
+    """
+    conn = reader(conn)
+    try:
+        if since is None:
+            return read_frame(conn, "SELECT * FROM printers ORDER BY updated_at", schema=PRINTERS_SCHEMA)
+        return read_frame(conn, "SELECT * FROM printers WHERE updated_at > %s ORDER BY updated_at", (since,),
+                          schema=PRINTERS_SCHEMA)
+    except mysql.connector.Error as err:
+        print(f"Erro ao buscar impressoras alteradas: {err}")
+        return pd.DataFrame()
+
 def add_printer(conn, data, performing_user_id):
-    """Adiciona uma nova impressora e registra a ação no log."""
+    """Adiciona uma nova impressora e registra a ação no log, na mesma transação."""
     try:
-        cursor = conn.cursor()
-        query = """
-        INSERT INTO printers (unidade, fabricante, modelo, localizacao, setor, patrimonio, nome, host, endereco_ip)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        values = (data['unidade'], data['fabricante'], data['modelo'], data['localizacao'],
-                  data['setor'], data['patrimonio'], data['nome'], data['host'], data['endereco_ip'])
-        cursor.execute(query, values)
-        new_printer_id = cursor.lastrowid
-        conn.commit()
-        cursor.close()
-        
-        details = f"Usuário (ID: {performing_user_id}) adicionou a impressora '{data['nome']}' (ID: {new_printer_id})."
-        log_action(conn, performing_user_id, 'PRINTER_CREATED', details)
-        
+        with unit_of_work(conn) as uow:
+            query = """
+            INSERT INTO printers (unidade, fabricante, modelo, localizacao, setor, patrimonio, nome, host, endereco_ip)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            values = (data['unidade'], data['fabricante'], data['modelo'], data['localizacao'],
+                      data['setor'], data['patrimonio'], data['nome'], data['host'], data['endereco_ip'])
+            uow.cursor.execute(query, values)
+            new_printer_id = uow.cursor.lastrowid
+            bump_table_version(uow.cursor, 'printers')
+            publish(uow.cursor, 'search_index:printers')
+
+            details = f"Usuário (ID: {performing_user_id}) adicionou a impressora '{data['nome']}' (ID: {new_printer_id})."
+            uow.log(performing_user_id, 'PRINTER_CREATED', details, ENTITY_PRINTER, new_printer_id, data)
+        index_upsert('printers', new_printer_id, data)
+
         return True, "Impressora adicionada com sucesso!"
     except mysql.connector.Error as err:
-        conn.rollback()
         return False, f"Erro ao adicionar impressora: {err}"
 
 def update_printer(conn, printer_id, data, performing_user_id):
-    """Atualiza dados de uma impressora e registra a ação no log."""
+    """Atualiza dados de uma impressora e registra a ação no log, na mesma transação."""
     try:
-        cursor = conn.cursor()
-        query = """
-        UPDATE printers SET unidade = %s, fabricante = %s, modelo = %s, localizacao = %s, 
-        setor = %s, patrimonio = %s, nome = %s, host = %s, endereco_ip = %s WHERE id = %s
-        """
-        values = (data['unidade'], data['fabricante'], data['modelo'], data['localizacao'],
-                  data['setor'], data['patrimonio'], data['nome'], data['host'],
-                  data['endereco_ip'], printer_id)
-        cursor.execute(query, values)
-        conn.commit()
-        cursor.close()
-        
-        details = f"Usuário (ID: {performing_user_id}) atualizou a impressora '{data['nome']}' (ID: {printer_id})."
-        log_action(conn, performing_user_id, 'PRINTER_UPDATED', details)
+        with unit_of_work(conn) as uow:
+            query = """
+            UPDATE printers SET unidade = %s, fabricante = %s, modelo = %s, localizacao = %s,
+            setor = %s, patrimonio = %s, nome = %s, host = %s, endereco_ip = %s,
+            updated_at = CURRENT_TIMESTAMP(6) WHERE id = %s
+            """
+            values = (data['unidade'], data['fabricante'], data['modelo'], data['localizacao'],
+                      data['setor'], data['patrimonio'], data['nome'], data['host'],
+                      data['endereco_ip'], printer_id)
+            uow.cursor.execute(query, values)
+            bump_table_version(uow.cursor, 'printers')
+            publish(uow.cursor, 'search_index:printers')
+
+            details = f"Usuário (ID: {performing_user_id}) atualizou a impressora '{data['nome']}' (ID: {printer_id})."
+            uow.log(performing_user_id, 'PRINTER_UPDATED', details, ENTITY_PRINTER, printer_id, data)
+        index_upsert('printers', printer_id, data)
 
         return True, "Impressora atualizada com sucesso!"
     except mysql.connector.Error as err:
-        conn.rollback()
         return False, f"Erro ao atualizar impressora: {err}"
 
 def update_printer_status(conn, printer_id, new_status):
     """Atualiza apenas o status 'Online'/'Offline' de uma impressora."""
     try:
         cursor = conn.cursor()
-        cursor.execute("UPDATE printers SET status = %s WHERE id = %s", (new_status, printer_id))
+        cursor.execute("UPDATE printers SET status = %s, updated_at = CURRENT_TIMESTAMP(6) WHERE id = %s", (new_status, printer_id))
+        bump_table_version(cursor, 'printers')
         conn.commit()
         cursor.close()
         return True
@@ -78,42 +105,134 @@ def update_printer_status(conn, printer_id, new_status):
         return False
 
 # --- NOVA FUNÇÃO PARA SALVAR DADOS SNMP ---
+def update_printers_details(conn, printers_data):
+    """
+    Grava o resultado de uma verificação automática (uma lista de dicts, um
+    por impressora) em uma única transação. Status, toner e contador só são
+    regravados, movendo 'updated_at' e o feed incremental do painel, nas
+    impressoras em que algum valor mudou; 'ultima_verificacao' é gravada em
+    todas. A versão da tabela muda uma única vez, e só se houve mudança.
+    Retorna a quantidade de impressoras alteradas, ou None em caso de erro.
+    """
+    if not printers_data:
+        return 0
+    try:
+        changed = 0
+        for data in printers_data:
+            monitored = (
+                data.get('status', 'Desconhecido'),
+                data.get('status_detalhado'),
+                data.get('toner_preto', -1),
+                data.get('toner_ciano', -1),
+                data.get('toner_magenta', -1),
+                data.get('toner_amarelo', -1),
+                data.get('contagem_paginas', -1),
+            )
+            # Instrução preparada: os valores novos, o id e os mesmos valores para a comparação
+            changed += run_statement(conn, 'update_printer_details', monitored + (data.get('id'),) + monitored)
+        cursor = conn.cursor()
+        cursor.executemany("UPDATE printers SET ultima_verificacao = %s WHERE id = %s",
+                           [(data.get('ultima_verificacao'), data.get('id')) for data in printers_data])
+        if changed:
+            bump_table_version(cursor, 'printers')
+        conn.commit()
+        cursor.close()
+        return changed
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"Erro ao atualizar detalhes das impressoras: {err}")
+        return None
+
 def update_printer_details(conn, data):
+    """Atualiza os dados de monitoramento de uma única impressora (ver update_printers_details)."""
+    return update_printers_details(conn, [data]) is not None
+
+
+# --- NOVA FUNÇÃO PARA A DESCOBERTA AUTOMÁTICA DE IMPRESSORAS ---
+def register_discovered_printers(conn, new_printers, ip_changes, performing_user_id):
+    """
+    Cadastra em lote as impressoras encontradas pela descoberta de rede e
+    atualiza os IPs das que mudaram de endereço, tudo em uma única transação.
+    'ip_changes' é uma lista de tuplas (printer_id, ip_antigo, ip_novo).
+    """
+    try:
+        with unit_of_work(conn) as uow:
+            if new_printers:
+                insert_query = """
+                INSERT INTO printers (fabricante, modelo, nome, host, endereco_ip, status, status_detalhado)
+                VALUES (%s, %s, %s, %s, %s, 'Online', 'Descoberta automática')
+                """
+                uow.cursor.executemany(insert_query, [
+                    (p.get('fabricante'), p.get('modelo'), p.get('nome'), p.get('host'), p['endereco_ip'])
+                    for p in new_printers
+                ])
+            if ip_changes:
+                uow.cursor.executemany(
+                    "UPDATE printers SET endereco_ip = %s, updated_at = CURRENT_TIMESTAMP(6) WHERE id = %s",
+                    [(new_ip, printer_id) for printer_id, _, new_ip in ip_changes]
+                )
+            bump_table_version(uow.cursor, 'printers')
+            publish(uow.cursor, 'search_index:printers')
+
+            details = (f"Usuário (ID: {performing_user_id}) executou a descoberta de rede: "
+                       f"{len(new_printers)} impressora(s) adicionada(s), {len(ip_changes)} IP(s) atualizado(s).")
+            uow.log(performing_user_id, 'PRINTERS_DISCOVERED', details,
+                    changes={'adicionadas': len(new_printers), 'ips_atualizados': len(ip_changes)})
+        invalidate_index('printers')
+
+        return True, f"{len(new_printers)} impressora(s) cadastrada(s) e {len(ip_changes)} IP(s) atualizado(s)."
+    except mysql.connector.Error as err:
+        return False, f"Erro ao registrar impressoras descobertas: {err}"
+
+# --- FUNÇÕES DO DISJUNTOR (CIRCUIT BREAKER) POR IMPRESSORA ---
+def get_printer_health(conn):
+    """Busca o estado persistido dos circuitos de todas as impressoras."""
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT printer_id, circuit_state, consecutive_failures, open_until, last_reason FROM printer_health")
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    except mysql.connector.Error as err:
+        print(f"Erro ao buscar estado dos circuitos: {err}")
+        return []
+
+def save_printer_health(conn, rows):
     """
-    Atualiza todos os dados de monitoramento de uma impressora no banco de dados.
-    Esta função é chamada pelo processo de verificação automática via SNMP.
+    Grava em lote o estado dos circuitos. Cada item de 'rows' é uma tupla
+    (printer_id, circuit_state, consecutive_failures, open_until, last_reason).
     """
     try:
         cursor = conn.cursor()
         query = """
-            UPDATE printers SET
-                status = %s,
-                status_detalhado = %s,
-                toner_preto = %s,
-                toner_ciano = %s,
-                toner_magenta = %s,
-                toner_amarelo = %s,
-                contagem_paginas = %s,
-                ultima_verificacao = %s
-            WHERE id = %s
+            INSERT INTO printer_health (printer_id, circuit_state, consecutive_failures, open_until, last_reason)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE circuit_state = VALUES(circuit_state),
+                consecutive_failures = VALUES(consecutive_failures),
+                open_until = VALUES(open_until), last_reason = VALUES(last_reason)
         """
-        values = (
-            data.get('status', 'Desconhecido'),
-            data.get('status_detalhado'),
-            data.get('toner_preto', -1),
-            data.get('toner_ciano', -1),
-            data.get('toner_magenta', -1),
-            data.get('toner_amarelo', -1),
-            data.get('contagem_paginas', -1),
-            data.get('ultima_verificacao'),
-            data.get('id')
-        )
-        cursor.execute(query, values)
+        cursor.executemany(query, rows)
         conn.commit()
         cursor.close()
         return True
     except mysql.connector.Error as err:
         conn.rollback()
-        print(f"Erro ao atualizar detalhes da impressora ID {data.get('id')}: {err}")
+        print(f"Erro ao salvar estado dos circuitos: {err}")
         return False
 
+def get_skipped_printers(conn):
+    """Busca as impressoras com circuito aberto, com o motivo de estarem sendo ignoradas."""
+    conn = reader(conn)
+    try:
+        query = """
+            SELECT p.nome AS 'Impressora', p.endereco_ip AS 'IP', h.consecutive_failures AS 'Falhas Seguidas',
+                   h.last_reason AS 'Último Erro', h.open_until AS 'Próxima Tentativa'
+            FROM printer_health h
+            JOIN printers p ON p.id = h.printer_id
+            WHERE h.circuit_state = 'aberto'
+            ORDER BY h.open_until
+        """
+        return read_frame(conn, query, schema={'Falhas Seguidas': 'int', 'Próxima Tentativa': 'datetime'})
+    except mysql.connector.Error as err:
+        print(f"Erro ao buscar impressoras ignoradas: {err}")
+        return pd.DataFrame()
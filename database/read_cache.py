@@ -0,0 +1,138 @@
+# --------------------------------------------------------------------------------
+# read_cache.py (Módulo de Cache de Leitura Versionado)
+#
+# Descrição:
+# Cache de leitura compartilhado por todas as sessões do processo. Cada tabela
+# tem um contador em 'table_versions' incrementado na mesma transação de toda
+# escrita; a chave do cache inclui as versões das tabelas lidas, de modo que
+# qualquer escrita (deste ou de outro processo) torna a entrada obsoleta sem
+# chamadas manuais de .clear(). Despejo LRU limitado por bytes.
+# --------------------------------------------------------------------------------
+
+import threading
+from collections import OrderedDict
+import mysql.connector
+
+# Memória máxima ocupada pelos DataFrames em cache
+DEFAULT_BYTE_BUDGET = 64 * 1024 * 1024
+
+
+def bump_table_version(cursor, *tables):
+    """
+    Incrementa a versão das tabelas informadas. Deve ser chamada com o cursor
+    da escrita, antes do commit, para que versão e dados mudem juntos.
+    """
+    for table in tables:
+        cursor.execute(
+            "INSERT INTO table_versions (table_name, version) VALUES (%s, 1) "
+            "ON DUPLICATE KEY UPDATE version = version + 1",
+            (table,)
+        )
+
+
+def get_table_versions(conn, tables):
+    """Retorna uma tupla com a versão atual de cada tabela (0 se ainda não houve escrita)."""
+    cursor = conn.cursor()
+    placeholders = ", ".join(["%s"] * len(tables))
+    cursor.execute(f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})", tuple(tables))
+    versions = dict(cursor.fetchall())
+    cursor.close()
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+class ReadCache:
+    """LRU de DataFrames imutáveis, limitado por bytes, com contadores de acerto e falha."""
+
+    def __init__(self, byte_budget=DEFAULT_BYTE_BUDGET):
+        self.byte_budget = byte_budget
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, df):
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.byte_budget:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes_used -= previous[1]
+            self._entries[key] = (df, size)
+            self.bytes_used += size
+            while self.bytes_used > self.byte_budget:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes_used -= evicted_size
+                self.evictions += 1
+
+    def discard_older(self, name, versions):
+        """Remove as entradas de 'name' com versões anteriores às atuais (já não podem ser acertadas)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == name and k[2] != versions]:
+                self.bytes_used -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entradas': len(self._entries),
+                'bytes': self.bytes_used,
+                'orcamento_bytes': self.byte_budget,
+                'acertos': self.hits,
+                'falhas': self.misses,
+                'despejos': self.evictions,
+                'taxa_acerto': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_cache = ReadCache()
+
+
+def cached_read(conn, tables, name, loader, params=()):
+    """
+    Leitura através do cache: 'loader()' só é executado se não houver um
+    DataFrame para (name, params) nas versões atuais de 'tables'. Retorna uma
+    cópia rasa: com o Copy-on-Write (ligado na importação do pacote),
+    alterações do chamador não afetam a entrada compartilhada. Sem a tabela
+    de versões, lê diretamente.
+    """
+    try:
+        versions = get_table_versions(conn, tables)
+    except mysql.connector.Error as err:
+        print(f"Cache de leitura indisponível ({err}); lendo diretamente.")
+        return loader()
+
+    key = (name, params, versions)
+    df = _cache.get(key)
+    if df is None:
+        df = loader()
+        _cache.discard_older(name, versions)
+        _cache.put(key, df)
+    return df.copy(deep=False)
+
+
+def clear_read_cache():
+    """Esvazia o cache de leitura deste processo."""
+    _cache.clear()
+
+
+def get_read_cache_metrics():
+    """Métricas do cache de leitura (entradas, bytes, acertos, falhas, despejos)."""
+    return _cache.stats()
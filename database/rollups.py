@@ -0,0 +1,93 @@
+# --------------------------------------------------------------------------------
+# rollups.py (Módulo de Agregados da Trilha de Auditoria)
+#
+# Descrição:
+# Mantém a tabela 'user_logs_daily' (dia x ação x usuário -> quantidade) de
+# forma incremental: cada atualização agrega apenas os registros de
+# 'user_logs' com id acima da marca d'água guardada em 'maintenance_state'.
+# Os gráficos de atividade leem só o agregado, sem carregar a trilha inteira.
+# --------------------------------------------------------------------------------
+
+import mysql.connector
+from .lazy import lazy_import
+from .read_cache import bump_table_version, cached_read
+from .routing import reader
+from .frames import read_frame
+
+pd = lazy_import("pandas")
+
+ROLLUP_KEY = 'user_logs_daily'
+
+# Registros mais novos que isto ainda podem ter ids menores em transações
+# abertas; ficam para a próxima atualização para não serem pulados.
+SETTLE_SECONDS = 10
+
+ACTIVITY_SCHEMA = {'Dia': 'datetime', 'Ação': 'category', 'Usuário': 'category',
+                   'Nível': 'category', 'Quantidade': 'int'}
+
+
+def refresh_logs_rollup(conn, batch_size=50000):
+    """
+    Agrega em 'user_logs_daily' os logs novos desde a última execução, em lotes
+    de 'batch_size' ids por transação. A linha da marca d'água é travada
+    (FOR UPDATE), então execuções simultâneas não contam o mesmo lote duas vezes.
+    """
+    processed = 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute("INSERT IGNORE INTO maintenance_state (state_key, state_value) VALUES (%s, 0)", (ROLLUP_KEY,))
+        conn.commit()
+        while True:
+            cursor.execute("SELECT state_value FROM maintenance_state WHERE state_key = %s FOR UPDATE", (ROLLUP_KEY,))
+            watermark = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT MAX(id) FROM (SELECT id, log_timestamp FROM user_logs WHERE id > %s ORDER BY id LIMIT %s) AS lote "
+                "WHERE log_timestamp <= NOW() - INTERVAL %s SECOND",
+                (watermark, batch_size, SETTLE_SECONDS)
+            )
+            high = cursor.fetchone()[0]
+            if high is None:
+                conn.rollback()
+                break
+            cursor.execute("""
+                INSERT INTO user_logs_daily (log_date, action_type, performing_user_id, log_count)
+                SELECT * FROM (
+                    SELECT DATE(log_timestamp) AS log_date, action_type, COALESCE(performing_user_id, 0) AS user_id, COUNT(*) AS total
+                    FROM user_logs WHERE id > %s AND id <= %s
+                    GROUP BY DATE(log_timestamp), action_type, COALESCE(performing_user_id, 0)
+                ) AS novos
+                ON DUPLICATE KEY UPDATE log_count = log_count + VALUES(log_count)
+            """, (watermark, high))
+            cursor.execute("UPDATE maintenance_state SET state_value = %s WHERE state_key = %s", (high, ROLLUP_KEY))
+            bump_table_version(cursor, 'user_logs_daily')
+            conn.commit()
+            processed += high - watermark
+        cursor.close()
+        return True, f"Agregado atualizado ({processed} ids processados)."
+    except mysql.connector.Error as err:
+        print(f"Erro ao atualizar o agregado de logs: {err}")
+        conn.rollback()
+        return False, f"Erro ao atualizar o agregado de logs: {err}"
+
+
+def get_logs_activity(conn, start_date):
+    """
+    Retorna o agregado diário a partir de 'start_date' com o nome e o nível do
+    autor (logs sem autor aparecem como 'Sistema'). Compartilhado entre sessões
+    pelo cache de leitura, até a próxima atualização do agregado.
+    """
+    conn = reader(conn)
+    query = """
+        SELECT d.log_date AS 'Dia', d.action_type AS 'Ação', COALESCE(u.name, 'Sistema') AS 'Usuário',
+               COALESCE(u.permission_level, '-') AS 'Nível', d.log_count AS 'Quantidade'
+        FROM user_logs_daily d
+        LEFT JOIN users u ON u.id = d.performing_user_id
+        WHERE d.log_date >= %s
+        ORDER BY d.log_date
+    """
+    try:
+        return cached_read(conn, ('user_logs_daily', 'users'), 'get_logs_activity',
+                           lambda: read_frame(conn, query, (start_date,), schema=ACTIVITY_SCHEMA), (start_date,))
+    except mysql.connector.Error as err:
+        print(f"Erro ao buscar a atividade agregada: {err}")
+        return pd.DataFrame(columns=list(ACTIVITY_SCHEMA))
@@ -0,0 +1,159 @@
+# --------------------------------------------------------------------------------
+# routing.py (Módulo de Roteamento Leitura/Escrita)
+#
+# Descrição:
+# Conexão que separa leituras e escritas: tudo o que é feito diretamente nela
+# (cursor, commit, rollback) vai para o servidor principal, e as funções de
+# leitura analítica do pacote pedem uma conexão de leitura com reader(conn).
+# A réplica só é usada se o atraso de replicação estiver abaixo do limite e
+# se a sessão atual não tiver escrito há pouco tempo (leia-suas-escritas).
+# --------------------------------------------------------------------------------
+
+import threading
+import time
+import mysql.connector
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Atraso máximo de replicação (em segundos) para que uma réplica atenda leituras
+DEFAULT_MAX_LAG_SECONDS = 5
+# Intervalo entre duas verificações do atraso de cada réplica
+LAG_CHECK_INTERVAL = 5.0
+# Margem somada ao atraso medido na janela de leia-suas-escritas (o atraso é medido em segundos inteiros)
+READ_YOUR_WRITES_MARGIN = 1.0
+
+
+def _session_id():
+    """Identifica a sessão do Streamlit em execução (None em threads de segundo plano)."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else None
+
+
+class _Replica:
+    """Conexão com uma réplica e o último atraso de replicação medido."""
+
+    def __init__(self, name, connect):
+        self.name = name
+        self._connect = connect
+        self._conn = None
+        self.lag = None
+        self.checked_at = 0.0
+
+    def connection(self):
+        if self._conn is None or not self._conn.is_connected():
+            self._conn = self._connect()
+            # Autocommit: cada leitura vê os dados replicados mais recentes, sem snapshot preso
+            self._conn.autocommit = True
+        return self._conn
+
+    def measure_lag(self):
+        """Lê Seconds_Behind_Source/Master (MySQL 8.0.22+ e MariaDB 10.5+). None se a replicação estiver parada."""
+        try:
+            cursor = self.connection().cursor(dictionary=True)
+            cursor.execute("SHOW REPLICA STATUS")
+            status = cursor.fetchone()
+            cursor.fetchall()
+            cursor.close()
+            if not status:
+                self.lag = None
+            else:
+                lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+                self.lag = None if lag is None else float(lag)
+        except mysql.connector.Error as err:
+            print(f"Erro ao verificar atraso da réplica '{self.name}': {err}")
+            self._conn = None
+            self.lag = None
+        self.checked_at = time.monotonic()
+        return self.lag
+
+
+class RoutedConnection:
+    """
+    Envolve a conexão principal. Atributos e métodos não definidos aqui são
+    repassados a ela, então o restante do pacote a usa como uma conexão comum.
+    """
+
+    def __init__(self, primary, replica_connects, max_lag_seconds=DEFAULT_MAX_LAG_SECONDS):
+        self.primary = primary
+        self.max_lag_seconds = max_lag_seconds
+        self._replicas = [_Replica(name, connect) for name, connect in replica_connects]
+        self._next = 0
+        self._last_write = {}
+        self._lock = threading.Lock()
+        self.metrics = {'leituras_replica': 0, 'leituras_principal': 0,
+                        'leia_suas_escritas': 0, 'replica_atrasada': 0}
+
+    def __getattr__(self, name):
+        return getattr(self.primary, name)
+
+    def commit(self):
+        self.primary.commit()
+        session = _session_id()
+        if session is not None:
+            now = time.monotonic()
+            with self._lock:
+                self._last_write[session] = now
+                # Descarta sessões cuja janela de leia-suas-escritas já passou
+                if len(self._last_write) > 1000:
+                    horizon = now - self.max_lag_seconds - READ_YOUR_WRITES_MARGIN
+                    self._last_write = {s: t for s, t in self._last_write.items() if t >= horizon}
+
+    def _healthy_replica(self):
+        """Próxima réplica (rodízio) com atraso dentro do limite, ou None."""
+        now = time.monotonic()
+        for _ in range(len(self._replicas)):
+            with self._lock:
+                replica = self._replicas[self._next]
+                self._next = (self._next + 1) % len(self._replicas)
+            if now - replica.checked_at > LAG_CHECK_INTERVAL:
+                replica.measure_lag()
+            if replica.lag is not None and replica.lag <= self.max_lag_seconds:
+                return replica
+        return None
+
+    def reader(self):
+        """Conexão para uma leitura: uma réplica saudável ou, se necessário, a principal."""
+        if not self._replicas:
+            return self.primary
+
+        replica = self._healthy_replica()
+        if replica is None:
+            self.metrics['replica_atrasada'] += 1
+            self.metrics['leituras_principal'] += 1
+            return self.primary
+
+        session = _session_id()
+        if session is not None:
+            with self._lock:
+                last_write = self._last_write.get(session)
+            if last_write is not None and time.monotonic() - last_write <= replica.lag + READ_YOUR_WRITES_MARGIN:
+                self.metrics['leia_suas_escritas'] += 1
+                self.metrics['leituras_principal'] += 1
+                return self.primary
+
+        try:
+            conn = replica.connection()
+        except mysql.connector.Error as err:
+            print(f"Réplica '{replica.name}' indisponível: {err}")
+            replica.lag = None
+            self.metrics['leituras_principal'] += 1
+            return self.primary
+        self.metrics['leituras_replica'] += 1
+        return conn
+
+    def routing_metrics(self):
+        return {
+            **self.metrics,
+            'replicas': {replica.name: replica.lag for replica in self._replicas},
+            'limite_atraso_s': self.max_lag_seconds,
+        }
+
+
+def reader(conn):
+    """Conexão a usar em uma função somente leitura; conexões comuns são devolvidas sem alteração."""
+    # Por atributo e não por tipo: a conexão roteada pode estar envolvida (ex.: instrumentação)
+    return conn.reader() if hasattr(conn, 'reader') else conn
+
+
+def get_routing_metrics(conn):
+    """Contadores de roteamento (leituras na réplica/principal e motivos de fallback)."""
+    return conn.routing_metrics() if hasattr(conn, 'routing_metrics') else {}
@@ -0,0 +1,266 @@
+# --------------------------------------------------------------------------------
+# search_index.py (Módulo de Índice de Busca em Memória)
+#
+# Descrição:
+# Índice invertido de trigramas por entidade (usuários, setores, impressoras),
+# compartilhado por todas as sessões do processo. É construído uma vez a partir
+# da tabela e atualizado pelas funções add_*/update_*, respondendo buscas por
+# substring sem percorrer as linhas do DataFrame a cada tecla digitada.
+# --------------------------------------------------------------------------------
+
+import sys
+import threading
+import time
+from array import array
+from functools import partial
+import mysql.connector
+from .cache_bus import subscribe
+
+# Colunas pesquisáveis de cada entidade
+ENTITY_FIELDS = {
+    'users': ('name', 'email', 'phone'),
+    'sectors': ('sector_name', 'location_tower', 'location_floor', 'cost_center',
+                'manager_name', 'manager_contact', 'status'),
+    'printers': ('nome', 'host', 'endereco_ip', 'fabricante', 'modelo', 'setor', 'localizacao', 'patrimonio'),
+}
+
+# Orçamento de memória por índice; acima dele o índice é desativado e a busca volta ao modo antigo
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+_FIELD_SEPARATOR = "\x1f"
+# Fração de entradas obsoletas nas listas de postagem que dispara a compactação
+_MAX_STALE_FRACTION = 0.2
+
+
+def _normalize(values):
+    return _FIELD_SEPARATOR.join("" if v is None else str(v).strip().lower() for v in values)
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Índice de trigramas de uma entidade. As listas de postagem são arrays
+    compactos de inteiros (4 bytes por entrada); atualizações apenas acrescentam
+    e as entradas obsoletas são descartadas na verificação do texto e removidas
+    periodicamente pela compactação. Todas as operações são protegidas por lock.
+    """
+
+    def __init__(self, entity, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.entity = entity
+        self.memory_budget = memory_budget
+        self.enabled = True
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._postings = {}
+        self._entries = 0
+        self._stale = 0
+        self._text_bytes = 0
+        self.build_seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    # --- Manutenção ---
+
+    def build(self, rows):
+        """(Re)constrói o índice a partir de tuplas (id, valor_campo_1, valor_campo_2, ...)."""
+        started = time.perf_counter()
+        with self._lock:
+            self._reset()
+            self.enabled = True
+            for row in rows:
+                self._add(int(row[0]), _normalize(row[1:]))
+                if not self._within_budget():
+                    return
+        self.build_seconds = time.perf_counter() - started
+
+    def upsert(self, doc_id, values):
+        """Inclui ou atualiza um documento (valores na ordem de ENTITY_FIELDS)."""
+        with self._lock:
+            if not self.enabled:
+                return
+            doc_id = int(doc_id)
+            text = _normalize(values)
+            previous = self._docs.pop(doc_id, None)
+            if previous is not None:
+                # As postagens antigas ficam obsoletas; só os trigramas novos são acrescentados
+                self._text_bytes -= sys.getsizeof(previous)
+                old_grams = _trigrams(previous)
+                self._stale += len(old_grams - _trigrams(text))
+                self._docs[doc_id] = text
+                self._text_bytes += sys.getsizeof(text)
+                self._append_postings(doc_id, _trigrams(text) - old_grams)
+            else:
+                self._add(doc_id, text)
+            if self._stale > _MAX_STALE_FRACTION * max(self._entries, 1):
+                self._compact()
+            self._within_budget()
+
+    def _reset(self):
+        self._docs = {}
+        self._postings = {}
+        self._entries = 0
+        self._stale = 0
+        self._text_bytes = 0
+
+    def _add(self, doc_id, text):
+        self._docs[doc_id] = text
+        self._text_bytes += sys.getsizeof(text)
+        self._append_postings(doc_id, _trigrams(text))
+
+    def _append_postings(self, doc_id, grams):
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array('i')
+            posting.append(doc_id)
+        self._entries += len(grams)
+
+    def _compact(self):
+        docs = self._docs
+        self._reset()
+        for doc_id, text in docs.items():
+            self._add(doc_id, text)
+
+    def memory_bytes(self):
+        """Estimativa do uso de memória: textos, listas de postagem e dicionários."""
+        return (self._text_bytes + self._entries * 4 + len(self._postings) * 150
+                + sys.getsizeof(self._docs) + sys.getsizeof(self._postings))
+
+    def _within_budget(self):
+        if self.memory_bytes() <= self.memory_budget:
+            return True
+        print(f"Índice de busca '{self.entity}' excedeu o orçamento de memória e foi desativado.")
+        self.enabled = False
+        self._reset()
+        return False
+
+    # --- Consulta ---
+
+    def search(self, query, limit=None):
+        """
+        Retorna os ids cujo texto contém 'query', ordenados por relevância:
+        início de campo, depois início de palavra, depois qualquer posição.
+        Retorna None se o índice estiver desativado.
+        """
+        started = time.perf_counter()
+        needle = query.strip().lower()
+        with self._lock:
+            if not self.enabled:
+                return None
+            if len(needle) >= 3:
+                # Basta a lista do trigrama mais raro: a verificação do texto elimina os falsos positivos
+                rarest = min((self._postings.get(g, ()) for g in _trigrams(needle)), key=len)
+                candidates = set(rarest)
+            else:
+                candidates = self._docs.keys()
+
+            ranked = []
+            docs = self._docs
+            for doc_id in candidates:
+                text = docs.get(doc_id)
+                position = text.find(needle) if text is not None else -1
+                if position < 0:
+                    continue
+                previous = text[position - 1] if position else _FIELD_SEPARATOR
+                rank = 0 if previous == _FIELD_SEPARATOR else (1 if not previous.isalnum() else 2)
+                ranked.append((rank, position, doc_id))
+
+        ranked.sort()
+        self.queries += 1
+        self.query_seconds += time.perf_counter() - started
+        ids = [doc_id for _, _, doc_id in ranked]
+        return ids[:limit] if limit is not None else ids
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entidade': self.entity,
+                'ativo': self.enabled,
+                'documentos': len(self._docs),
+                'trigramas': len(self._postings),
+                'memoria_bytes': self.memory_bytes(),
+                'orcamento_bytes': self.memory_budget,
+                'construcao_ms': round(self.build_seconds * 1000, 2),
+                'consultas': self.queries,
+                'consulta_media_ms': round(self.query_seconds * 1000 / self.queries, 4) if self.queries else 0.0,
+            }
+
+
+# --- Registro de índices do processo ---
+
+_indexes = {}
+_registry_lock = threading.Lock()
+
+
+def _load_rows(conn, entity):
+    fields = ENTITY_FIELDS[entity]
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT id, {', '.join(fields)} FROM {entity}")
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def get_index(conn, entity):
+    """Retorna o índice da entidade, construindo-o a partir da tabela no primeiro uso."""
+    with _registry_lock:
+        index = _indexes.get(entity)
+        if index is not None:
+            return index
+        index = TrigramIndex(entity)
+        try:
+            index.build(_load_rows(conn, entity))
+        except mysql.connector.Error as err:
+            print(f"Erro ao construir índice de busca '{entity}': {err}")
+            return None
+        _indexes[entity] = index
+        return index
+
+
+def search_ids(conn, entity, query, limit=None):
+    """Busca por substring na entidade. Retorna a lista de ids ranqueada ou None se o índice não estiver disponível."""
+    index = get_index(conn, entity)
+    if index is None:
+        return None
+    return index.search(query, limit)
+
+
+def index_upsert(entity, doc_id, data):
+    """Atualiza o documento no índice (se já construído) após uma escrita bem-sucedida."""
+    index = _indexes.get(entity)
+    if index is not None:
+        index.upsert(doc_id, [data.get(field) for field in ENTITY_FIELDS[entity]])
+
+
+def index_update_fields(entity, doc_id, **changes):
+    """Atualiza apenas alguns campos de um documento já indexado (ex.: status)."""
+    index = _indexes.get(entity)
+    if index is None:
+        return
+    with index._lock:
+        text = index._docs.get(doc_id)
+    if text is None:
+        return
+    values = dict(zip(ENTITY_FIELDS[entity], text.split(_FIELD_SEPARATOR)))
+    values.update(changes)
+    index_upsert(entity, doc_id, values)
+
+
+def invalidate_index(entity):
+    """Descarta o índice da entidade; ele será reconstruído na próxima busca."""
+    with _registry_lock:
+        _indexes.pop(entity, None)
+
+
+# Escritas de outros processos descartam o índice local, que é reconstruído na próxima busca
+for _entity in ENTITY_FIELDS:
+    subscribe(f"search_index:{_entity}", partial(invalidate_index, _entity))
+
+
+def get_search_index_metrics():
+    """Métricas de memória e latência de todos os índices construídos neste processo."""
+    with _registry_lock:
+        indexes = list(_indexes.values())
+    return [index.stats() for index in indexes]
@@ -1,60 +1,70 @@
-import pandas as pd
 import mysql.connector
-from .logs import log_action
+from .lazy import lazy_import
+from .logs import ENTITY_SECTOR
+from .unit_of_work import unit_of_work
+from .search_index import index_upsert, index_update_fields
+from .read_cache import bump_table_version, cached_read
+from .cache_bus import publish
+from .routing import reader
+from .frames import read_frame, SECTORS_SCHEMA
+
+pd = lazy_import("pandas")
 
 def get_all_sectors(conn, only_active=False):
+    conn = reader(conn)
     try:
         query = "SELECT * FROM sectors"
         if only_active:
             query += " WHERE status = 'ativo'"
         query += " ORDER BY sector_name ASC"
-        return pd.read_sql(query, conn)
+        return cached_read(conn, ('sectors',), 'get_all_sectors', lambda: read_frame(conn, query, schema=SECTORS_SCHEMA), (only_active,))
     except mysql.connector.Error as err:
         print(f"Erro ao buscar setores: {err}")
         return pd.DataFrame()
 
 def add_sector(conn, data, performing_user_id):
     try:
-        cursor = conn.cursor()
-        query = "INSERT INTO sectors (location_tower, location_floor, sector_name, cost_center, manager_name, manager_contact) VALUES (%s, %s, %s, %s, %s, %s)"
-        values = (data['location_tower'], data['location_floor'], data['sector_name'],
-                  data['cost_center'], data['manager_name'], data['manager_contact'])
-        cursor.execute(query, values)
-        new_sector_id = cursor.lastrowid
-        conn.commit()
-        cursor.close()
-        details = f"Usuário (ID: {performing_user_id}) criou o setor '{data['sector_name']}' (ID: {new_sector_id})."
-        log_action(conn, performing_user_id, 'SECTOR_CREATED', details)
+        with unit_of_work(conn) as uow:
+            query = "INSERT INTO sectors (location_tower, location_floor, sector_name, cost_center, manager_name, manager_contact) VALUES (%s, %s, %s, %s, %s, %s)"
+            values = (data['location_tower'], data['location_floor'], data['sector_name'],
+                      data['cost_center'], data['manager_name'], data['manager_contact'])
+            uow.cursor.execute(query, values)
+            new_sector_id = uow.cursor.lastrowid
+            bump_table_version(uow.cursor, 'sectors')
+            publish(uow.cursor, 'search_index:sectors')
+            details = f"Usuário (ID: {performing_user_id}) criou o setor '{data['sector_name']}' (ID: {new_sector_id})."
+            uow.log(performing_user_id, 'SECTOR_CREATED', details, ENTITY_SECTOR, new_sector_id, data)
+        index_upsert('sectors', new_sector_id, {**data, 'status': 'ativo'})
         return True, "Setor adicionado com sucesso!"
     except mysql.connector.Error as err:
-        conn.rollback()
         return False, f"Erro ao adicionar setor: {err}"
 
 def update_sector(conn, sector_id, data, performing_user_id):
     try:
-        cursor = conn.cursor()
-        query = "UPDATE sectors SET location_tower = %s, location_floor = %s, sector_name = %s, cost_center = %s, manager_name = %s, manager_contact = %s WHERE id = %s"
-        values = (data['location_tower'], data['location_floor'], data['sector_name'],
-                  data['cost_center'], data['manager_name'], data['manager_contact'], sector_id)
-        cursor.execute(query, values)
-        conn.commit()
-        cursor.close()
-        details = f"Usuário (ID: {performing_user_id}) atualizou o setor '{data['sector_name']}' (ID: {sector_id})."
-        log_action(conn, performing_user_id, 'SECTOR_UPDATED', details)
+        with unit_of_work(conn) as uow:
+            query = "UPDATE sectors SET location_tower = %s, location_floor = %s, sector_name = %s, cost_center = %s, manager_name = %s, manager_contact = %s WHERE id = %s"
+            values = (data['location_tower'], data['location_floor'], data['sector_name'],
+                      data['cost_center'], data['manager_name'], data['manager_contact'], sector_id)
+            uow.cursor.execute(query, values)
+            bump_table_version(uow.cursor, 'sectors')
+            publish(uow.cursor, 'search_index:sectors')
+            details = f"Usuário (ID: {performing_user_id}) atualizou o setor '{data['sector_name']}' (ID: {sector_id})."
+            uow.log(performing_user_id, 'SECTOR_UPDATED', details, ENTITY_SECTOR, sector_id, data)
+        index_update_fields('sectors', sector_id, **{field: data[field] for field in (
+            'location_tower', 'location_floor', 'sector_name', 'cost_center', 'manager_name', 'manager_contact')})
         return True, "Setor atualizado com sucesso!"
     except mysql.connector.Error as err:
-        conn.rollback()
         return False, f"Erro ao atualizar setor: {err}"
 
 def update_sector_status(conn, sector_id, sector_name, new_status, performing_user_id):
     try:
-        cursor = conn.cursor()
-        cursor.execute("UPDATE sectors SET status = %s WHERE id = %s", (new_status, sector_id))
-        conn.commit()
-        cursor.close()
-        details = f"Usuário (ID: {performing_user_id}) alterou o status do setor '{sector_name}' (ID: {sector_id}) para '{new_status}'."
-        log_action(conn, performing_user_id, 'SECTOR_STATUS_CHANGED', details)
+        with unit_of_work(conn) as uow:
+            uow.cursor.execute("UPDATE sectors SET status = %s WHERE id = %s", (new_status, sector_id))
+            bump_table_version(uow.cursor, 'sectors')
+            publish(uow.cursor, 'search_index:sectors')
+            details = f"Usuário (ID: {performing_user_id}) alterou o status do setor '{sector_name}' (ID: {sector_id}) para '{new_status}'."
+            uow.log(performing_user_id, 'SECTOR_STATUS_CHANGED', details, ENTITY_SECTOR, sector_id, {'status': new_status})
+        index_update_fields('sectors', sector_id, status=new_status)
         return True, "Status do setor alterado com sucesso!"
     except mysql.connector.Error as err:
-        conn.rollback()
         return False, f"Erro ao alterar status do setor: {err}"
@@ -0,0 +1,200 @@
+# --------------------------------------------------------------------------------
+# sessions.py (Módulo de Sessões Persistentes)
+#
+# Descrição:
+# Sessões de login guardadas no servidor (tabela 'user_sessions'), para que
+# recarregar a página, abrir outra aba ou reconectar o websocket não exija um
+# novo login com bcrypt. O navegador recebe um token assinado (HMAC); o banco
+# guarda só o hash SHA-256 dele. A validade é deslizante: cada uso adia o
+# vencimento. A validação consulta um cache em memória por alguns segundos e,
+# fora dele, faz uma única busca pela chave primária, em uma conexão própria
+# em autocommit: a conexão compartilhada da interface pode ter a transação de
+# outra sessão em andamento, que não pode ser encerrada daqui.
+# --------------------------------------------------------------------------------
+
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+import mysql.connector
+from .cache_bus import publish, subscribe
+
+# Sessão ociosa por mais que isto expira; cada uso renova o prazo
+SESSION_IDLE_MINUTES = 8 * 60
+# A renovação do prazo no banco é feita no máximo uma vez a cada intervalo
+TOUCH_INTERVAL_SECONDS = 300
+# Por quanto tempo uma validação é reaproveitada sem consultar o banco
+CACHE_SECONDS = 60
+CACHE_MAX_ENTRIES = 10000
+
+_signing_key = None
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_connect = None
+_session_conn = None
+_session_conn_lock = threading.Lock()
+
+
+def configure_sessions(signing_key, connect=None):
+    """
+    Define a chave usada para assinar os tokens (chamada uma vez na
+    inicialização) e a função que abre a conexão própria da validação (ex.:
+    database.open_connection). Sem 'connect', valida na conexão recebida.
+    """
+    global _signing_key, _connect, _session_conn
+    _signing_key = signing_key.encode('utf-8') if isinstance(signing_key, str) else signing_key
+    with _session_conn_lock:
+        _connect = connect
+        _session_conn = None
+
+
+def _session_connection():
+    global _session_conn
+    if _session_conn is None or not _session_conn.is_connected():
+        _session_conn = _connect()
+        _session_conn.autocommit = True
+    return _session_conn
+
+
+def _sign(session_id):
+    digest = hmac.new(_signing_key, session_id.encode('ascii'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode('ascii')
+
+
+def _token_hash(token):
+    """Confere a assinatura e retorna o hash guardado no banco, ou None se o token for inválido."""
+    if not token or _signing_key is None or token.count(".") != 1:
+        return None
+    session_id, signature = token.split(".")
+    try:
+        expected = _sign(session_id)
+    except UnicodeEncodeError:
+        return None
+    if not hmac.compare_digest(signature, expected):
+        return None
+    return hashlib.sha256(session_id.encode('ascii')).hexdigest()
+
+
+def forget_cached_sessions():
+    """Descarta as validações em cache deste processo (ex.: após revogar sessões)."""
+    with _cache_lock:
+        _cache.clear()
+
+
+# Revogações feitas por outros processos chegam pelo barramento de cache
+subscribe('user_sessions', forget_cached_sessions)
+
+
+def create_session(conn, user_id):
+    """Cria uma sessão para o usuário e retorna o token para o navegador (None em caso de erro)."""
+    session_id = secrets.token_urlsafe(32)
+    token = f"{session_id}.{_sign(session_id)}"
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM user_sessions WHERE user_id = %s AND expires_at < NOW()", (user_id,))
+        cursor.execute(
+            "INSERT INTO user_sessions (token_hash, user_id, expires_at) "
+            "VALUES (%s, %s, NOW() + INTERVAL %s MINUTE)",
+            (_token_hash(token), user_id, SESSION_IDLE_MINUTES)
+        )
+        conn.commit()
+        cursor.close()
+        return token
+    except mysql.connector.Error as err:
+        print(f"Erro ao criar sessão: {err}")
+        conn.rollback()
+        return None
+
+
+def validate_session(conn, token):
+    """
+    Retorna os dados do usuário dono do token (id, name, email, phone,
+    permission_level, force_password_change) se a sessão existir, não estiver
+    revogada nem vencida e o usuário estiver ativo; caso contrário, None.
+    """
+    token_hash = _token_hash(token)
+    if token_hash is None:
+        return None
+
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(token_hash)
+        if cached is not None and now - cached[1] < CACHE_SECONDS:
+            _cache.move_to_end(token_hash)
+            return dict(cached[0])
+
+    try:
+        with _session_conn_lock:
+            user = _load_session(_session_connection() if _connect else conn, token_hash)
+    except mysql.connector.Error as err:
+        print(f"Erro ao validar sessão: {err}")
+        return None
+    if user is None:
+        return None
+
+    with _cache_lock:
+        _cache[token_hash] = (user, now)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return dict(user)
+
+
+def _load_session(conn, token_hash):
+    """
+    Busca a sessão válida do token e renova o prazo. Na conexão em autocommit
+    cada comando vale sozinho; em uma conexão comum, só faz commit se não havia
+    transação aberta antes (a de outra operação nunca é encerrada aqui).
+    """
+    can_commit = not conn.in_transaction
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT u.id, u.name, u.email, u.phone, u.permission_level, u.force_password_change,
+               TIMESTAMPDIFF(SECOND, s.last_seen_at, NOW()) AS idle_seconds
+        FROM user_sessions s
+        JOIN users u ON u.id = s.user_id
+        WHERE s.token_hash = %s AND s.revoked_at IS NULL AND s.expires_at > NOW() AND u.status = 'ativo'
+    """, (token_hash,))
+    user = cursor.fetchone()
+
+    # Validade deslizante, gravada no máximo a cada TOUCH_INTERVAL_SECONDS
+    if user is not None and user.pop('idle_seconds') >= TOUCH_INTERVAL_SECONDS and can_commit:
+        cursor.execute(
+            "UPDATE user_sessions SET last_seen_at = NOW(), expires_at = NOW() + INTERVAL %s MINUTE "
+            "WHERE token_hash = %s",
+            (SESSION_IDLE_MINUTES, token_hash)
+        )
+    if can_commit and conn.in_transaction:
+        conn.commit()
+    cursor.close()
+    return user
+
+
+def revoke_session(conn, token):
+    """Encerra a sessão do token (logout)."""
+    token_hash = _token_hash(token)
+    if token_hash is None:
+        return False, "Sessão inválida."
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE user_sessions SET revoked_at = NOW() WHERE token_hash = %s", (token_hash,))
+        publish(cursor, 'user_sessions')
+        conn.commit()
+        cursor.close()
+        forget_cached_sessions()
+        return True, "Sessão encerrada."
+    except mysql.connector.Error as err:
+        conn.rollback()
+        return False, f"Erro ao encerrar sessão: {err}"
+
+
+def revoke_user_sessions(cursor, user_id):
+    """
+    Revoga todas as sessões abertas do usuário. Deve ser chamada com o cursor
+    da escrita que a motivou (ex.: desativação), antes do commit; depois do
+    commit, chame forget_cached_sessions() para valer também neste processo.
+    """
+    cursor.execute("UPDATE user_sessions SET revoked_at = NOW() WHERE user_id = %s AND revoked_at IS NULL", (user_id,))
+    publish(cursor, 'user_sessions')
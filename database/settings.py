@@ -8,17 +8,17 @@
 
 import streamlit as st
 import mysql.connector
-from .logs import log_action
+from .logs import ENTITY_SETTING
+from .unit_of_work import unit_of_work
+from .statements import run_statement
+from .cache_bus import publish, subscribe
 
 @st.cache_data(ttl=60)
 def get_setting(_conn, setting_key):
     """Busca o valor de uma configuração específica no banco de dados."""
     try:
-        cursor = _conn.cursor(dictionary=True)
-        cursor.execute("SELECT setting_value FROM system_settings WHERE setting_key = %s", (setting_key,))
-        result = cursor.fetchone()
-        cursor.close()
-        return result['setting_value'] if result else None
+        rows = run_statement(_conn, 'get_setting', (setting_key,), fetch=True)
+        return rows[0]['setting_value'] if rows else None
     except mysql.connector.Error as err:
         print(f"Erro ao buscar configuração '{setting_key}': {err}")
         return None
@@ -39,46 +39,50 @@ def get_all_settings(_conn):
         print(f"Erro ao buscar todas as configurações: {err}")
         return settings
 
+# Alterações feitas por outros processos chegam pelo barramento de cache
+subscribe('system_settings', get_setting.clear)
+subscribe('system_settings', get_all_settings.clear)
+
 def set_setting(conn, setting_key, setting_value, performing_user_id):
     """Salva ou atualiza uma configuração no banco de dados e registra no log."""
     try:
-        cursor = conn.cursor()
-        query = "INSERT INTO system_settings (setting_key, setting_value) VALUES (%s, %s) ON DUPLICATE KEY UPDATE setting_value = VALUES(setting_value)"
-        cursor.execute(query, (setting_key, setting_value))
-        conn.commit()
-        cursor.close()
+        with unit_of_work(conn) as uow:
+            query = "INSERT INTO system_settings (setting_key, setting_value) VALUES (%s, %s) ON DUPLICATE KEY UPDATE setting_value = VALUES(setting_value)"
+            uow.cursor.execute(query, (setting_key, setting_value))
+            publish(uow.cursor, 'system_settings')
 
-        details = f"Admin (ID: {performing_user_id}) atualizou a configuração '{setting_key}'."
-        log_action(conn, performing_user_id, 'SETTING_UPDATED', details)
+            details = f"Admin (ID: {performing_user_id}) atualizou a configuração '{setting_key}'."
+            uow.log(performing_user_id, 'SETTING_UPDATED', details, ENTITY_SETTING, setting_key)
+        get_setting.clear()
+        get_all_settings.clear()
         return True, "Configuração salva com sucesso!"
     except mysql.connector.Error as err:
-        conn.rollback()
         return False, f"Erro ao salvar configuração: {err}"
 
 # --- NOVA FUNÇÃO ROBUSTA ---
 def set_multiple_settings(conn, settings_dict, performing_user_id):
     """
     Salva ou atualiza múltiplas configurações em uma única transação segura.
-    Se uma falhar, todas são desfeitas (rollback).
+    Se uma falhar, todas são desfeitas (rollback), inclusive os logs.
     """
     try:
-        cursor = conn.cursor()
-        query = "INSERT INTO system_settings (setting_key, setting_value) VALUES (%s, %s) ON DUPLICATE KEY UPDATE setting_value = VALUES(setting_value)"
-        
-        # Prepara os dados para a inserção em lote
-        data_to_save = list(settings_dict.items())
-        cursor.executemany(query, data_to_save)
+        with unit_of_work(conn) as uow:
+            query = "INSERT INTO system_settings (setting_key, setting_value) VALUES (%s, %s) ON DUPLICATE KEY UPDATE setting_value = VALUES(setting_value)"
 
-        # Registra um log para cada alteração individual
-        for key, value in settings_dict.items():
-            details = f"Admin (ID: {performing_user_id}) atualizou a configuração '{key}'."
-            log_action(conn, performing_user_id, 'SETTING_UPDATED', details)
+            # Prepara os dados para a inserção em lote
+            data_to_save = list(settings_dict.items())
+            uow.cursor.executemany(query, data_to_save)
 
-        conn.commit()
-        cursor.close()
+            # Um log por alteração, gravados juntos em um único INSERT no commit
+            for key in settings_dict:
+                details = f"Admin (ID: {performing_user_id}) atualizou a configuração '{key}'."
+                uow.log(performing_user_id, 'SETTING_UPDATED', details, ENTITY_SETTING, key)
+
+            publish(uow.cursor, 'system_settings')
+        get_setting.clear()
+        get_all_settings.clear()
         return True, "Configurações salvas com sucesso!"
     except mysql.connector.Error as err:
-        conn.rollback()
         return False, f"Erro ao salvar configurações: {err}"
 
 
@@ -88,7 +92,7 @@ def populate_initial_settings(conn):
     # --- ALTERAÇÃO AQUI: Renomeia 'login_bg_url' para 'login_bg_base64' ---
     cursor.execute("""
         INSERT IGNORE INTO system_settings (setting_key, setting_value)
-        VALUES ('login_title', 'Login do Sistema'), ('login_bg_base64', '')
+        VALUES ('login_title', 'Login do Sistema'), ('login_bg_base64', ''), ('discovery_cidr_ranges', ''), ('perf_persist_enabled', '0')
     """)
     conn.commit()
     cursor.close()
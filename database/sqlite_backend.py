@@ -0,0 +1,381 @@
+# --------------------------------------------------------------------------------
+# sqlite_backend.py (Módulo do Banco Embutido SQLite)
+#
+# Descrição:
+# Alternativa ao MySQL para instalações de uma única máquina (ex.: filiais
+# pequenas): o banco é um arquivo SQLite em modo WAL, aberto no próprio
+# processo, sem servidor nem ida à rede. A conexão imita a parte da API do
+# mysql-connector usada pelo pacote (cursores comuns, dictionary, raw e
+# prepared; commit/rollback; in_transaction; autocommit), então as funções do
+# pacote não mudam. O SQL escrito para o MySQL é traduzido na primeira
+# execução de cada texto (e guardado em cache): placeholders %s, ENUM,
+# AUTO_INCREMENT, índices dentro do CREATE TABLE, INSERT IGNORE, ON DUPLICATE
+# KEY UPDATE, NOW() +/- INTERVAL, TIMESTAMPDIFF, FOR UPDATE e UPDATE ... LIMIT.
+# Os erros do SQLite são relançados como erros do mysql.connector (duplicata
+# com errno 1062), para que o tratamento de erros existente continue valendo.
+# A busca FULLTEXT não existe aqui: search_logs usa só o LIKE.
+# --------------------------------------------------------------------------------
+
+import datetime
+import decimal
+import functools
+import os
+import re
+import sqlite3
+import mysql.connector
+
+BACKEND = 'sqlite'
+
+# Ajustes aplicados a cada conexão aberta
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",        # leitores não bloqueiam o escritor (e vice-versa)
+    "PRAGMA synchronous = NORMAL",      # seguro em WAL; fsync só nos checkpoints
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",       # espera um escritor concorrente em vez de falhar na hora
+    "PRAGMA cache_size = -65536",       # 64 MB de páginas em memória
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",     # leituras via mmap (256 MB)
+)
+STATEMENT_CACHE_SIZE = 512
+
+_NOW = "datetime('now', 'localtime')"
+_NOW_MICRO = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+
+
+def is_sqlite(conn):
+    """Indica se a conexão (mesmo envolvida por instrumentação) é a do SQLite embutido."""
+    return getattr(conn, 'backend', None) == BACKEND
+
+
+# --- Conversão de valores ---
+
+def _parse_datetime(value):
+    try:
+        return datetime.datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value.decode()[:10])
+    except ValueError:
+        return value.decode()
+
+
+# Colunas declaradas como data/hora voltam como datetime, como no MySQL
+for _decltype in ("TIMESTAMP", "DATETIME"):
+    sqlite3.register_converter(_decltype, _parse_datetime)
+sqlite3.register_converter("DATE", _parse_date)
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(sep=" "))
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(decimal.Decimal, str)
+
+_NATIVE = (str, int, float, bytes, type(None))
+
+
+def _param(value):
+    if isinstance(value, bytes):
+        # O MySQL grava bytes em colunas de texto como texto (ex.: hash do bcrypt); o SQLite gravaria um BLOB
+        try:
+            return value.decode('utf-8')
+        except UnicodeDecodeError:
+            return value
+    if isinstance(value, _NATIVE):
+        return value
+    # Escalares do NumPy (ex.: ids lidos de um DataFrame)
+    item = getattr(value, 'item', None)
+    return item() if item is not None else value
+
+
+# --- Tradução do SQL ---
+
+def _split_top_level(body):
+    """Separa as definições de um CREATE TABLE pelas vírgulas fora de parênteses."""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(body):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(body[start:i].strip())
+            start = i + 1
+    parts.append(body[start:].strip())
+    return [part for part in parts if part]
+
+
+def _translate_column(definition):
+    definition = re.sub(r"\b(\w+)\s+ENUM\s*\(([^)]*)\)", r"\1 TEXT CHECK (\1 IN (\2))", definition, flags=re.I)
+    definition = re.sub(r"\b(?:BIG)?INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT",
+                        definition, flags=re.I)
+    definition = re.sub(r"\s+UNSIGNED\b", "", definition, flags=re.I)
+    definition = re.sub(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP(\(\d\))?", "", definition, flags=re.I)
+    definition = re.sub(r"DEFAULT\s+CURRENT_TIMESTAMP\(\d\)", f"DEFAULT ({_NOW_MICRO})", definition, flags=re.I)
+    return re.sub(r"DEFAULT\s+CURRENT_TIMESTAMP\b", f"DEFAULT ({_NOW})", definition, flags=re.I)
+
+
+def _index_statement(table, name, columns):
+    return f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+
+
+def _translate_create_table(match):
+    table, body = match.group(1), match.group(2)
+    definitions, indexes = [], []
+    for part in _split_top_level(body):
+        index = re.match(r"(FULLTEXT\s+)?(?:INDEX|KEY)\s+(\w+)\s*\((.*)\)$", part, re.I | re.S)
+        if index:
+            # Índices vão em comandos próprios; FULLTEXT não tem equivalente
+            if not index.group(1):
+                indexes.append(_index_statement(table, index.group(2), index.group(3)))
+            continue
+        unique = re.match(r"UNIQUE\s+KEY\s*(?:\w+\s*)?\((.*)\)$", part, re.I | re.S)
+        if unique:
+            definitions.append(f"UNIQUE ({unique.group(1)})")
+            continue
+        definitions.append(_translate_column(part))
+    return (f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(definitions)})", *indexes)
+
+
+def _translate_alter(match):
+    table, addition = match.group(1), match.group(2).strip()
+    index = re.match(r"(FULLTEXT\s+)?(?:INDEX|KEY)\s+(\w+)\s*\((.*)\)$", addition, re.I | re.S)
+    if index:
+        return () if index.group(1) else (_index_statement(table, index.group(2), index.group(3)),)
+    return (f"ALTER TABLE {table} ADD {_translate_column(addition)}",)
+
+
+def _translate_upsert(sql):
+    head, assignments = re.split(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", sql, maxsplit=1, flags=re.I)
+    assignments = re.sub(r"\bVALUES\s*\((\w+)\)", r"excluded.\1", assignments, flags=re.I)
+    # INSERT ... SELECT: sem o WHERE, o SQLite leria o ON CONFLICT como parte de um JOIN
+    if re.search(r"\)\s+AS\s+\w+\s*$", head, re.I):
+        head = head.rstrip() + " WHERE true"
+    return f"{head.rstrip()} ON CONFLICT DO UPDATE SET {assignments.strip()}"
+
+
+def _timestampdiff(match):
+    unit, start, end = match.group(1).upper(), match.group(2), match.group(3)
+    factor = 86400 if unit == "SECOND" else 86400000000
+    return f"CAST((julianday({end}) - julianday({start})) * {factor} AS INTEGER)"
+
+
+_EXPRESSION_RULES = (
+    (re.compile(r"\bTIMESTAMPDIFF\(\s*(SECOND|MICROSECOND)\s*,\s*([\w.]+)\s*,\s*(NOW\(6?\)|[\w.]+)\s*\)", re.I),
+     _timestampdiff),
+    (re.compile(r"\bNOW\(\)\s*([+-])\s*INTERVAL\s+(\?|\d+)\s+(SECOND|MINUTE|HOUR|DAY)\b", re.I),
+     lambda m: f"datetime('now', 'localtime', '{m.group(1)}' || {m.group(2)} || ' {m.group(3).lower()}')"),
+    (re.compile(r"\bNOW\(6\)|\bCURRENT_TIMESTAMP\(6\)", re.I), lambda m: _NOW_MICRO),
+    (re.compile(r"\bNOW\(\)", re.I), lambda m: _NOW),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), lambda m: "INSERT OR IGNORE"),
+    # Comparação que trata NULL como valor
+    (re.compile(r"\s*<=>\s*"), lambda m: " IS "),
+    # No MySQL a barra invertida já é o escape padrão do LIKE
+    (re.compile(r"\bLIKE\s+\?", re.I), lambda m: "LIKE ? ESCAPE '\\'"),
+    (re.compile(r"^\s*EXPLAIN\s+(?!QUERY\b)", re.I), lambda m: "EXPLAIN QUERY PLAN "),
+    (re.compile(r"\bFROM\s+information_schema\.COLUMNS\s+WHERE\s+TABLE_SCHEMA\s*=\s*DATABASE\(\)\s+AND\s+"
+                r"TABLE_NAME\s*=\s*\?\s+AND\s+COLUMN_NAME\s*=\s*\?", re.I),
+     lambda m: "FROM pragma_table_info(?) WHERE name = ?"),
+    (re.compile(r"\bFROM\s+information_schema\.STATISTICS\s+WHERE\s+TABLE_SCHEMA\s*=\s*DATABASE\(\)\s+AND\s+"
+                r"TABLE_NAME\s*=\s*\?\s+AND\s+INDEX_NAME\s*=\s*\?", re.I),
+     lambda m: "FROM pragma_index_list(?) WHERE name = ?"),
+)
+
+_CREATE_TABLE = re.compile(r"^\s*CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)\s*\((.*)\)\s*$", re.I | re.S)
+_ALTER_ADD = re.compile(r"^\s*ALTER\s+TABLE\s+(\w+)\s+ADD\s+(.*)$", re.I | re.S)
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\s*$", re.I)
+_UPDATE_LIMIT = re.compile(r"^\s*UPDATE\s+(\w+)\s+SET\s+(.*?)\s+WHERE\s+(.*?)\s+ORDER\s+BY\s+(.*?)\s+LIMIT\s+(\S+)\s*$",
+                           re.I | re.S)
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(sql):
+    """
+    Traduz um comando escrito para o MySQL. Retorna (comandos, trava_escrita):
+    os comandos SQLite equivalentes (um CREATE TABLE vira a tabela mais os
+    índices; um FULLTEXT vira nenhum) e se o original tinha FOR UPDATE.
+    """
+    sql = sql.replace("%s", "?")
+    create = _CREATE_TABLE.match(sql)
+    if create:
+        return _translate_create_table(create), False
+    alter = _ALTER_ADD.match(sql)
+    if alter:
+        return _translate_alter(alter), False
+
+    for pattern, replacement in _EXPRESSION_RULES:
+        sql = pattern.sub(replacement, sql)
+    if re.search(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", sql, re.I):
+        sql = _translate_upsert(sql)
+    # UPDATE ... ORDER BY ... LIMIT (reserva de lotes) só existe no SQLite compilado com opção própria
+    update = _UPDATE_LIMIT.match(sql)
+    if update:
+        table, assignments, where, order, limit = update.groups()
+        sql = (f"UPDATE {table} SET {assignments} WHERE rowid IN "
+               f"(SELECT rowid FROM {table} WHERE {where} ORDER BY {order} LIMIT {limit})")
+    locking = bool(_FOR_UPDATE.search(sql))
+    if locking:
+        sql = _FOR_UPDATE.sub("", sql)
+    return (sql,), locking
+
+
+# --- Erros ---
+
+def _mysql_error(err):
+    """Relança o erro do SQLite como o erro equivalente do mysql.connector."""
+    message = str(err)
+    if isinstance(err, sqlite3.IntegrityError):
+        if message.startswith("UNIQUE") or "PRIMARY KEY" in message:
+            return mysql.connector.IntegrityError(msg=message, errno=1062)
+        if "FOREIGN KEY" in message:
+            return mysql.connector.IntegrityError(msg=message, errno=1452)
+        return mysql.connector.IntegrityError(msg=message)
+    if isinstance(err, sqlite3.OperationalError) and "locked" in message:
+        return mysql.connector.OperationalError(msg=message, errno=1205)
+    if isinstance(err, sqlite3.OperationalError):
+        return mysql.connector.ProgrammingError(msg=message)
+    return mysql.connector.DatabaseError(msg=message)
+
+
+# --- Conexão e cursor ---
+
+class SQLiteCursor:
+    """Cursor com a interface do mysql-connector usada pelo pacote."""
+
+    def __init__(self, connection, dictionary=False, raw=False):
+        self._connection = connection
+        self._cursor = connection._db.cursor()
+        self._dictionary = dictionary
+        self._raw = raw
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        statements, locking = translate(operation)
+        params = tuple(_param(value) for value in params) if params else ()
+        try:
+            if locking and not self._connection._db.in_transaction:
+                # Equivalente ao FOR UPDATE: a transação já começa com a trava de escrita
+                self._cursor.execute("BEGIN IMMEDIATE")
+            for statement in statements:
+                self._cursor.execute(statement, params)
+                params = ()
+        except sqlite3.Error as err:
+            raise _mysql_error(err) from err
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        statements, _ = translate(operation)
+        try:
+            self._cursor.executemany(statements[0], [tuple(_param(value) for value in row) for row in seq_params])
+        except sqlite3.Error as err:
+            raise _mysql_error(err) from err
+
+    def _convert(self, row):
+        if self._raw:
+            # Como o cursor raw do conector: bytes (texto do protocolo) ou None
+            return tuple(value if value is None or isinstance(value, bytes) else str(value).encode() for value in row)
+        if self._dictionary:
+            return dict(zip(self.column_names, row))
+        return row
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else self._convert(row)
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._convert(row) for row in self._cursor.fetchmany(size)]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Conexão com o arquivo SQLite, com a interface do mysql-connector usada pelo pacote."""
+
+    backend = BACKEND
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+        for pragma in PRAGMAS:
+            self._db.execute(pragma)
+        self._closed = False
+        self.database = os.path.basename(path)
+
+    def cursor(self, dictionary=False, raw=False, prepared=False, buffered=None, **kwargs):
+        # 'prepared' não muda nada: o SQLite já reaproveita os comandos compilados (cached_statements)
+        return SQLiteCursor(self, dictionary=dictionary, raw=raw)
+
+    def commit(self):
+        try:
+            self._db.commit()
+        except sqlite3.Error as err:
+            raise _mysql_error(err) from err
+
+    def rollback(self):
+        self._db.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._db.in_transaction
+
+    @property
+    def autocommit(self):
+        return self._db.isolation_level is None
+
+    @autocommit.setter
+    def autocommit(self, value):
+        self._db.isolation_level = None if value else ""
+
+    @property
+    def connection_id(self):
+        return id(self._db)
+
+    def get_server_info(self):
+        return f"SQLite {sqlite3.sqlite_version}"
+
+    def is_connected(self):
+        return not self._closed
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        pass
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._db.close()
+
+
+def connect(path):
+    """Abre (criando, se preciso) o banco SQLite do arquivo 'path'."""
+    return SQLiteConnection(path)
@@ -0,0 +1,141 @@
+# --------------------------------------------------------------------------------
+# statements.py (Módulo de Instruções Preparadas)
+#
+# Descrição:
+# Registro das consultas mais frequentes do sistema (login, permissão de
+# página, configuração, log e atualização SNMP), executadas como instruções
+# preparadas no servidor: o texto SQL é enviado e analisado uma única vez por
+# conexão, e cada execução seguinte manda só o id da instrução e os
+# parâmetros. As instruções são preparadas sob demanda e de novo quando a
+# conexão é refeita (o servidor as descarta ao desconectar).
+# --------------------------------------------------------------------------------
+
+import threading
+import weakref
+import mysql.connector
+from .instrumentation import InstrumentedConnection
+from .routing import RoutedConnection
+
+# Erro do servidor para um id de instrução que ele não conhece mais
+ER_UNKNOWN_STMT_HANDLER = 1243
+
+# nome -> (SQL, resultado como dicionário)
+STATEMENTS = {
+    'check_login': (
+        "SELECT *, force_password_change FROM users WHERE email = %s AND status = 'ativo'", True),
+    'check_page_access': (
+        "SELECT can_access FROM page_permissions WHERE page_name = %s AND permission_level = %s", True),
+    'get_setting': (
+        "SELECT setting_value FROM system_settings WHERE setting_key = %s", True),
+    'log_action': (
+        "INSERT INTO user_logs (performing_user_id, action_type, details, entity_type, entity_id, changes) "
+        "VALUES (%s, %s, %s, %s, %s, %s)", False),
+    # Só altera a linha (e 'updated_at', que move o feed do painel) se algum valor mudou
+    'update_printer_details': (
+        """UPDATE printers SET
+               status = %s,
+               status_detalhado = %s,
+               toner_preto = %s,
+               toner_ciano = %s,
+               toner_magenta = %s,
+               toner_amarelo = %s,
+               contagem_paginas = %s,
+               updated_at = CURRENT_TIMESTAMP(6)
+           WHERE id = %s AND NOT (status <=> %s AND status_detalhado <=> %s AND toner_preto <=> %s
+               AND toner_ciano <=> %s AND toner_magenta <=> %s AND toner_amarelo <=> %s
+               AND contagem_paginas <=> %s)""", False),
+}
+
+_metrics_lock = threading.Lock()
+_metrics = {name: {'execucoes': 0, 'preparacoes': 0, 'erros': 0} for name in STATEMENTS}
+
+# Conexão real -> instruções preparadas nela (some junto com a conexão)
+_prepared = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+
+class _PreparedSet:
+    """Cursores preparados de uma conexão, válidos enquanto o id da sessão no servidor não mudar."""
+
+    def __init__(self, connection_id):
+        self.connection_id = connection_id
+        self.cursors = {}
+        # Um cursor preparado guarda o resultado da última execução: threads
+        # que compartilham a conexão executam e leem uma de cada vez
+        self.lock = threading.Lock()
+
+
+def _raw(conn):
+    """Conexão do conector por trás dos envoltórios (instrumentação, roteamento)."""
+    while isinstance(conn, (InstrumentedConnection, RoutedConnection)):
+        conn = conn._conn if isinstance(conn, InstrumentedConnection) else conn.primary
+    return conn
+
+
+def _prepared_set(conn):
+    raw = _raw(conn)
+    connection_id = getattr(raw, 'connection_id', None)
+    with _prepared_lock:
+        prepared = _prepared.get(raw)
+        if prepared is None or prepared.connection_id != connection_id:
+            # Conexão nova ou refeita: as instruções antigas não existem mais no servidor
+            prepared = _prepared[raw] = _PreparedSet(connection_id)
+        return prepared
+
+
+def _count(name, field):
+    with _metrics_lock:
+        _metrics[name][field] += 1
+
+
+def _discard(prepared, name):
+    """Fecha o cursor da instrução (liberando-a no servidor), para que seja preparada de novo."""
+    cursor = prepared.cursors.pop(name, None)
+    if cursor is not None:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+
+
+def _execute(conn, prepared, name, params):
+    sql, dictionary = STATEMENTS[name]
+    cursor = prepared.cursors.get(name)
+    if cursor is None:
+        # Criado pela conexão recebida, para que a instrumentação continue contando as execuções
+        cursor = prepared.cursors[name] = conn.cursor(prepared=True, dictionary=dictionary)
+        _count(name, 'preparacoes')
+    # O conector só prepara de novo quando recebe outro objeto de texto SQL
+    cursor.execute(sql, params)
+    return cursor
+
+
+def run_statement(conn, name, params, fetch=False):
+    """
+    Executa a instrução registrada 'name' com 'params'. Com fetch=True retorna
+    a lista de linhas; senão, o número de linhas afetadas. Não faz commit.
+    """
+    prepared = _prepared_set(conn)
+    with prepared.lock:
+        try:
+            try:
+                cursor = _execute(conn, prepared, name, params)
+            except mysql.connector.Error as err:
+                if err.errno != ER_UNKNOWN_STMT_HANDLER:
+                    raise
+                # O servidor descartou a instrução (ex.: sessão refeita pelo proxy): prepara de novo
+                prepared.cursors.pop(name, None)
+                cursor = _execute(conn, prepared, name, params)
+            result = cursor.fetchall() if fetch else cursor.rowcount
+        except mysql.connector.Error:
+            _count(name, 'erros')
+            _discard(prepared, name)
+            raise
+    _count(name, 'execucoes')
+    return result
+
+
+def get_statement_metrics():
+    """Execuções, preparações e erros por instrução registrada (desde o início do processo)."""
+    with _metrics_lock:
+        return [{'instrucao': name, **values} for name, values in _metrics.items()]
@@ -0,0 +1,59 @@
+# --------------------------------------------------------------------------------
+# unit_of_work.py (Módulo de Unidade de Trabalho)
+#
+# Descrição:
+# Agrupa uma alteração de dados e os registros de auditoria que a descrevem
+# em uma única transação: as escritas usam o cursor da unidade, os logs são
+# acumulados e gravados juntos em um INSERT de várias linhas no final, e há
+# um único commit. Se qualquer comando falhar, nada é gravado (nem o log).
+#
+#   with unit_of_work(conn) as uow:
+#       uow.cursor.execute("UPDATE ...", params)
+#       bump_table_version(uow.cursor, 'tabela')
+#       uow.log(user_id, 'ACAO', "Detalhes...", ENTITY_USER, alvo_id, {'campo': valor})
+#   index_upsert(...)  # efeitos locais (índices, caches) só depois do commit
+# --------------------------------------------------------------------------------
+
+from contextlib import contextmanager
+from .logs import log_row, insert_log_rows
+
+
+class UnitOfWork:
+    """Transação em andamento: o cursor das escritas e os logs ainda não gravados."""
+
+    def __init__(self, conn, **cursor_options):
+        self.conn = conn
+        self.cursor = conn.cursor(**cursor_options)
+        self._log_rows = []
+
+    def log(self, performing_user_id, action_type, details, entity_type=None, entity_id=None, changes=None):
+        """Agenda um registro de auditoria para ser gravado na mesma transação."""
+        self._log_rows.append(log_row(performing_user_id, action_type, details, entity_type, entity_id, changes))
+
+    def commit(self):
+        if self._log_rows:
+            insert_log_rows(self.cursor, self._log_rows)
+        self.conn.commit()
+        self.cursor.close()
+
+    def rollback(self):
+        self.conn.rollback()
+        self.cursor.close()
+
+
+@contextmanager
+def unit_of_work(conn, **cursor_options):
+    """
+    Abre uma unidade de trabalho sobre a conexão. Ao sair do bloco sem erro,
+    grava os logs pendentes e faz um único commit; com erro (inclusive na
+    gravação dos logs ou no commit), desfaz tudo e repassa a exceção.
+    """
+    uow = UnitOfWork(conn, **cursor_options)
+    try:
+        yield uow
+        # Dentro do try: se a gravação dos logs ou o commit falharem, a
+        # transação também é desfeita, em vez de ficar aberta na conexão
+        uow.commit()
+    except BaseException:
+        uow.rollback()
+        raise
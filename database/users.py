@@ -1,11 +1,24 @@
 import bcrypt
-import pandas as pd
 import mysql.connector
 import secrets
 import string
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 # Importa funções de outros módulos do mesmo pacote
-from .logs import log_action
+from .logs import log_action, ENTITY_USER
+from .unit_of_work import unit_of_work
+from .statements import run_statement
+from .search_index import index_upsert, invalidate_index, search_ids
+from .read_cache import bump_table_version, cached_read
+from .cache_bus import publish
+from .routing import reader
+from .frames import read_frame, USERS_SCHEMA
+from .lazy import lazy_import
+from .sessions import revoke_user_sessions, forget_cached_sessions
+
+# pandas só é carregado na primeira leitura em DataFrame (mantém leve a tela de login)
+pd = lazy_import("pandas")
 
 def hash_password(password):
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
@@ -22,6 +35,24 @@ def generate_strong_password(length=12):
             return password
 
 
+def _generate_and_hash_password(_=None):
+    """Gera uma senha temporária e o seu hash (executada nos processos do pool)."""
+    password = generate_strong_password()
+    return password, hash_password(password).decode('utf-8')
+
+def generate_hashed_passwords(count, max_workers=None):
+    """
+    Gera 'count' pares (senha_em_texto_puro, hash) em paralelo num pool de processos,
+    já que o bcrypt é propositalmente lento (~0,25 s por hash).
+    """
+    if count <= 0:
+        return []
+    if count == 1:
+        return [_generate_and_hash_password()]
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(_generate_and_hash_password, range(count), chunksize=8))
+
+
 def add_user(conn, name, phone, email, permission_level, performing_user_id=None):
     """
     Adiciona um novo utilizador, gera uma senha temporária automaticamente
@@ -33,29 +64,29 @@ def add_user(conn, name, phone, email, permission_level, performing_user_id=None
         new_password = generate_strong_password()
         hashed_pw = hash_password(new_password)
 
-        cursor = conn.cursor()
-
-        # 2. Insere o utilizador com a senha e a flag
-        query = """
-                INSERT INTO users (name, phone, email, password, permission_level, force_password_change)
-                VALUES (%s, %s, %s, %s, %s, TRUE) \
-                """
-        params = (name, phone, email, hashed_pw, permission_level)
-
-        cursor.execute(query, params)
-        new_user_id = cursor.lastrowid
-        conn.commit()
-        cursor.close()
-
-        if performing_user_id:
-            details = f"Utilizador (ID: {performing_user_id}) criou o novo utilizador '{email}' (ID: {new_user_id}). Senha temporária gerada."
-            log_action(conn, performing_user_id, 'USER_CREATED', details)
+        # 2. Insere o utilizador com a senha e a flag (e o log, na mesma transação)
+        with unit_of_work(conn) as uow:
+            query = """
+                    INSERT INTO users (name, phone, email, password, permission_level, force_password_change)
+                    VALUES (%s, %s, %s, %s, %s, TRUE) \
+                    """
+            params = (name, phone, email, hashed_pw, permission_level)
+
+            uow.cursor.execute(query, params)
+            new_user_id = uow.cursor.lastrowid
+            bump_table_version(uow.cursor, 'users')
+            publish(uow.cursor, 'search_index:users')
+
+            if performing_user_id:
+                details = f"Utilizador (ID: {performing_user_id}) criou o novo utilizador '{email}' (ID: {new_user_id}). Senha temporária gerada."
+                uow.log(performing_user_id, 'USER_CREATED', details, ENTITY_USER, new_user_id,
+                        {'name': name, 'phone': phone, 'email': email, 'permission_level': permission_level})
+        index_upsert('users', new_user_id, {'name': name, 'email': email, 'phone': phone})
 
         # 3. Retorna a senha em texto puro para ser enviada por email
         return True, new_password, "Utilizador criado com sucesso! Email com senha temporária será enviado."
 
     except mysql.connector.Error as err:
-        conn.rollback()
         if err.errno == 1062:  # Erro de entrada duplicada
             return False, None, "Erro: O email fornecido já está cadastrado."
         return False, None, f"Erro ao adicionar utilizador: {err}"
@@ -63,15 +94,13 @@ def add_user(conn, name, phone, email, permission_level, performing_user_id=None
 def check_login(conn, email, password):
     """Verifica credenciais e retorna dados do utilizador, incluindo force_password_change."""
     try:
-        cursor = conn.cursor(dictionary=True)
-        # Ainda seleciona a flag force_password_change
-        cursor.execute("SELECT *, force_password_change FROM users WHERE email = %s AND status = 'ativo'", (email,))
-        user = cursor.fetchone()
-        cursor.close()
+        # Ainda seleciona a flag force_password_change (instrução preparada 'check_login')
+        rows = run_statement(conn, 'check_login', (email,), fetch=True)
+        user = rows[0] if rows else None
         if user and check_password(password, user['password']):
             details = f"Utilizador '{email}' (ID: {user['id']}) efetuou login."
             # Chama log_action sem IP e User-Agent
-            log_action(conn, user['id'], 'USER_LOGIN', details)
+            log_action(conn, user['id'], 'USER_LOGIN', details, ENTITY_USER, user['id'])
             return user
         return None
     except mysql.connector.Error as err:
@@ -95,6 +124,8 @@ def create_default_admin_if_needed(conn):
                 ("Admin Padrão", "N/A", "admin@projeto.com", hashed_pw, "admin", True)
                 # Força a troca da senha no primeiro login
             )
+            bump_table_version(cursor, 'users')
+            publish(cursor, 'search_index:users')
             conn.commit()
 
             # 3. Imprime a senha no terminal (APENAS na primeira execução)
@@ -111,8 +142,112 @@ def create_default_admin_if_needed(conn):
 
     cursor.close()
 
+def find_existing_emails(conn, emails):
+    """Retorna, em uma única consulta, o conjunto dos emails informados que já estão cadastrados."""
+    emails = list(emails)
+    if not emails:
+        return set()
+    try:
+        cursor = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(emails))
+        cursor.execute(f"SELECT email FROM users WHERE email IN ({placeholders})", emails)
+        existing = {row[0].lower() for row in cursor.fetchall()}
+        cursor.close()
+        return existing
+    except mysql.connector.Error as err:
+        print(f"Erro ao verificar emails existentes: {err}")
+        return set()
+
+def add_users_bulk(conn, users, performing_user_id):
+    """
+    Insere vários utilizadores em uma única transação (executemany) e registra
+    um único log da importação. Cada item de 'users' é um dict com name, phone,
+    email, permission_level e password_hash. Todos recebem force_password_change.
+    """
+    if not users:
+        return False, "Nenhum utilizador para importar."
+    try:
+        with unit_of_work(conn) as uow:
+            query = """
+                    INSERT INTO users (name, phone, email, password, permission_level, force_password_change)
+                    VALUES (%s, %s, %s, %s, %s, TRUE)
+                    """
+            uow.cursor.executemany(query, [
+                (u['name'], u['phone'], u['email'], u['password_hash'], u['permission_level']) for u in users
+            ])
+            bump_table_version(uow.cursor, 'users')
+            publish(uow.cursor, 'search_index:users')
+
+            emails = ", ".join(u['email'] for u in users[:50])
+            if len(users) > 50:
+                emails += f" e mais {len(users) - 50}"
+            details = f"Utilizador (ID: {performing_user_id}) importou {len(users)} utilizador(es) via CSV: {emails}."
+            uow.log(performing_user_id, 'USERS_BULK_CREATED', details, changes={'quantidade': len(users)})
+        invalidate_index('users')
+        return True, f"{len(users)} utilizador(es) importado(s) com sucesso!"
+    except mysql.connector.Error as err:
+        if err.errno == 1062:
+            return False, "Erro: um dos emails do arquivo já está cadastrado. Nenhum utilizador foi importado."
+        return False, f"Erro ao importar utilizadores: {err}"
+
 def get_all_users(conn):
-    return pd.read_sql("SELECT id, name, phone, email, permission_level, status FROM users", conn)
+    conn = reader(conn)
+    return cached_read(conn, ('users',), 'get_all_users',
+                       lambda: read_frame(conn, "SELECT id, name, phone, email, permission_level, status FROM users",
+                                          schema=USERS_SCHEMA))
+
+def _escape_like(term):
+    """Escapa os curingas do LIKE para que o termo seja buscado literalmente."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_users(conn, search_term="", limit=25, offset=0):
+    """
+    Busca paginada de utilizadores. Com termo de busca, usa o índice de trigramas
+    em memória (substring em name, email e phone, ranqueada) e carrega do banco só
+    os ids da página; se o índice estiver indisponível, usa prefixo (LIKE 'termo%')
+    sobre as colunas indexadas. Com limit=None retorna todos os resultados.
+    Retorna (DataFrame da página, total de resultados).
+    """
+    conn = reader(conn)
+    ranked_ids = search_ids(conn, 'users', search_term) if search_term and search_term.strip() else None
+    if ranked_ids is not None:
+        page_ids = ranked_ids[offset:offset + limit] if limit is not None else ranked_ids
+        if not page_ids:
+            return pd.DataFrame(columns=['id', 'name', 'phone', 'email', 'permission_level', 'status']), len(ranked_ids)
+        try:
+            placeholders = ", ".join(["%s"] * len(page_ids))
+            page_df = read_frame(
+                conn, f"SELECT id, name, phone, email, permission_level, status FROM users WHERE id IN ({placeholders})",
+                page_ids, schema=USERS_SCHEMA
+            )
+            # Mantém a ordem de relevância do índice
+            order = {user_id: position for position, user_id in enumerate(page_ids)}
+            page_df = page_df.sort_values('id', key=lambda ids: ids.map(order)).reset_index(drop=True)
+            return page_df, len(ranked_ids)
+        except mysql.connector.Error as err:
+            print(f"Erro ao buscar utilizadores: {err}")
+            return pd.DataFrame(), 0
+
+    where = ""
+    params = []
+    if search_term:
+        pattern = _escape_like(search_term.strip()) + "%"
+        where = " WHERE name LIKE %s OR email LIKE %s OR phone LIKE %s"
+        params = [pattern, pattern, pattern]
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM users" + where, params)
+        total = cursor.fetchone()[0]
+        cursor.close()
+
+        query = "SELECT id, name, phone, email, permission_level, status FROM users" + where + " ORDER BY name, id"
+        if limit is not None:
+            query += " LIMIT %s OFFSET %s"
+            params = params + [int(limit), int(offset)]
+        return read_frame(conn, query, params, schema=USERS_SCHEMA), total
+    except mysql.connector.Error as err:
+        print(f"Erro ao buscar utilizadores: {err}")
+        return pd.DataFrame(), 0
 
 
 # --- NOVA FUNÇÃO AUXILIAR ---
@@ -130,51 +265,52 @@ def find_user_by_email(conn, email):
 
 def update_user_status(conn, user_id, new_status, performing_user_id):
     try:
-        cursor = conn.cursor()
-        cursor.execute("UPDATE users SET status = %s WHERE id = %s", (new_status, user_id))
-        conn.commit()
-        cursor.close()
-        details = f"Usuário (ID: {performing_user_id}) alterou o status do usuário (ID: {user_id}) para '{new_status}'."
-        log_action(conn, performing_user_id, 'USER_STATUS_CHANGED', details)
+        with unit_of_work(conn) as uow:
+            uow.cursor.execute("UPDATE users SET status = %s WHERE id = %s", (new_status, user_id))
+            bump_table_version(uow.cursor, 'users')
+            if new_status != 'ativo':
+                # Desativado: encerra as sessões abertas em todos os processos
+                revoke_user_sessions(uow.cursor, user_id)
+            details = f"Usuário (ID: {performing_user_id}) alterou o status do usuário (ID: {user_id}) para '{new_status}'."
+            uow.log(performing_user_id, 'USER_STATUS_CHANGED', details, ENTITY_USER, user_id, {'status': new_status})
+        forget_cached_sessions()
         return True, "Status alterado com sucesso!"
     except mysql.connector.Error as err:
-        conn.rollback()
         return False, f"Erro ao atualizar status: {err}"
 
 
 def update_user_password(conn, user_id, old_password, new_password, performing_user_id):
     """Altera a senha do utilizador e desativa a flag 'force_password_change'."""
     try:
-        cursor = conn.cursor(dictionary=True)
-        # Busca a senha atual para verificação
-        cursor.execute("SELECT password, email FROM users WHERE id = %s", (user_id,))
-        user = cursor.fetchone()
+        with unit_of_work(conn, dictionary=True) as uow:
+            # Busca a senha atual para verificação
+            uow.cursor.execute("SELECT password, email FROM users WHERE id = %s", (user_id,))
+            user = uow.cursor.fetchone()
+
+            # Se a senha antiga estiver incorreta ou o utilizador não for encontrado
+            if not (user and check_password(old_password, user['password'])):
+                return False, "Senha antiga incorreta."
 
-        # Verifica se o utilizador existe e se a senha antiga está correta
-        if user and check_password(old_password, user['password']):
             new_hashed_pw = hash_password(new_password)
 
             # --- PONTO CRÍTICO DA CORREÇÃO ---
             # Garante que a query UPDATE define force_password_change = FALSE
             update_query = "UPDATE users SET password = %s, force_password_change = FALSE WHERE id = %s"
-            cursor.execute(update_query, (new_hashed_pw, user_id))
+            uow.cursor.execute(update_query, (new_hashed_pw, user_id))
             # --- FIM DA CORREÇÃO ---
 
-            conn.commit()
-            cursor.close()
+            bump_table_version(uow.cursor, 'users')
+            # As sessões em cache ainda guardam force_password_change = TRUE
+            publish(uow.cursor, 'user_sessions')
 
-            # Regista o log da alteração
+            # Regista o log da alteração (desfeito junto se o commit falhar)
             details = f"Utilizador (ID: {performing_user_id}) alterou a própria senha."
-            log_action(conn, performing_user_id, 'PASSWORD_CHANGED', details)
+            uow.log(performing_user_id, 'PASSWORD_CHANGED', details, ENTITY_USER, user_id)
+        forget_cached_sessions()
 
-            return True, "Senha alterada com sucesso!"
-        else:
-            # Se a senha antiga estiver incorreta ou o utilizador não for encontrado
-            cursor.close()
-            return False, "Senha antiga incorreta."
+        return True, "Senha alterada com sucesso!"
 
     except mysql.connector.Error as err:
-        conn.rollback()  # Desfaz a operação em caso de erro
         return False, f"Erro de banco de dados ao alterar senha: {err}"
 
 
@@ -184,35 +320,35 @@ def reset_user_password(conn, user_email, performing_user_id):
     e retorna a senha temporária em texto puro.
     """
     try:
-        # Busca o ID do utilizador pelo email
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id FROM users WHERE email = %s", (user_email,))
-        user = cursor.fetchone()
+        with unit_of_work(conn, dictionary=True) as uow:
+            # Busca o ID do utilizador pelo email
+            uow.cursor.execute("SELECT id FROM users WHERE email = %s", (user_email,))
+            user = uow.cursor.fetchone()
 
-        if not user:
-            cursor.close()
-            return False, "Utilizador não encontrado com este email."
+            if not user:
+                return False, "Utilizador não encontrado com este email."
 
-        user_id_to_reset = user['id']
+            user_id_to_reset = user['id']
 
-        # Gera a nova senha e o hash
-        new_password = generate_strong_password()
-        new_hashed_pw = hash_password(new_password)
+            # Gera a nova senha e o hash
+            new_password = generate_strong_password()
+            new_hashed_pw = hash_password(new_password)
 
-        # Atualiza a senha E ativa a flag force_password_change
-        cursor.execute("UPDATE users SET password = %s, force_password_change = TRUE WHERE id = %s",
-                       (new_hashed_pw, user_id_to_reset))
-        conn.commit()
-        cursor.close()
+            # Atualiza a senha E ativa a flag force_password_change
+            uow.cursor.execute("UPDATE users SET password = %s, force_password_change = TRUE WHERE id = %s",
+                               (new_hashed_pw, user_id_to_reset))
+            bump_table_version(uow.cursor, 'users')
+            # A senha antiga deixa de valer também para quem já estava logado com ela
+            revoke_user_sessions(uow.cursor, user_id_to_reset)
 
-        details = f"Admin (ID: {performing_user_id}) solicitou reset de senha para o utilizador '{user_email}' (ID: {user_id_to_reset})."
-        log_action(conn, performing_user_id, 'PASSWORD_RESET_REQUESTED', details)  # Log da solicitação
+            details = f"Admin (ID: {performing_user_id}) solicitou reset de senha para o utilizador '{user_email}' (ID: {user_id_to_reset})."
+            uow.log(performing_user_id, 'PASSWORD_RESET_REQUESTED', details, ENTITY_USER, user_id_to_reset)  # Log da solicitação
+        forget_cached_sessions()
 
         # Retorna sucesso e a senha em TEXTO PURO para envio por email
         return True, new_password
 
     except mysql.connector.Error as err:
-        conn.rollback()
         return False, f"Erro de banco de dados ao resetar senha: {err}"
 
 def update_user(conn, user_id, name, phone, email, permission_level, performing_user_id):
@@ -221,35 +357,33 @@ def update_user(conn, user_id, name, phone, email, permission_level, performing_
     no banco de dados e registra a ação no log.
     """
     try:
-        cursor = conn.cursor()
-        
-        # Query para atualizar os dados do usuário
-        query = """
-        UPDATE users 
-        SET name = %s, phone = %s, email = %s, permission_level = %s 
-        WHERE id = %s
-        """
-        params = (name, phone, email, permission_level, user_id)
-        
-        cursor.execute(query, params)
-        conn.commit()
-        
-        rows_affected = cursor.rowcount
-        cursor.close()
-        
-        if rows_affected > 0:
+        with unit_of_work(conn) as uow:
+            # Query para atualizar os dados do usuário
+            query = """
+            UPDATE users
+            SET name = %s, phone = %s, email = %s, permission_level = %s
+            WHERE id = %s
+            """
+            params = (name, phone, email, permission_level, user_id)
+
+            uow.cursor.execute(query, params)
+            rows_affected = uow.cursor.rowcount
+            if rows_affected == 0:
+                return False, "Nenhum usuário foi encontrado com o ID fornecido."
+
+            bump_table_version(uow.cursor, 'users')
+            publish(uow.cursor, 'search_index:users')
             # Registrar a ação no log
             details = (
                 f"Usuário (ID: {performing_user_id}) atualizou dados do usuário (ID: {user_id}). "
                 f"Novos dados: Nome='{name}', Telefone='{phone}', Email='{email}', Permissão='{permission_level}'."
             )
-            log_action(conn, performing_user_id, 'USER_DATA_UPDATED', details)
-            return True, "Dados do usuário atualizados com sucesso!"
-        else:
-            return False, "Nenhum usuário foi encontrado com o ID fornecido."
+            uow.log(performing_user_id, 'USER_DATA_UPDATED', details, ENTITY_USER, user_id,
+                    {'name': name, 'phone': phone, 'email': email, 'permission_level': permission_level})
+        index_upsert('users', user_id, {'name': name, 'email': email, 'phone': phone})
+        return True, "Dados do usuário atualizados com sucesso!"
 
     except mysql.connector.Error as err:
-        conn.rollback()
         # Verifica se o erro é de entrada duplicada (ex: email já existe)
         if err.errno == 1062:
             return False, "Erro: O email fornecido já está em uso por outro usuário."
@@ -0,0 +1,360 @@
+# --------------------------------------------------------------------------------
+# discovery_utils.py (Módulo de Descoberta de Impressoras na Rede)
+#
+# Autor: Emerson A. Silva
+# Data: 24/10/2025
+#
+# Descrição:
+# Varre as faixas de rede configuradas (CIDR) com sondagens assíncronas nas
+# portas 631 (IPP), 9100 (JetDirect) e 161 (SNMP), identifica fabricante,
+# modelo e nome de quem responde e compara o resultado com a tabela
+# 'printers', cadastrando em lote as novas e atualizando os IPs alterados.
+# --------------------------------------------------------------------------------
+
+import asyncio
+import errno
+import ipaddress
+import os
+from pyipp import IPP
+import database as db
+
+TCP_PROBE_PORTS = (631, 9100)
+SNMP_PORT = 161
+IPP_PATHS = ("/ipp/print", "/ipp", "/")
+
+# OIDs consultados via SNMP: sysDescr.0 e sysName.0
+OID_SYS_DESCR = "1.3.6.1.2.1.1.1.0"
+OID_SYS_NAME = "1.3.6.1.2.1.1.5.0"
+
+# Cada host sondado mantém até 3 sockets abertos ao mesmo tempo (2 TCP + 1 UDP):
+# o limite de hosts simultâneos é derivado do total de sockets da varredura,
+# abaixo do limite usual de 1024 descritores por processo
+SOCKETS_PER_HOST = 3
+MAX_PROBE_SOCKETS = 512
+DEFAULT_CONCURRENCY = MAX_PROBE_SOCKETS // SOCKETS_PER_HOST
+# Descritores reservados ao restante do processo (banco, Streamlit, poller IPP)
+RESERVED_DESCRIPTORS = 128
+# Hosts que esgotaram os descritores são sondados de novo com esta concorrência
+RETRY_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 1.0
+# Maior quantidade de endereços aceita em uma descoberta iniciada pela interface (uma /16)
+MAX_DISCOVERY_ADDRESSES = 65536
+
+
+# --- Codificação/decodificação BER mínima para SNMP v2c ---
+
+def _ber_length(length):
+    if length < 0x80:
+        return bytes([length])
+    raw = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([0x80 | len(raw)]) + raw
+
+
+def _ber(tag, payload):
+    return bytes([tag]) + _ber_length(len(payload)) + payload
+
+
+def _ber_int(value):
+    return _ber(0x02, value.to_bytes((value.bit_length() + 8) // 8 or 1, "big", signed=True))
+
+
+def _ber_oid(oid):
+    parts = [int(p) for p in oid.split(".")]
+    encoded = bytearray([40 * parts[0] + parts[1]])
+    for part in parts[2:]:
+        chunk = [part & 0x7F]
+        part >>= 7
+        while part:
+            chunk.append(0x80 | (part & 0x7F))
+            part >>= 7
+        encoded.extend(reversed(chunk))
+    return _ber(0x06, bytes(encoded))
+
+
+def _build_snmp_get(community, request_id, oids):
+    varbinds = b"".join(_ber(0x30, _ber_oid(oid) + b"\x05\x00") for oid in oids)
+    pdu = _ber(0xA0, _ber_int(request_id) + _ber_int(0) + _ber_int(0) + _ber(0x30, varbinds))
+    return _ber(0x30, _ber_int(1) + _ber(0x04, community.encode()) + pdu)
+
+
+def _ber_read(data, offset):
+    """Lê um TLV a partir de 'offset' e retorna (tag, valor, próximo_offset)."""
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        length = int.from_bytes(data[offset:offset + size], "big")
+        offset += size
+    return tag, data[offset:offset + length], offset + length
+
+
+def _ber_children(payload):
+    offset = 0
+    while offset < len(payload):
+        tag, value, offset = _ber_read(payload, offset)
+        yield tag, value
+
+
+def _parse_snmp_response(data):
+    """Extrai os valores OCTET STRING de uma resposta SNMP, na ordem dos varbinds."""
+    _, message, _ = _ber_read(data, 0)
+    children = list(_ber_children(message))
+    if len(children) < 3 or children[2][0] != 0xA2:
+        return []
+    pdu_fields = list(_ber_children(children[2][1]))
+    if len(pdu_fields) < 4 or int.from_bytes(pdu_fields[1][1], "big") != 0:
+        return []
+    values = []
+    for _, varbind in _ber_children(pdu_fields[3][1]):
+        fields = list(_ber_children(varbind))
+        if len(fields) == 2 and fields[1][0] == 0x04:
+            values.append(fields[1][1].decode("utf-8", errors="replace").strip())
+        else:
+            values.append(None)
+    return values
+
+
+class _SnmpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, future):
+        self.future = future
+
+    def datagram_received(self, data, addr):
+        if not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+# --- Sondagens individuais ---
+
+def _is_descriptor_exhaustion(err):
+    """EMFILE/ENFILE: o processo (ou o sistema) ficou sem descritores, não é uma porta fechada."""
+    return isinstance(err, OSError) and err.errno in (errno.EMFILE, errno.ENFILE)
+
+
+async def _probe_tcp(ip, port, timeout):
+    """Retorna True se a porta TCP aceitar conexão dentro do tempo limite."""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        writer.close()
+        return True
+    except OSError as err:
+        if _is_descriptor_exhaustion(err):
+            raise
+        return False
+    except asyncio.TimeoutError:
+        return False
+
+
+async def _probe_snmp(ip, community, timeout):
+    """Consulta sysDescr/sysName via SNMP v2c. Retorna dict ou None se não houver resposta."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    transport = None
+    try:
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _SnmpProtocol(future), remote_addr=(ip, SNMP_PORT))
+        request_id = int.from_bytes(os.urandom(3), "big")
+        transport.sendto(_build_snmp_get(community, request_id, (OID_SYS_DESCR, OID_SYS_NAME)))
+        data = await asyncio.wait_for(future, timeout)
+        values = _parse_snmp_response(data)
+        if not values:
+            return None
+        return {'sys_descr': values[0], 'sys_name': values[1] if len(values) > 1 else None}
+    except OSError as err:
+        if _is_descriptor_exhaustion(err):
+            raise
+        return None
+    except (asyncio.TimeoutError, IndexError, ValueError):
+        return None
+    finally:
+        if transport:
+            transport.close()
+
+
+async def _fingerprint_ipp(ip, timeout):
+    """Busca fabricante, modelo e nome via IPP, tentando os caminhos mais comuns."""
+    for path in IPP_PATHS:
+        try:
+            async with asyncio.timeout(timeout * 3):
+                async with IPP(f"ipp://{ip}:631{path}") as ipp:
+                    printer = await ipp.printer()
+            info = printer.info
+            return {
+                'fabricante': getattr(info, 'manufacturer', None),
+                'modelo': getattr(info, 'model', None),
+                'nome': getattr(info, 'name', None),
+            }
+        except Exception:
+            continue
+    return None
+
+
+async def _probe_host(ip, semaphore, timeout, community):
+    """Sonda um host nas três portas e monta a identificação do dispositivo."""
+    async with semaphore:
+        port_631, port_9100, snmp = await asyncio.gather(
+            _probe_tcp(ip, 631, timeout),
+            _probe_tcp(ip, 9100, timeout),
+            _probe_snmp(ip, community, timeout),
+        )
+        if not (port_631 or port_9100 or snmp):
+            return None
+
+        device = {'endereco_ip': ip, 'fabricante': None, 'modelo': None, 'nome': None, 'host': None}
+        if snmp:
+            descr = snmp.get('sys_descr') or ''
+            device['host'] = snmp.get('sys_name') or None
+            device['nome'] = device['host']
+            device['modelo'] = descr or None
+            device['fabricante'] = descr.split()[0] if descr else None
+        if port_631:
+            ipp_info = await _fingerprint_ipp(ip, timeout)
+            if ipp_info:
+                device.update({k: v for k, v in ipp_info.items() if v})
+
+        # Um dispositivo que só responde SNMP (sem 631/9100) provavelmente não é uma impressora
+        if not (port_631 or port_9100):
+            descr = (device['modelo'] or '').lower()
+            if not any(word in descr for word in ('printer', 'print', 'jetdirect', 'laser', 'mfp')):
+                return None
+
+        device['nome'] = device['nome'] or device['host'] or f"Impressora {ip}"
+        return device
+
+
+# --- Varredura e comparação com o inventário ---
+
+def parse_cidr_ranges(cidr_ranges):
+    """
+    Converte uma lista (ou texto separado por vírgulas ou linhas) de CIDRs em
+    redes. Lança ValueError se alguma faixa for inválida.
+    """
+    if isinstance(cidr_ranges, str):
+        cidr_ranges = cidr_ranges.replace("\n", ",").split(",")
+    return [ipaddress.ip_network(cidr.strip(), strict=False) for cidr in cidr_ranges if cidr.strip()]
+
+
+def _expand_ranges(cidr_ranges):
+    """Converte as faixas CIDR em IPs de host únicos."""
+    seen = set()
+    for network in parse_cidr_ranges(cidr_ranges):
+        for host in network.hosts():
+            ip = str(host)
+            if ip not in seen:
+                seen.add(ip)
+                yield ip
+
+
+def _bounded_concurrency(concurrency):
+    """Reduz a concorrência para que os sockets da varredura caibam no limite de descritores do processo."""
+    try:
+        import resource
+        soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ImportError, ValueError, OSError):
+        return concurrency
+    if soft_limit == resource.RLIM_INFINITY:
+        return concurrency
+    return max(1, min(concurrency, (soft_limit - RESERVED_DESCRIPTORS) // SOCKETS_PER_HOST))
+
+
+async def _probe_hosts(ips, concurrency, timeout, community):
+    """Sonda os hosts; retorna (dispositivos, ips_sem_descritores)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*(_probe_host(ip, semaphore, timeout, community) for ip in ips),
+                                   return_exceptions=True)
+    devices, exhausted = [], []
+    for ip, result in zip(ips, results):
+        if isinstance(result, BaseException):
+            if not _is_descriptor_exhaustion(result):
+                raise result
+            exhausted.append(ip)
+        elif result:
+            devices.append(result)
+    return devices, exhausted
+
+
+async def sweep_networks(cidr_ranges, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, community="public"):
+    """
+    Varre as faixas CIDR em paralelo. Retorna (dispositivos identificados, IPs
+    não sondados): hosts que esbarraram no limite de descritores (EMFILE/ENFILE)
+    são sondados de novo com concorrência menor e, se ainda falharem, são
+    informados em vez de tratados como "sem dispositivo".
+    """
+    ips = list(_expand_ranges(cidr_ranges))
+    devices, exhausted = await _probe_hosts(ips, _bounded_concurrency(concurrency), timeout, community)
+    if exhausted:
+        retried, exhausted = await _probe_hosts(exhausted, min(concurrency, RETRY_CONCURRENCY), timeout, community)
+        devices.extend(retried)
+    return devices, exhausted
+
+
+def diff_against_inventory(discovered, printers_df):
+    """
+    Compara os dispositivos encontrados com a tabela de impressoras.
+    Retorna (novas_impressoras, mudancas_de_ip), onde mudancas_de_ip é uma lista
+    de tuplas (printer_id, ip_antigo, ip_novo) identificadas pelo nome/host.
+    Só há mudança de IP se o endereço antigo não respondeu na mesma varredura:
+    com nomes genéricos (ex.: o sysName de fábrica), um segundo aparelho não
+    pode sobrescrever o IP de uma impressora que continua ativa.
+    """
+    known_ips = set()
+    by_name = {}
+    if not printers_df.empty:
+        for printer in printers_df.itertuples():
+            if printer.endereco_ip:
+                known_ips.add(printer.endereco_ip)
+            for name in (printer.host, printer.nome):
+                if name:
+                    by_name.setdefault(str(name).strip().lower(), (int(printer.id), printer.endereco_ip))
+
+    responding_ips = {device['endereco_ip'] for device in discovered}
+    new_printers = []
+    ip_changes = []
+    moved_ids = set()
+    for device in discovered:
+        ip = device['endereco_ip']
+        if ip in known_ips:
+            continue
+        match = None
+        for name in (device.get('host'), device.get('nome')):
+            if name and name.strip().lower() in by_name:
+                match = by_name[name.strip().lower()]
+                break
+        if match and match[0] not in moved_ids and match[1] not in responding_ips:
+            moved_ids.add(match[0])
+            ip_changes.append((match[0], match[1], ip))
+        else:
+            new_printers.append(device)
+    return new_printers, ip_changes
+
+
+def discover_printers(conn, performing_user_id, cidr_ranges=None, concurrency=DEFAULT_CONCURRENCY,
+                      timeout=DEFAULT_TIMEOUT, community="public"):
+    """
+    Executa a descoberta completa: varre a rede, compara com o inventário e
+    grava as novidades em uma única transação.
+    Se 'cidr_ranges' não for informado, usa a configuração 'discovery_cidr_ranges'.
+    Retorna (sucesso, mensagem, resumo).
+    """
+    if cidr_ranges is None:
+        cidr_ranges = db.get_setting(conn, 'discovery_cidr_ranges') or ""
+    try:
+        discovered, unprobed = asyncio.run(sweep_networks(cidr_ranges, concurrency, timeout, community))
+    except ValueError as e:
+        return False, f"Faixa de rede inválida: {e}", {}
+
+    new_printers, ip_changes = diff_against_inventory(discovered, db.get_all_printers(conn))
+    summary = {'encontradas': len(discovered), 'novas': len(new_printers), 'ips_alterados': len(ip_changes),
+               'nao_sondados': len(unprobed)}
+    warning = (f" Atenção: {len(unprobed)} endereço(s) não puderam ser sondados (limite de arquivos abertos "
+               f"do processo); execute a descoberta novamente." if unprobed else "")
+
+    if not new_printers and not ip_changes:
+        return True, "Nenhuma impressora nova ou alterada encontrada." + warning, summary
+
+    success, message = db.register_discovered_printers(conn, new_printers, ip_changes, performing_user_id)
+    return success, message + (warning if success else ""), summary
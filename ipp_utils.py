@@ -10,13 +10,59 @@
 # --------------------------------------------------------------------------------
 
 import asyncio
-from pyipp import IPP, Printer
+import threading
+import time
+import aiohttp
+from pyipp import IPP
+from pyipp.enums import IppOperation
 import re
 
-def _normalize_color(marker):
+# Atributos pedidos no Get-Printer-Attributes: apenas o que o monitoramento usa,
+# em vez do conjunto completo que ipp.printer() solicita (mídias, URIs, etc.)
+REQUESTED_ATTRIBUTES = [
+    "printer-state",
+    "printer-state-message",
+    "marker-names",
+    "marker-types",
+    "marker-colors",
+    "marker-levels",
+    "printer-media-sheets-completed",
+    "printer-impressions-completed",
+]
+_WANTED_NAMES = {name.encode("ascii"): name for name in REQUESTED_ATTRIBUTES}
+
+# Tags de valor IPP (RFC 8010) tratadas pelo parser enxuto
+_TAG_END_OF_ATTRIBUTES = 0x03
+_TAG_INTEGER = 0x21
+_TAG_BOOLEAN = 0x22
+_TAG_ENUM = 0x23
+
+# Métricas acumuladas das consultas IPP (bytes recebidos, tempo de parsing e
+# conexões TCP/TLS abertas x reaproveitadas pelo pool compartilhado)
+POLL_STATS = {'requests': 0, 'bytes': 0, 'parse_seconds': 0.0, 'connections_created': 0, 'connections_reused': 0}
+
+# --- Sessão HTTP compartilhada do monitoramento ---
+# O poller mantém um único event loop em uma thread dedicada e uma única
+# ClientSession com keep-alive, para que as conexões (e handshakes TLS de
+# ipps://) sejam reaproveitadas entre impressoras e entre verificações.
+CONNECTOR_LIMIT = 100
+CONNECTOR_LIMIT_PER_HOST = 2
+KEEPALIVE_SECONDS = 300
+DNS_CACHE_SECONDS = 600
+
+_poller_loop = None
+_poller_lock = threading.Lock()
+_session = None
+
+# Última URI que respondeu em cada IP: tentada primeiro na verificação seguinte,
+# em vez de percorrer de novo as URIs que já falharam
+_working_uris = {}
+
+
+def _normalize_color(name, color):
     """Função interna para padronizar os nomes de cor dos suprimentos para o banco de dados."""
-    name = marker.name.lower()
-    color_hex = marker.color.lower() if marker.color else ""
+    name = name.lower()
+    color_hex = color.lower() if color else ""
 
     # Retorna o nome da coluna no banco de dados
     if color_hex == "#000000": return "toner_preto"
@@ -31,10 +77,102 @@ def _normalize_color(marker):
     
     return "other"
 
-async def _get_raw_printer_data(ip: str) -> Printer | None:
+def _parse_attributes(data: bytes) -> dict | None:
+    """
+    Parser enxuto de uma resposta Get-Printer-Attributes.
+    Percorre o buffer com um memoryview e só decodifica os valores dos
+    atributos de REQUESTED_ATTRIBUTES; os demais são pulados sem cópia.
+    Retorna {nome: [valores]} ou None se a resposta não for de sucesso.
+    """
+    view = memoryview(data)
+    size = len(view)
+    if size < 8 or int.from_bytes(view[2:4], "big") >= 0x200:
+        return None
+
+    attributes = {}
+    current = None
+    pos = 8
+    while pos < size:
+        tag = view[pos]
+        pos += 1
+        if tag == _TAG_END_OF_ATTRIBUTES:
+            break
+        if tag < 0x10:
+            # Delimitador de grupo (operation, printer, ...)
+            current = None
+            continue
+
+        name_length = (view[pos] << 8) | view[pos + 1]
+        pos += 2
+        if name_length:
+            current = _WANTED_NAMES.get(view[pos:pos + name_length].tobytes())
+            pos += name_length
+        value_length = (view[pos] << 8) | view[pos + 1]
+        pos += 2
+
+        # name_length == 0 indica valor adicional do atributo anterior (1setOf)
+        if current is not None:
+            if tag in (_TAG_INTEGER, _TAG_ENUM):
+                value = int.from_bytes(view[pos:pos + value_length], "big", signed=True)
+            elif tag == _TAG_BOOLEAN:
+                value = bool(view[pos])
+            elif 0x40 <= tag <= 0x4F:
+                value = str(view[pos:pos + value_length], "utf-8", "replace")
+            else:
+                value = None
+            attributes.setdefault(current, []).append(value)
+        pos += value_length
+
+    return attributes
+
+
+async def _on_connection_created(session, context, params):
+    POLL_STATS['connections_created'] += 1
+
+
+async def _on_connection_reused(session, context, params):
+    POLL_STATS['connections_reused'] += 1
+
+
+def _get_poller_loop():
+    """Inicia (uma única vez por processo) o event loop dedicado ao monitoramento."""
+    global _poller_loop
+    with _poller_lock:
+        if _poller_loop is None:
+            _poller_loop = asyncio.new_event_loop()
+            threading.Thread(target=_poller_loop.run_forever, name="ipp-poller", daemon=True).start()
+        return _poller_loop
+
+
+async def _get_shared_session():
+    """Retorna a ClientSession compartilhada; só deve ser chamada dentro do loop do poller."""
+    global _session
+    if _session is None or _session.closed:
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(_on_connection_created)
+        trace_config.on_connection_reuseconn.append(_on_connection_reused)
+        connector = aiohttp.TCPConnector(
+            limit=CONNECTOR_LIMIT,
+            limit_per_host=CONNECTOR_LIMIT_PER_HOST,
+            keepalive_timeout=KEEPALIVE_SECONDS,
+            use_dns_cache=True,
+            ttl_dns_cache=DNS_CACHE_SECONDS,
+        )
+        _session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+    return _session
+
+
+def _is_stale_connection(exc):
+    """Indica se o erro veio de uma conexão keep-alive que a impressora já havia fechado."""
+    cause = exc.__cause__ or exc
+    return isinstance(cause, (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError))
+
+
+async def _get_raw_printer_data(ip: str, session=None) -> dict | None:
     """
     Tenta conectar-se a uma impressora usando múltiplos formatos de URI.
-    Retorna os dados brutos da impressora na primeira conexão bem-sucedida.
+    Retorna os atributos mínimos da impressora na primeira conexão bem-sucedida.
+    Se 'session' for informada, as conexões HTTP são reaproveitadas dela.
     """
     uris_to_try = [
         ip,
@@ -44,54 +182,82 @@ async def _get_raw_printer_data(ip: str) -> Printer | None:
         f"ipp://{ip}/ipp",
         f"ipps://{ip}/ipp/print"
     ]
+    known_uri = _working_uris.get(ip)
+    if known_uri in uris_to_try:
+        uris_to_try.remove(known_uri)
+        uris_to_try.insert(0, known_uri)
+    message = {"operation-attributes-tag": {"requested-attributes": REQUESTED_ATTRIBUTES}}
 
     for uri in uris_to_try:
         try:
             async with asyncio.timeout(5):
-                async with IPP(uri) as ipp:
-                    return await ipp.printer()
+                async with IPP(uri, session=session) as ipp:
+                    try:
+                        response = await ipp.raw(IppOperation.GET_PRINTER_ATTRIBUTES, message)
+                    except Exception as exc:
+                        # Conexão reaproveitada já encerrada pela impressora: tenta de novo a mesma URI
+                        if session is None or not _is_stale_connection(exc):
+                            raise
+                        response = await ipp.raw(IppOperation.GET_PRINTER_ATTRIBUTES, message)
+
+            started = time.perf_counter()
+            attributes = _parse_attributes(response)
+            POLL_STATS['requests'] += 1
+            POLL_STATS['bytes'] += len(response)
+            POLL_STATS['parse_seconds'] += time.perf_counter() - started
+
+            if attributes is not None:
+                _working_uris[ip] = uri
+                return attributes
         except Exception:
             # Continua para a próxima URI em caso de erro ou timeout
             continue
     
     # Se todas as tentativas falharem, retorna None
+    _working_uris.pop(ip, None)
     return None
 
 
-async def get_printer_details_ipp(ip: str) -> dict | None:
+async def get_printer_details_ipp(ip: str, session=None) -> dict | None:
     """
     Busca os detalhes de uma impressora via IPP e formata em um dicionário
     padrão para o nosso sistema.
     """
     try:
-        printer_data = await _get_raw_printer_data(ip)
+        attributes = await _get_raw_printer_data(ip, session)
         
-        if not printer_data or not hasattr(printer_data, 'info'):
+        if attributes is None:
             return None
 
-        # Usa getattr() para acesso seguro aos atributos, retornando um valor padrão se não existir
+        page_count = (attributes.get('printer-media-sheets-completed')
+                      or attributes.get('printer-impressions-completed') or [-1])
         details = {
             'status': 'Online',
-            'status_detalhado': getattr(printer_data.info, 'state_message', 'Status não disponível'),
-            'contagem_paginas': getattr(printer_data.info, 'marker_sheets_completed', -1),
+            'status_detalhado': (attributes.get('printer-state-message') or ['Status não disponível'])[0],
+            'contagem_paginas': page_count[0],
             'toner_preto': -1,
             'toner_ciano': -1,
             'toner_magenta': -1,
             'toner_amarelo': -1
         }
 
-        # Processa os níveis de toner de forma segura
-        if hasattr(printer_data, 'markers') and printer_data.markers:
-            for marker in printer_data.markers:
-                marker_type = getattr(marker, 'marker_type', '').lower()
-                
-                # --- ALTERAÇÃO APLICADA AQUI: Procura por "toner" OU "ink" ---
-                is_supply = any(supply in marker_type for supply in ('toner', 'ink'))
-
-                if hasattr(marker, 'level') and marker.level >= 0 and is_supply:
-                    color = _normalize_color(marker)
-                    if color != "other":
-                        details[color] = marker.level
+        # Processa os níveis de toner de forma segura (listas paralelas marker-*)
+        names = attributes.get('marker-names', [])
+        types = attributes.get('marker-types', [])
+        colors = attributes.get('marker-colors', [])
+        levels = attributes.get('marker-levels', [])
+        for index, name in enumerate(names):
+            marker_type = (types[index] if index < len(types) else '') or ''
+            level = levels[index] if index < len(levels) else -1
+            color = colors[index] if index < len(colors) else ''
+
+            # --- ALTERAÇÃO APLICADA AQUI: Procura por "toner" OU "ink" ---
+            is_supply = any(supply in marker_type.lower() for supply in ('toner', 'ink'))
+
+            if isinstance(level, int) and level >= 0 and is_supply:
+                column = _normalize_color(name or '', color)
+                if column != "other":
+                    details[column] = level
         
         return details
 
@@ -99,3 +265,15 @@ async def get_printer_details_ipp(ip: str) -> dict | None:
         print(f"Erro ao processar dados da impressora {ip} após conexão IPP: {e}")
         return None
 
+
+async def _get_details_with_shared_session(ip):
+    return await get_printer_details_ipp(ip, await _get_shared_session())
+
+
+def fetch_printer_details(ip: str) -> dict | None:
+    """
+    Versão síncrona usada pelo poller: executa a consulta no event loop
+    dedicado, reaproveitando a sessão HTTP compartilhada.
+    """
+    future = asyncio.run_coroutine_threadsafe(_get_details_with_shared_session(ip), _get_poller_loop())
+    return future.result()
@@ -13,7 +13,9 @@ import streamlit as st
 import concurrent.futures
 import database as db
 import ipp_utils as ipp  # <-- Importa o novo módulo IPP
-import asyncio
+import circuit_utils as circuits
+import time
+from collections import deque
 from datetime import datetime
 import platform
 import subprocess
@@ -32,46 +34,90 @@ def ping_host(host):
 def check_printer_details(printer):
     """
     Verifica os detalhes de uma impressora: ping para conectividade, IPP para detalhes.
+    Impressoras com o circuito aberto são ignoradas sem nenhum acesso à rede.
     """
-    printer_id = printer['id']
+    printer_id = int(printer['id'])
     ip_address = printer.get('endereco_ip')
+    now = datetime.now()
+    circuit = circuits.get_circuit(printer_id)
     
     result_data = {
         'id': printer_id, 'status': 'Offline', 'status_detalhado': 'Não responde (Ping)',
         'toner_preto': printer.get('toner_preto', -1), 'toner_ciano': printer.get('toner_ciano', -1),
         'toner_magenta': printer.get('toner_magenta', -1), 'toner_amarelo': printer.get('toner_amarelo', -1),
-        'contagem_paginas': printer.get('contagem_paginas', -1), 'ultima_verificacao': datetime.now()
+        'contagem_paginas': printer.get('contagem_paginas', -1), 'ultima_verificacao': now
     }
-    
+
+    # --- DISJUNTOR: circuito aberto não consome tempo da verificação ---
+    if not circuit.allow_request(now):
+        result_data['status_detalhado'] = circuit.skip_reason()
+        result_data['ignorada'] = True
+        return result_data
+
+    # No estado semiaberto o ping é a primeira sondagem: se falhar, o circuito reabre sem tentar o IPP
     if not ip_address or not ping_host(ip_address):
+        reason = 'Sem endereço IP' if not ip_address else 'Não responde (Ping)'
+        circuit.record_failure(reason, now)
+        if circuit.state == circuits.OPEN:
+            result_data['status_detalhado'] = circuit.skip_reason()
         return result_data
 
     # --- A MÁGICA ACONTECE AQUI ---
-    # Se o ping funcionou, executamos a função assíncrona do ipp_utils
-    # dentro de um event loop criado pelo asyncio.run()
-    ipp_details = asyncio.run(ipp.get_printer_details_ipp(ip_address))
+    # Se o ping funcionou, a consulta IPP roda no event loop dedicado do
+    # ipp_utils, reaproveitando as conexões HTTP mantidas entre verificações
+    ipp_details = ipp.fetch_printer_details(ip_address)
     
     if ipp_details:
+        circuit.record_success()
         result_data.update(ipp_details)
     else:
-        # Se o ping funcionou mas o IPP não, a impressora está online mas não gerenciável
+        # Se o ping funcionou mas o IPP não, a impressora está online mas não gerenciável.
+        # A falha também conta para o disjuntor: cada verificação assim percorre todas as URIs IPP
         result_data['status'] = 'Online'
         result_data['status_detalhado'] = 'Online (Não responde ao protocolo IPP)'
+        circuit.record_failure('Não responde ao protocolo IPP', now)
+        if circuit.state == circuits.OPEN:
+            result_data['status_detalhado'] = circuit.skip_reason()
 
     return result_data
 
+# Relatórios das últimas verificações (exibidos na página de Desempenho): duração,
+# latência de cada impressora e conexões abertas x reaproveitadas
+POLL_REPORTS = deque(maxlen=50)
+LAST_POLL_REPORT = {}
+
+def get_poll_reports():
+    """Cópia dos relatórios das verificações recentes deste processo (mais antigos primeiro)."""
+    return list(POLL_REPORTS)
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] if ordered else 0.0
+
+def _timed_check(printer, latencies):
+    """Verifica a impressora e guarda a latência das que foram de fato consultadas na rede."""
+    started = time.perf_counter()
+    result = check_printer_details(printer)
+    if not result.get('ignorada'):
+        latencies.append((time.perf_counter() - started) * 1000)
+    return result
+
 def update_all_printers_status(conn, printers_df, show_spinner=True):
     """Orquestra a verificação de todas as impressoras em paralelo."""
-    online_count = 0
     total_count = len(printers_df)
     
     if total_count == 0:
         return 0, 0
         
     all_results = []
+    circuits.load_circuits(conn)
+    started = time.perf_counter()
+    created_before = ipp.POLL_STATS['connections_created']
+    reused_before = ipp.POLL_STATS['connections_reused']
+    latencies = []
     
     with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
-        future_to_printer = {executor.submit(check_printer_details, printer): printer for index, printer in printers_df.iterrows()}
+        future_to_printer = {executor.submit(_timed_check, printer, latencies): printer for index, printer in printers_df.iterrows()}
         
         progress_bar = None
         if show_spinner:
@@ -92,10 +138,25 @@ def update_all_printers_status(conn, printers_df, show_spinner=True):
                 progress_text = f"Verificando {i+1} de {total_count} impressoras..."
                 progress_bar.progress((i + 1) / total_count, text=progress_text)
 
-    for printer_data in all_results:
-        db.update_printer_details(conn, printer_data)
-        if printer_data.get('status') == 'Online':
-            online_count += 1
-            
+    report = {
+        'inicio': datetime.now(),
+        'duracao_segundos': round(time.perf_counter() - started, 3),
+        'impressoras': total_count,
+        'consultadas': len(latencies),
+        'latencia_p50_ms': round(_percentile(latencies, 0.5), 1),
+        'latencia_p95_ms': round(_percentile(latencies, 0.95), 1),
+        'handshakes': ipp.POLL_STATS['connections_created'] - created_before,
+        'conexoes_reaproveitadas': ipp.POLL_STATS['connections_reused'] - reused_before,
+    }
+    LAST_POLL_REPORT.clear()
+    LAST_POLL_REPORT.update(report)
+    POLL_REPORTS.append(report)
+
+    # Impressoras ignoradas pelo disjuntor mantêm o último estado gravado
+    checked = [printer_data for printer_data in all_results if not printer_data.get('ignorada')]
+    db.update_printers_details(conn, checked)
+    online_count = sum(1 for printer_data in checked if printer_data.get('status') == 'Online')
+
+    circuits.save_circuits(conn)
     return online_count, total_count
 
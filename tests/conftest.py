@@ -0,0 +1,61 @@
+# --------------------------------------------------------------------------------
+# conftest.py (Configuração Compartilhada dos Testes)
+#
+# Descrição:
+# Os testes rodam sobre o banco embutido SQLite (database/sqlite_backend.py),
+# sem servidor MySQL: cada teste recebe um arquivo novo em um diretório
+# temporário, já com todas as tabelas e migrações aplicadas.
+#
+#   python -m pytest -q
+# --------------------------------------------------------------------------------
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import database as db
+from database import sqlite_backend
+from database.search_index import ENTITY_FIELDS
+
+
+def open_test_connection(path):
+    """Abre o banco de teste em 'path', criando a estrutura como init_connection faz."""
+    conn = sqlite_backend.connect(str(path))
+    cursor = conn.cursor()
+    db._create_all_tables(cursor)
+    db._apply_migrations(cursor)
+    conn.commit()
+    cursor.close()
+    return conn
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "teste.db"
+
+
+@pytest.fixture
+def conn(db_path):
+    # Os caches do processo são indexados pela versão das tabelas, que recomeça
+    # em cada banco novo: sem limpá-los, um teste leria os dados do anterior
+    db.clear_read_cache()
+    for cached in (db.get_setting, db.get_all_settings, db.check_page_access):
+        cached.clear()
+    for entity in ENTITY_FIELDS:
+        db.invalidate_index(entity)
+    connection = open_test_connection(db_path)
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def admin_id(conn):
+    """Id do administrador padrão (autor das ações registradas nos logs)."""
+    db.create_default_admin_if_needed(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM users WHERE email = %s", ("admin@projeto.com",))
+    user_id = cursor.fetchone()[0]
+    cursor.close()
+    return user_id
@@ -0,0 +1,82 @@
+# --------------------------------------------------------------------------------
+# test_cache_bus.py (Testes do Barramento de Invalidação de Cache)
+#
+# Descrição:
+# Eventos publicados por "outro processo" (origem diferente) chegam aos
+# assinantes, inclusive quando o id menor é gravado depois, e o atraso de
+# propagação é medido.
+# --------------------------------------------------------------------------------
+
+import time
+
+import pytest
+from database import cache_bus, sqlite_backend
+
+TOPIC = 'teste:cache_bus'
+
+
+@pytest.fixture
+def bus(conn, db_path):
+    received = []
+    cache_bus.subscribe(TOPIC, lambda: received.append(time.perf_counter()))
+    opened = []
+
+    def connect():
+        opened.append(sqlite_backend.connect(str(db_path)))
+        return opened[-1]
+
+    cache_bus.configure_cache_bus(connect)
+    cache_bus.poll_cache_events(force=True)  # primeira consulta: só registra o id atual
+    yield received
+    cache_bus.configure_cache_bus(None)
+    cache_bus._subscribers.pop(TOPIC, None)
+    for connection in opened:
+        connection.close()
+
+
+def _publish_from_other_process(conn, event_id=None):
+    cursor = conn.cursor()
+    if event_id is None:
+        cursor.execute("INSERT INTO cache_events (topic, origin) VALUES (%s, %s)", (TOPIC, "outro-processo"))
+    else:
+        cursor.execute("INSERT INTO cache_events (id, topic, origin) VALUES (%s, %s, %s)",
+                       (event_id, TOPIC, "outro-processo"))
+    conn.commit()
+    cursor.close()
+
+
+def test_events_from_other_processes_reach_subscribers_with_measured_lag(conn, bus):
+    applied_before = cache_bus.get_cache_bus_metrics()['eventos_aplicados']
+    published = time.perf_counter()
+    _publish_from_other_process(conn)
+
+    assert cache_bus.poll_cache_events(force=True) == 1
+    assert len(bus) == 1
+    metrics = cache_bus.get_cache_bus_metrics()
+    assert metrics['eventos_aplicados'] == applied_before + 1
+    # O atraso medido pelo banco não passa do tempo real decorrido desde a publicação
+    assert 0 <= metrics['atraso_ultimo_ms'] <= (bus[0] - published) * 1000 + 5
+    # Sem eventos novos, nada é reaplicado
+    assert cache_bus.poll_cache_events(force=True) == 0
+
+
+def test_lower_id_committed_later_is_not_skipped(conn, bus):
+    _publish_from_other_process(conn, event_id=10)
+    assert cache_bus.poll_cache_events(force=True) == 1
+
+    # Id 7 de uma transação mais lenta, gravado depois do 10
+    _publish_from_other_process(conn, event_id=7)
+    assert cache_bus.poll_cache_events(force=True) == 1
+    assert len(bus) == 2
+    assert cache_bus.poll_cache_events(force=True) == 0
+    assert cache_bus.get_cache_bus_metrics()['ids_pendentes'] == 8  # 1-6, 8 e 9 ainda esperados
+
+
+def test_pending_ids_expire(conn, bus, monkeypatch):
+    _publish_from_other_process(conn, event_id=5)
+    cache_bus.poll_cache_events(force=True)
+    assert cache_bus.get_cache_bus_metrics()['ids_pendentes'] == 4
+
+    monkeypatch.setattr(cache_bus, 'GAP_TIMEOUT_SECONDS', -1)
+    cache_bus.poll_cache_events(force=True)
+    assert cache_bus.get_cache_bus_metrics()['ids_pendentes'] == 0
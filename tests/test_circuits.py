@@ -0,0 +1,63 @@
+# --------------------------------------------------------------------------------
+# test_circuits.py (Testes dos Disjuntores por Impressora)
+#
+# Descrição:
+# Com mais de um processo verificando as impressoras, cada verificação parte
+# do estado gravado no banco e grava só os circuitos que ela alterou.
+# --------------------------------------------------------------------------------
+
+import datetime
+
+import database as db
+import circuit_utils as circuits
+
+
+def _add_printers(conn, admin_id, count):
+    for i in range(count):
+        data = {'unidade': "Matriz", 'fabricante': "HP", 'modelo': "M404", 'localizacao': "Térreo", 'setor': "TI",
+                'patrimonio': f"PAT{i:03d}", 'nome': f"HP-{i}", 'host': f"hp-{i}", 'endereco_ip': f"10.0.0.{i + 1}"}
+        assert db.add_printer(conn, data, admin_id)[0]
+    return sorted(int(printer_id) for printer_id in db.get_all_printers(conn)['id'])
+
+
+def _health(conn):
+    return {row['printer_id']: row['consecutive_failures'] for row in db.get_printer_health(conn)}
+
+
+def test_save_keeps_failures_recorded_by_another_process(conn, admin_id):
+    first, second = _add_printers(conn, admin_id, 2)
+    now = datetime.datetime.now()
+    circuits.load_circuits(conn)
+
+    # Outro processo registra falhas da segunda impressora durante esta verificação
+    db.save_printer_health(conn, [(second, circuits.CLOSED, 2, None, "Não responde (Ping)")])
+    circuits.get_circuit(first).record_failure("Não responde (Ping)", now)
+    circuits.get_circuit(second)  # consultada, mas sem mudança neste processo
+    circuits.save_circuits(conn)
+
+    assert _health(conn) == {first: 1, second: 2}
+
+
+def test_each_poll_starts_from_the_persisted_state(conn, admin_id):
+    (printer_id,) = _add_printers(conn, admin_id, 1)
+    now = datetime.datetime.now()
+    circuits.load_circuits(conn)
+    circuits.get_circuit(printer_id).record_failure("Não responde (Ping)", now)
+    circuits.save_circuits(conn)
+
+    # Outro processo chega ao limite e abre o circuito
+    open_until = (now + datetime.timedelta(minutes=5)).replace(microsecond=0)
+    db.save_printer_health(conn, [(printer_id, circuits.OPEN, circuits.FAILURE_THRESHOLD, open_until, "Não responde (Ping)")])
+
+    circuits.load_circuits(conn)
+    circuit = circuits.get_circuit(printer_id)
+    assert circuit.consecutive_failures == circuits.FAILURE_THRESHOLD
+    assert not circuit.allow_request(now)
+
+
+def test_untouched_healthy_printers_are_not_written(conn, admin_id):
+    (printer_id,) = _add_printers(conn, admin_id, 1)
+    circuits.load_circuits(conn)
+    circuits.get_circuit(printer_id).record_success()
+    circuits.save_circuits(conn)
+    assert _health(conn) == {}
@@ -0,0 +1,74 @@
+# --------------------------------------------------------------------------------
+# test_discovery.py (Testes da Descoberta de Impressoras)
+#
+# Descrição:
+# Hosts que esgotam os descritores de arquivo não passam por "sem
+# dispositivo", e a comparação com o inventário só move o IP de uma
+# impressora cujo endereço antigo não respondeu na mesma varredura.
+# --------------------------------------------------------------------------------
+
+import asyncio
+import errno
+
+import pandas as pd
+import pytest
+import discovery_utils as discovery
+
+INVENTORY = pd.DataFrame([
+    {'id': 1, 'host': "NPI-GENERIC", 'nome': "Impressora RH", 'endereco_ip': "10.0.0.5"},
+])
+
+
+def _device(ip, host="NPI-GENERIC"):
+    return {'endereco_ip': ip, 'fabricante': "HP", 'modelo': "M404", 'nome': host, 'host': host}
+
+
+# --- Limite de descritores ---
+
+def test_descriptor_exhaustion_is_not_a_closed_port(monkeypatch):
+    async def no_descriptors(*args, **kwargs):
+        raise OSError(errno.EMFILE, "Too many open files")
+
+    monkeypatch.setattr(asyncio, "open_connection", no_descriptors)
+    with pytest.raises(OSError):
+        asyncio.run(discovery._probe_tcp("10.0.0.5", 9100, 0.1))
+
+
+def test_hosts_without_descriptors_are_retried_and_reported(monkeypatch):
+    attempts = {}
+
+    async def probe_host(ip, semaphore, timeout, community):
+        attempts[ip] = attempts.get(ip, 0) + 1
+        # .2 esgota os descritores só na primeira passada; .3 em todas
+        if ip == "10.0.0.3" or (ip == "10.0.0.2" and attempts[ip] == 1):
+            raise OSError(errno.EMFILE, "Too many open files")
+        return _device(ip) if ip != "10.0.0.1" else None
+
+    monkeypatch.setattr(discovery, "_probe_host", probe_host)
+    devices, unprobed = asyncio.run(discovery.sweep_networks("10.0.0.0/29"))
+    assert sorted(device['endereco_ip'] for device in devices) == ["10.0.0.2", "10.0.0.4", "10.0.0.5", "10.0.0.6"]
+    assert unprobed == ["10.0.0.3"]
+
+
+def test_concurrency_fits_the_descriptor_limit(monkeypatch):
+    assert discovery.DEFAULT_CONCURRENCY * discovery.SOCKETS_PER_HOST <= 1024 - discovery.RESERVED_DESCRIPTORS
+
+    import resource
+    monkeypatch.setattr(resource, "getrlimit", lambda kind: (256, 4096))
+    assert discovery._bounded_concurrency(discovery.DEFAULT_CONCURRENCY) == (256 - discovery.RESERVED_DESCRIPTORS) // 3
+
+
+# --- Comparação com o inventário ---
+
+def test_generic_name_does_not_move_a_printer_that_still_answers():
+    # Dois aparelhos com o sysName de fábrica: o cadastrado continua no IP antigo
+    new_printers, ip_changes = discovery.diff_against_inventory(
+        [_device("10.0.0.5"), _device("10.0.0.9")], INVENTORY)
+    assert ip_changes == []
+    assert [device['endereco_ip'] for device in new_printers] == ["10.0.0.9"]
+
+
+def test_printer_silent_at_its_old_address_is_moved():
+    new_printers, ip_changes = discovery.diff_against_inventory([_device("10.0.0.9")], INVENTORY)
+    assert ip_changes == [(1, "10.0.0.5", "10.0.0.9")]
+    assert new_printers == []
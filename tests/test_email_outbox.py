@@ -0,0 +1,144 @@
+# --------------------------------------------------------------------------------
+# test_email_outbox.py (Testes da Fila de Saída de E-mails)
+#
+# Descrição:
+# O remetente em segundo plano esvazia a fila contra um servidor SMTP local
+# mínimo (sem TLS nem autenticação). A senha temporária não fica legível no
+# banco em momento nenhum e é descartada após o envio ou a falha definitiva.
+# --------------------------------------------------------------------------------
+
+import email
+import email.policy
+import socketserver
+import threading
+
+import pytest
+import database as db
+from utils import email_utils
+
+SENHA = "Tmp#9xQ2-segredo"
+RECUSADO = "recusado@empresa.com"
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Fala o mínimo do protocolo SMTP usado pelo smtplib e guarda as mensagens recebidas."""
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self._reply("220 localhost SMTP de teste")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == "QUIT":
+                self._reply("221 Até logo")
+                return
+            if command == "RCPT":
+                if RECUSADO in line:
+                    self._reply("550 Destinatário inexistente")
+                    continue
+                recipients.append(line.split(":", 1)[1].strip(" <>"))
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 Termine com <CRLF>.<CRLF>")
+                data = b""
+                while (chunk := self.rfile.readline()) != b".\r\n":
+                    data += chunk
+                self.server.received.append((recipients, email.message_from_bytes(data, policy=email.policy.default)))
+                recipients = []
+                self._reply("250 Mensagem aceita")
+            elif command == "RSET":
+                recipients = []
+                self._reply("250 OK")
+            else:  # EHLO/HELO, MAIL, NOOP
+                self._reply("250 OK")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.received = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sender(conn, smtp_server):
+    db.configure_outbox("chave-de-teste")
+    config = {'sender_email': "sistema@empresa.com", 'sender_password': "",
+              'smtp_server': "127.0.0.1", 'smtp_port': smtp_server.server_address[1], 'smtp_ssl': False}
+    remetente = email_utils.RemetenteEmails(config, lambda: conn)
+    yield remetente
+    remetente._fechar_smtp()
+
+
+def _outbox_rows(conn):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT recipient, status, body, secret FROM email_outbox ORDER BY id")
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def test_worker_sends_queued_password_without_storing_it_in_plaintext(conn, sender, smtp_server):
+    assert db.enqueue_email(conn, "maria@empresa.com", email_utils.ASSUNTO_PADRAO, email_utils.CORPO_PADRAO, SENHA)
+
+    (queued,) = _outbox_rows(conn)
+    assert SENHA not in queued['body'] and SENHA not in queued['secret']
+    assert db.SECRET_PLACEHOLDER in queued['body']
+
+    assert sender.processar_fila() == 1
+    (recipients, message), = smtp_server.received
+    assert recipients == ["maria@empresa.com"]
+    assert message['Subject'] == email_utils.ASSUNTO_PADRAO
+    assert f"temporária é: {SENHA}" in message.get_content()
+
+    (sent,) = _outbox_rows(conn)
+    assert sent['status'] == 'enviado' and sent['body'] is None and sent['secret'] is None
+
+
+def test_refused_recipient_fails_and_discards_the_secret(conn, sender, smtp_server):
+    assert db.enqueue_emails(conn, [
+        (RECUSADO, "Assunto", "Senha: {senha}", SENHA),
+        ("joao@empresa.com", "Assunto", "Chaves {no texto} preservadas. Senha: {senha}", SENHA),
+    ])
+
+    assert sender.processar_fila() == 2
+    refused, sent = _outbox_rows(conn)
+    assert refused['status'] == 'falhou' and refused['body'] is None and refused['secret'] is None
+    assert sent['status'] == 'enviado'
+    # A mesma conexão SMTP atende as duas mensagens, e só a aceita chega
+    (recipients, message), = smtp_server.received
+    assert recipients == ["joao@empresa.com"]
+    assert message.get_content().strip() == f"Chaves {{no texto}} preservadas. Senha: {SENHA}"
+
+
+def test_secret_encrypted_with_another_key_is_not_sent(conn, sender, smtp_server):
+    assert db.enqueue_email(conn, "maria@empresa.com", "Assunto", "Senha: {senha}", SENHA)
+    db.configure_outbox("outra-chave")
+
+    assert sender.processar_fila() == 0
+    assert smtp_server.received == []
+    (failed,) = _outbox_rows(conn)
+    assert failed['status'] == 'falhou' and failed['secret'] is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    (True, True), (False, False), ("false", False), ("False", False), ("0", False), ("não", False),
+    ("true", True), ("1", True), (0, False),
+])
+def test_smtp_ssl_is_parsed_explicitly(monkeypatch, value, expected):
+    monkeypatch.setattr(email_utils.st, "secrets", {'email': {'sender_email': "s@empresa.com", 'smtp_ssl': value}})
+    assert email_utils._ler_configuracao_email()['smtp_ssl'] is expected
+
+
+def test_invalid_smtp_ssl_is_rejected(monkeypatch):
+    monkeypatch.setattr(email_utils.st, "secrets", {'email': {'sender_email': "s@empresa.com", 'smtp_ssl': "talvez"}})
+    with pytest.raises(ValueError):
+        email_utils._ler_configuracao_email()
@@ -0,0 +1,63 @@
+# --------------------------------------------------------------------------------
+# test_instrumentation.py (Testes da Instrumentação de Desempenho)
+#
+# Descrição:
+# As métricas dos reruns e as consultas lentas são gravadas na conexão própria
+# das métricas, sem confirmar nem desfazer nada na conexão compartilhada da
+# interface (que pode estar no meio da transação de outra sessão).
+# --------------------------------------------------------------------------------
+
+import pytest
+import database as db
+from database import instrumentation, sqlite_backend
+
+
+class _SharedConnection:
+    """Conexão da interface com a transação de outra sessão em andamento: não pode ser usada."""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"a gravação das métricas usou a conexão compartilhada ({name})")
+
+
+@pytest.fixture
+def metrics(conn, db_path):
+    opened = []
+
+    def connect():
+        opened.append(sqlite_backend.connect(str(db_path)))
+        return opened[-1]
+
+    db.configure_instrumentation(connect)
+    yield opened
+    db.configure_instrumentation(None)
+    for connection in opened:
+        connection.close()
+
+
+def _count(conn, table):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    count = cursor.fetchone()[0]
+    cursor.close()
+    return count
+
+
+def test_perf_records_are_written_on_their_own_connection(conn, metrics):
+    with db.track_rerun():
+        pass
+
+    written = db.flush_perf_records(_SharedConnection(), force=True)
+    assert written >= 1
+    assert _count(conn, "perf_reruns") == written
+    assert len(metrics) == 1
+
+
+def test_slow_queries_and_their_plans_use_the_metrics_connection(conn, metrics):
+    instrumentation._record_statement("SELECT 1", None, db.SLOW_QUERY_THRESHOLD_MS + 1)
+    instrumentation._record_statement("SELECT 2", None, db.SLOW_QUERY_THRESHOLD_MS + 1)
+
+    assert db.flush_slow_queries(_SharedConnection()) == 2
+    assert _count(conn, "slow_queries") == 2
+    # A conexão própria é aberta uma vez e reaproveitada
+    assert db.flush_slow_queries(_SharedConnection()) == 0
+    assert len(metrics) == 1
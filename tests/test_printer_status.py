@@ -0,0 +1,47 @@
+# --------------------------------------------------------------------------------
+# test_printer_status.py (Testes da Gravação do Monitoramento de Impressoras)
+#
+# Descrição:
+# Uma verificação só move o feed incremental (updated_at) e a versão da
+# tabela quando algum valor monitorado muda.
+# --------------------------------------------------------------------------------
+
+import datetime
+
+import database as db
+from database.read_cache import get_table_versions
+
+
+def _add_printers(conn, admin_id, count):
+    for i in range(count):
+        data = {'unidade': "Matriz", 'fabricante': "HP", 'modelo': "M404", 'localizacao': "Térreo", 'setor': "TI",
+                'patrimonio': f"PAT{i:03d}", 'nome': f"HP-{i}", 'host': f"hp-{i}", 'endereco_ip': f"10.0.0.{i + 1}"}
+        assert db.add_printer(conn, data, admin_id)[0]
+    return [int(printer_id) for printer_id in db.get_all_printers(conn)['id']]
+
+
+def _poll(ids, toner, checked_at):
+    return [{'id': printer_id, 'status': "Online", 'status_detalhado': "Pronta", 'toner_preto': toner,
+             'toner_ciano': -1, 'toner_magenta': -1, 'toner_amarelo': -1, 'contagem_paginas': 1000,
+             'ultima_verificacao': checked_at} for printer_id in ids]
+
+
+def test_unchanged_poll_keeps_feed_and_cache_version(conn, admin_id):
+    ids = _add_printers(conn, admin_id, 3)
+    assert db.update_printers_details(conn, _poll(ids, 80, datetime.datetime.now())) == 3
+    since = db.get_printers_changed_since(conn)['updated_at'].max().to_pydatetime()
+    version = get_table_versions(conn, ('printers',))
+
+    # Mesmos valores: só a hora da verificação muda
+    checked_at = datetime.datetime.now().replace(microsecond=0)
+    assert db.update_printers_details(conn, _poll(ids, 80, checked_at)) == 0
+    assert db.get_printers_changed_since(conn, since).empty
+    assert get_table_versions(conn, ('printers',)) == version
+    assert (db.get_printers_changed_since(conn)['ultima_verificacao'] == checked_at).all()
+
+    # Toner de uma impressora mudou: só ela aparece no feed, com uma única mudança de versão
+    poll = _poll(ids, 80, datetime.datetime.now())
+    poll[1]['toner_preto'] = 79
+    assert db.update_printers_details(conn, poll) == 1
+    assert db.get_printers_changed_since(conn, since)['id'].tolist() == [ids[1]]
+    assert get_table_versions(conn, ('printers',)) == (version[0] + 1,)
@@ -0,0 +1,28 @@
+# --------------------------------------------------------------------------------
+# test_read_cache.py (Testes do Cache de Leitura Versionado)
+#
+# Descrição:
+# O DataFrame devolvido pelo cache pode ser alterado pelo chamador sem
+# corromper a entrada compartilhada com as outras sessões.
+# --------------------------------------------------------------------------------
+
+import pandas as pd
+from database.read_cache import cached_read
+
+
+def test_caller_mutations_do_not_reach_the_cached_frame(conn):
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return pd.DataFrame({'nome': ["HP-TI", "HP-RH"], 'paginas': [10, 20]})
+
+    first = cached_read(conn, ('printers',), 'teste_mutacao', loader)
+    first.loc[0, 'paginas'] = 999
+    first['nome'] = first['nome'].str.lower()
+    first.drop(index=1, inplace=True)
+
+    second = cached_read(conn, ('printers',), 'teste_mutacao', loader)
+    assert len(loads) == 1
+    assert second['nome'].tolist() == ["HP-TI", "HP-RH"]
+    assert second['paginas'].tolist() == [10, 20]
@@ -0,0 +1,60 @@
+# --------------------------------------------------------------------------------
+# test_sessions.py (Testes das Sessões Persistentes)
+#
+# Descrição:
+# Validação em conexão própria e revogação das sessões na troca de senha e
+# na desativação do usuário.
+# --------------------------------------------------------------------------------
+
+import pytest
+import database as db
+from database import sqlite_backend
+
+
+@pytest.fixture
+def sessions(db_path):
+    """Sessões validadas em uma conexão própria com o banco de teste, como em init_connection."""
+    opened = []
+
+    def connect():
+        opened.append(sqlite_backend.connect(str(db_path)))
+        return opened[-1]
+
+    db.configure_sessions("chave-de-teste", connect)
+    yield
+    db.configure_sessions("chave-de-teste")
+    for connection in opened:
+        connection.close()
+
+
+def test_validation_does_not_commit_pending_work_on_the_shared_connection(conn, admin_id, sessions):
+    token = db.create_session(conn, admin_id)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO system_settings (setting_key, setting_value) VALUES (%s, %s)", ("pendente", "1"))
+
+    assert db.validate_session(conn, token)['id'] == admin_id
+    assert conn.in_transaction
+    conn.rollback()
+    cursor.execute("SELECT COUNT(*) FROM system_settings WHERE setting_key = %s", ("pendente",))
+    assert cursor.fetchone()[0] == 0
+    cursor.close()
+
+
+def test_password_reset_revokes_open_sessions(conn, admin_id, sessions):
+    ok, password, _ = db.add_user(conn, "Maria", "", "maria@empresa.com", "padrão", admin_id)
+    user = db.check_login(conn, "maria@empresa.com", password)
+    token = db.create_session(conn, user['id'])
+    assert db.validate_session(conn, token) is not None
+
+    assert db.reset_user_password(conn, "maria@empresa.com", admin_id)[0]
+    assert db.validate_session(conn, token) is None
+
+
+def test_deactivation_revokes_open_sessions(conn, admin_id, sessions):
+    ok, password, _ = db.add_user(conn, "João", "", "joao@empresa.com", "padrão", admin_id)
+    user = db.check_login(conn, "joao@empresa.com", password)
+    token = db.create_session(conn, user['id'])
+    assert db.validate_session(conn, token) is not None
+
+    assert db.update_user_status(conn, user['id'], 'inativo', admin_id)[0]
+    assert db.validate_session(conn, token) is None
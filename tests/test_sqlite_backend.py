@@ -0,0 +1,162 @@
+# --------------------------------------------------------------------------------
+# test_sqlite_backend.py (Testes do Banco Embutido SQLite)
+#
+# Descrição:
+# Tradução do SQL do MySQL e as funções exportadas pelo pacote 'database'
+# executadas sobre um arquivo SQLite temporário, sem servidor.
+# --------------------------------------------------------------------------------
+
+import datetime
+
+import mysql.connector
+import pytest
+import database as db
+from database.sqlite_backend import translate
+
+
+# --- Tradução do SQL ---
+
+def test_translate_create_table_moves_indexes_and_enums():
+    statements, _ = translate(
+        "CREATE TABLE IF NOT EXISTS t (id INT AUTO_INCREMENT PRIMARY KEY, "
+        "status ENUM('a', 'b') NOT NULL DEFAULT 'a', criado TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+        "INDEX idx_t_status (status), FULLTEXT INDEX ft_t (status), UNIQUE KEY (status, criado))"
+    )
+    table, *indexes = statements
+    assert "INTEGER PRIMARY KEY AUTOINCREMENT" in table
+    assert "CHECK (status IN ('a', 'b'))" in table
+    assert "UNIQUE (status, criado)" in table
+    assert indexes == ["CREATE INDEX IF NOT EXISTS idx_t_status ON t (status)"]
+
+
+def test_translate_upsert_and_insert_ignore():
+    (upsert,), _ = translate("INSERT INTO t (k, v) VALUES (%s, %s) ON DUPLICATE KEY UPDATE v = VALUES(v)")
+    assert upsert == "INSERT INTO t (k, v) VALUES (?, ?) ON CONFLICT DO UPDATE SET v = excluded.v"
+    (ignore,), _ = translate("INSERT IGNORE INTO t (k) VALUES (%s)")
+    assert ignore.startswith("INSERT OR IGNORE INTO t")
+
+
+def test_translate_for_update_takes_the_write_lock():
+    (select,), locking = translate("SELECT v FROM t WHERE k = %s FOR UPDATE")
+    assert select == "SELECT v FROM t WHERE k = ?"
+    assert locking
+
+
+# --- Funções do pacote ---
+
+def test_user_lifecycle(conn, admin_id):
+    ok, password, _ = db.add_user(conn, "Maria Souza", "(11) 90000-0000", "maria@empresa.com", "padrão", admin_id)
+    assert ok
+    user = db.check_login(conn, "maria@empresa.com", password)
+    assert user['name'] == "Maria Souza"
+    assert db.check_login(conn, "maria@empresa.com", "senha-errada") is None
+
+    duplicate = db.add_user(conn, "Outra", "", "maria@empresa.com", "padrão", admin_id)
+    assert duplicate == (False, None, "Erro: O email fornecido já está cadastrado.")
+
+    ok, _ = db.update_user(conn, user['id'], "Maria S. Souza", "(11) 91111-1111", "maria@empresa.com", "técnico", admin_id)
+    assert ok
+    users = db.get_all_users(conn)
+    assert users.loc[users['id'] == user['id'], 'name'].item() == "Maria S. Souza"
+
+    page, total = db.search_users(conn, "S. Souza")
+    assert total == 1 and page['email'].tolist() == ["maria@empresa.com"]
+    assert db.find_existing_emails(conn, ["maria@empresa.com", "nao@existe.com"]) == {"maria@empresa.com"}
+
+
+def test_bulk_import_and_sectors(conn, admin_id):
+    ok, _ = db.add_users_bulk(conn, [
+        {'name': f"Usuário {i}", 'phone': "", 'email': f"u{i}@empresa.com", 'permission_level': "padrão",
+         'password_hash': db.hash_password("x").decode()}
+        for i in range(3)
+    ], admin_id)
+    assert ok
+    sector = {'location_tower': "A", 'location_floor': "1", 'sector_name': "Financeiro", 'cost_center': "CC1",
+              'manager_name': "Ana", 'manager_contact': "ramal 10"}
+    assert db.add_sector(conn, sector, admin_id)[0]
+    sectors = db.get_all_sectors(conn)
+    assert sectors['sector_name'].tolist() == ["Financeiro"]
+    sector_id = int(sectors['id'].iloc[0])
+    assert db.update_sector_status(conn, sector_id, "Financeiro", "inativo", admin_id)[0]
+    assert db.get_all_sectors(conn, only_active=True).empty
+
+
+def test_printers_and_status_feed(conn, admin_id):
+    data = {'unidade': "Matriz", 'fabricante': "HP", 'modelo': "M404", 'localizacao': "Térreo", 'setor': "TI",
+            'patrimonio': "PAT001", 'nome': "HP-TI", 'host': "hp-ti", 'endereco_ip': "10.0.0.5"}
+    assert db.add_printer(conn, data, admin_id)[0]
+    printers = db.get_all_printers(conn)
+    printer_id = int(printers['id'].iloc[0])
+    assert db.search_ids(conn, 'printers', "PAT00") == [printer_id]
+
+    since = datetime.datetime.now() - datetime.timedelta(minutes=1)
+    assert len(db.get_printers_changed_since(conn, since)) == 1
+    assert db.save_printer_health(conn, [(printer_id, 'aberto', 3, datetime.datetime.now(), "Não responde (Ping)")])
+    assert db.get_skipped_printers(conn)['Falhas Seguidas'].tolist() == [3]
+
+
+def test_settings_and_permissions(conn, admin_id):
+    db.populate_initial_settings(conn)
+    db.populate_initial_permissions(conn)
+    assert db.set_setting(conn, 'login_title', "Bem-vindo", admin_id)[0]
+    assert db.get_setting(conn, 'login_title') == "Bem-vindo"
+    assert db.set_multiple_settings(conn, {'login_title': "Outro", 'novo': "1"}, admin_id)[0]
+    assert db.get_all_settings(conn)['novo'] == "1"
+
+    permissions = db.get_all_page_permissions(conn)
+    assert not permissions.empty
+    page = permissions['page_name'].iloc[0]
+    assert db.update_page_permission(conn, page, "padrão", True, admin_id)[0]
+    assert db.check_page_access(conn, page, "padrão")
+
+
+def test_audit_log_search_history_and_rollup(conn, admin_id):
+    db.log_action(conn, admin_id, 'TESTE', "Impressora RH-01 reiniciada 100% ok", 'printer', 7, {'status': "Online"})
+    db.log_action(conn, admin_id, 'TESTE', "Outra ação qualquer")
+
+    page, total = db.search_logs(conn, "RH-01")
+    assert total == 1 and "RH-01" in page['Detalhes'].iloc[0]
+    assert db.search_logs(conn, "100%")[1] == 1
+    assert db.search_logs(conn, "_")[1] == 0
+    assert len(db.get_entity_history(conn, 'printer', 7)) == 1
+    assert len(db.get_all_logs(conn)) >= 2
+
+    # Só agrega logs assentados: com o intervalo zerado, os recém-gravados já entram
+    import database.rollups as rollups
+    settle = rollups.SETTLE_SECONDS
+    rollups.SETTLE_SECONDS = 0
+    try:
+        assert db.refresh_logs_rollup(conn)[0]
+        activity = db.get_logs_activity(conn, datetime.date.today() - datetime.timedelta(days=1))
+    finally:
+        rollups.SETTLE_SECONDS = settle
+    assert activity['Quantidade'].sum() >= 2
+
+
+def test_email_outbox_claims_each_message_once(conn):
+    assert db.enqueue_emails(conn, [("a@empresa.com", "Assunto", "Corpo"), ("b@empresa.com", "Assunto", "Corpo")])
+    first = db.claim_due_emails(conn, limit=1)
+    second = db.claim_due_emails(conn, limit=5)
+    assert [m['recipient'] for m in first + second] == ["a@empresa.com", "b@empresa.com"]
+    assert db.claim_due_emails(conn) == []
+    db.mark_email_sent(conn, first[0]['id'])
+    db.mark_email_failed(conn, second[0]['id'], "recusado", retry_in_seconds=0)
+    assert [m['recipient'] for m in db.claim_due_emails(conn)] == ["b@empresa.com"]
+
+
+def test_sessions(conn, admin_id):
+    db.configure_sessions("chave-de-teste")
+    token = db.create_session(conn, admin_id)
+    assert db.validate_session(conn, token)['id'] == admin_id
+    db.revoke_session(conn, token)
+    assert db.validate_session(conn, token) is None
+
+
+def test_sqlite_errors_are_raised_as_connector_errors(conn):
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO system_settings (setting_key, setting_value) VALUES (%s, %s)", ("k", "1"))
+    with pytest.raises(mysql.connector.IntegrityError) as excinfo:
+        cursor.execute("INSERT INTO system_settings (setting_key, setting_value) VALUES (%s, %s)", ("k", "2"))
+    assert excinfo.value.errno == 1062
+    conn.rollback()
+    cursor.close()
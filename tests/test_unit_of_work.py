@@ -0,0 +1,51 @@
+# --------------------------------------------------------------------------------
+# test_unit_of_work.py (Testes da Unidade de Trabalho)
+#
+# Descrição:
+# Alteração e log de auditoria são gravados juntos ou não são gravados.
+# --------------------------------------------------------------------------------
+
+import pytest
+import mysql.connector
+import database as db
+from database.unit_of_work import unit_of_work
+
+PRINTER = {'unidade': "Matriz", 'fabricante': "HP", 'modelo': "M404", 'localizacao': "Térreo", 'setor': "TI",
+           'patrimonio': "PAT001", 'nome': "HP-TI", 'host': "hp-ti", 'endereco_ip': "10.0.0.5"}
+
+
+def _count(conn, table):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    count = cursor.fetchone()[0]
+    cursor.close()
+    return count
+
+
+def test_change_and_log_are_committed_together(conn, admin_id):
+    assert db.add_printer(conn, PRINTER, admin_id)[0]
+    assert not conn.in_transaction
+    assert _count(conn, "printers") == 1
+    assert len(db.get_entity_history(conn, db.ENTITY_PRINTER, 1)) == 1
+
+
+def test_failed_log_insert_rolls_back_the_change(conn):
+    # 999 não existe: o log viola a chave estrangeira no commit da unidade
+    ok, _ = db.add_printer(conn, PRINTER, 999)
+    assert not ok
+    assert not conn.in_transaction
+
+    # Um commit seguinte na mesma conexão não pode gravar a impressora sem o log
+    assert db.enqueue_email(conn, "a@empresa.com", "Assunto", "Corpo")
+    assert _count(conn, "printers") == 0
+    assert _count(conn, "user_logs") == 0
+
+
+def test_error_inside_the_block_discards_pending_logs(conn, admin_id):
+    with pytest.raises(mysql.connector.Error):
+        with unit_of_work(conn) as uow:
+            uow.cursor.execute("INSERT INTO system_settings (setting_key, setting_value) VALUES (%s, %s)", ("k", "1"))
+            uow.log(admin_id, 'SETTING_UPDATED', "Teste", db.ENTITY_SETTING, "k")
+            uow.cursor.execute("INSERT INTO system_settings (setting_key, setting_value) VALUES (%s, %s)", ("k", "2"))
+    assert _count(conn, "system_settings") == 0
+    assert _count(conn, "user_logs") == 0
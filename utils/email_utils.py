@@ -2,38 +2,27 @@
 # email_utils.py (Módulo de Utilitários de Email)
 #
 # Autor: Emerson A. Silva
-# Data: 22/10/2025
+# Data: 24/10/2025
 #
 # Descrição:
-# Função de envio de email refatorada para aceitar um assunto e corpo
-# personalizáveis, mantendo a retrocompatibilidade.
+# As páginas não enviam mais e-mails diretamente: as mensagens são gravadas
+# na fila 'email_outbox' e um remetente em segundo plano as envia reutilizando
+# uma única conexão SMTP autenticada, com novas tentativas e backoff.
+# A senha temporária não entra no corpo gravado: a fila guarda o modelo com
+# o marcador {senha} e a senha cifrada, e o corpo final é montado no envio.
+# A função síncrona enviar_email_senha foi mantida por retrocompatibilidade.
 # --------------------------------------------------------------------------------
 
 import streamlit as st
 import smtplib
 import ssl
+import threading
+import time
 from email.message import EmailMessage
+import database as db
 
-
-def enviar_email_senha(email_destinatario, senha_temporaria, assunto=None, corpo_template=None):
-    """
-    Envia um e-mail com uma senha, usando um modelo de corpo e assunto personalizável.
-    Se o assunto ou o corpo não forem fornecidos, usa o padrão de "Redefinição de Senha".
-    """
-    try:
-        # --- LÊ AS CREDENCIAIS DO SECRETS ---
-        email_config = st.secrets["email"]
-        email_sender = email_config["sender_email"]
-        email_password = email_config["sender_password"]
-        smtp_server = email_config.get("smtp_server", "smtp.gmail.com")
-        smtp_port = email_config.get("smtp_port", 465)
-
-        # --- LÓGICA DE TEMPLATE ---
-        if assunto is None:
-            assunto = "Redefinição de Senha - Sistema de Gestão"
-
-        if corpo_template is None:
-            corpo_template = """
+ASSUNTO_PADRAO = "Redefinição de Senha - Sistema de Gestão"
+CORPO_PADRAO = """
 Olá,
 
 Uma redefinição de senha foi solicitada para sua conta.
@@ -46,19 +35,89 @@ Atenciosamente,
 Sistema de Gestão de Impressoras
 """
 
-        # Formata o corpo do email com a senha fornecida
-        corpo = corpo_template.format(senha=senha_temporaria)
+# --- Parâmetros do remetente em segundo plano ---
+TAMANHO_LOTE = 50
+INTERVALO_VERIFICACAO = 5       # segundos entre consultas à fila quando ociosa
+OCIOSIDADE_MAXIMA_SMTP = 60     # segundos até encerrar a conexão SMTP ociosa
+MAX_TENTATIVAS = 6
+BACKOFF_INICIAL = 30            # segundos; dobra a cada tentativa
+
+_VERDADEIROS = {"true", "1", "yes", "sim", "on"}
+_FALSOS = {"false", "0", "no", "nao", "não", "off"}
+
+
+def _como_booleano(valor, chave):
+    """Interpreta um valor do secrets.toml como booleano ("false" em texto é False)."""
+    if isinstance(valor, bool):
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in _VERDADEIROS:
+        return True
+    if texto in _FALSOS:
+        return False
+    raise ValueError(f"Valor inválido para '{chave}' em [email]: {valor!r} (use true ou false)")
+
+
+def _ler_configuracao_email():
+    """Lê as configurações de SMTP do st.secrets."""
+    email_config = st.secrets["email"]
+    return {
+        'sender_email': email_config["sender_email"],
+        'sender_password': email_config.get("sender_password", ""),
+        'smtp_server': email_config.get("smtp_server", "smtp.gmail.com"),
+        'smtp_port': int(email_config.get("smtp_port", 465)),
+        # Permite apontar para um servidor local sem TLS (ex.: aiosmtpd) em testes
+        'smtp_ssl': _como_booleano(email_config.get("smtp_ssl", True), "smtp_ssl"),
+    }
+
 
-        # --- CRIA E ENVIA O EMAIL ---
-        msg = EmailMessage()
-        msg['Subject'] = assunto
-        msg['From'] = email_sender
-        msg['To'] = email_destinatario
-        msg.set_content(corpo)
+def _modelo(assunto=None, corpo_template=None):
+    """Aplica o modelo padrão de "Redefinição de Senha" quando assunto/corpo não são informados."""
+    assunto = assunto if assunto is not None else ASSUNTO_PADRAO
+    corpo_template = corpo_template if corpo_template is not None else CORPO_PADRAO
+    return assunto, corpo_template
+
+
+def _preencher_senha(corpo_template, senha_temporaria):
+    """Substitui o marcador {senha}; demais chaves do texto (ex.: no nome) ficam intactas."""
+    if senha_temporaria is None:
+        return corpo_template
+    return corpo_template.replace(db.SECRET_PLACEHOLDER, senha_temporaria)
+
+
+def _montar_mensagem(remetente, destinatario, assunto, corpo):
+    msg = EmailMessage()
+    msg['Subject'] = assunto
+    msg['From'] = remetente
+    msg['To'] = destinatario
+    msg.set_content(corpo)
+    return msg
+
+
+def _abrir_conexao_smtp(config):
+    """Abre e autentica uma conexão SMTP conforme a configuração."""
+    if config['smtp_ssl']:
+        smtp = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'], context=ssl.create_default_context())
+    else:
+        smtp = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
+    if config['sender_password']:
+        smtp.login(config['sender_email'], config['sender_password'])
+    return smtp
+
+
+def enviar_email_senha(email_destinatario, senha_temporaria, assunto=None, corpo_template=None):
+    """
+    Envia um e-mail com uma senha, usando um modelo de corpo e assunto personalizável.
+    Se o assunto ou o corpo não forem fornecidos, usa o padrão de "Redefinição de Senha".
+    Envio síncrono: prefira enfileirar_email_senha nas páginas.
+    """
+    try:
+        config = _ler_configuracao_email()
+        assunto, corpo_template = _modelo(assunto, corpo_template)
+        msg = _montar_mensagem(config['sender_email'], email_destinatario, assunto,
+                               _preencher_senha(corpo_template, senha_temporaria))
 
-        contexto_ssl = ssl.create_default_context()
-        with smtplib.SMTP_SSL(smtp_server, smtp_port, context=contexto_ssl) as smtp:
-            smtp.login(email_sender, email_password)
+        with _abrir_conexao_smtp(config) as smtp:
             smtp.send_message(msg)
 
         return True
@@ -66,6 +125,9 @@ Sistema de Gestão de Impressoras
     except KeyError:
         st.error("Configuração 'email' (sender_email, sender_password) não encontrada no st.secrets.")
         return False
+    except ValueError as e:
+        st.error(str(e))
+        return False
     except smtplib.SMTPAuthenticationError:
         st.error("Erro de autenticação SMTP. Verifique o email e a senha do remetente no st.secrets.")
         return False
@@ -76,3 +138,141 @@ Sistema de Gestão de Impressoras
         st.error(f"Erro inesperado ao enviar e-mail: {e}")
         return False
 
+
+def enfileirar_email_senha(conn, email_destinatario, senha_temporaria, assunto=None, corpo_template=None):
+    """
+    Grava o e-mail na fila de saída e retorna imediatamente; o envio é feito
+    pelo remetente em segundo plano. Mesmos modelos de enviar_email_senha: o
+    corpo é gravado com o marcador {senha} e a senha vai cifrada à parte.
+    """
+    assunto, corpo_template = _modelo(assunto, corpo_template)
+    if not db.enqueue_email(conn, email_destinatario, assunto, corpo_template, senha_temporaria):
+        return False
+    remetente = iniciar_remetente_emails()
+    if remetente:
+        remetente.acordar()
+    return True
+
+
+def enfileirar_emails(conn, mensagens):
+    """
+    Grava várias mensagens (destinatário, assunto, corpo com o marcador {senha},
+    senha) na fila em uma única transação.
+    """
+    if not db.enqueue_emails(conn, mensagens):
+        return False
+    remetente = iniciar_remetente_emails()
+    if remetente:
+        remetente.acordar()
+    return True
+
+
+class RemetenteEmails:
+    """
+    Thread que esvazia a fila 'email_outbox'. Mantém uma única conexão SMTP
+    autenticada enquanto houver mensagens e a encerra após um período ocioso.
+    """
+
+    def __init__(self, config, abrir_conexao_db):
+        self.config = config
+        self._abrir_conexao_db = abrir_conexao_db
+        self._conn = None
+        self._smtp = None
+        self._ultimo_uso_smtp = 0.0
+        self._evento = threading.Event()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="email-outbox", daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def acordar(self):
+        """Processa a fila imediatamente, sem aguardar o próximo intervalo."""
+        self._evento.set()
+
+    def parar(self):
+        self._parar.set()
+        self._evento.set()
+        self._thread.join(timeout=10)
+        self._fechar_smtp()
+
+    def _conexao_db(self):
+        if self._conn is None or not self._conn.is_connected():
+            self._conn = self._abrir_conexao_db()
+        return self._conn
+
+    def _conexao_smtp(self):
+        if self._smtp is None:
+            self._smtp = _abrir_conexao_smtp(self.config)
+        self._ultimo_uso_smtp = time.monotonic()
+        return self._smtp
+
+    def _fechar_smtp(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                enviados = self.processar_fila()
+            except Exception as e:
+                print(f"Erro no remetente de e-mails: {e}")
+                self._fechar_smtp()
+                self._conn = None
+                enviados = 0
+
+            if enviados:
+                continue
+            if self._smtp is not None and time.monotonic() - self._ultimo_uso_smtp > OCIOSIDADE_MAXIMA_SMTP:
+                self._fechar_smtp()
+            self._evento.wait(INTERVALO_VERIFICACAO)
+            self._evento.clear()
+
+    def processar_fila(self):
+        """Envia um lote de mensagens pendentes. Retorna quantas foram processadas."""
+        conn = self._conexao_db()
+        mensagens = db.claim_due_emails(conn, TAMANHO_LOTE)
+        for mensagem in mensagens:
+            self._enviar(conn, mensagem)
+        return len(mensagens)
+
+    def _enviar(self, conn, mensagem):
+        corpo = _preencher_senha(mensagem['body'] or "", mensagem['secret'])
+        msg = _montar_mensagem(self.config['sender_email'], mensagem['recipient'], mensagem['subject'], corpo)
+        try:
+            try:
+                self._conexao_smtp().send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # Conexão reaproveitada encerrada pelo servidor: reconecta e tenta uma vez
+                self._fechar_smtp()
+                self._conexao_smtp().send_message(msg)
+            db.mark_email_sent(conn, mensagem['id'])
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+            # Endereço recusado pelo servidor: tentar de novo não vai resolver
+            db.mark_email_failed(conn, mensagem['id'], e)
+        except (smtplib.SMTPException, OSError) as e:
+            # Falha de conexão/servidor: descarta a conexão e reagenda com backoff
+            self._fechar_smtp()
+            tentativas = mensagem['attempts'] + 1
+            if tentativas >= MAX_TENTATIVAS:
+                db.mark_email_failed(conn, mensagem['id'], e)
+            else:
+                db.mark_email_failed(conn, mensagem['id'], e, BACKOFF_INICIAL * (2 ** (tentativas - 1)))
+
+
+@st.cache_resource
+def iniciar_remetente_emails():
+    """Inicia, uma única vez por processo, o remetente de e-mails em segundo plano."""
+    try:
+        return RemetenteEmails(_ler_configuracao_email(), db.open_connection).iniciar()
+    except KeyError:
+        print("Configuração 'email' ou 'mysql' não encontrada no st.secrets; remetente de e-mails não iniciado.")
+        return None
+    except ValueError as e:
+        print(f"{e}; remetente de e-mails não iniciado.")
+        return None
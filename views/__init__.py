@@ -2,16 +2,40 @@
 # __init__.py (Ponto de Entrada do Pacote 'views')
 #
 # Descrição:
-# Este ficheiro importa todas as funções de renderização de página
-# dos seus respetivos módulos, expondo-as de forma unificada para
-# que o app.py possa importá-las de um único lugar.
+# Expõe as funções de renderização de página para que o app.py possa
+# importá-las de um único lugar. Cada módulo de página (e as dependências
+# pesadas que ele traz, como pandas e o envio de e-mails) só é importado no
+# primeiro acesso à função (PEP 562), e não na partida do app.
 # --------------------------------------------------------------------------------
 
-from .home import show_home_page
-from .perfil import show_perfil_page
-from .setores import show_setores_page
-from .gerenciamento import show_gerenciamento_page
-from .permissoes import show_permissoes_page
-from .logs import show_logs_page
-from .personalizacao import show_personalizacao_page
-from .reset import show_reset_page
\ No newline at end of file
+import importlib
+from database import instrument_page
+
+_PAGE_MODULES = {
+    'show_home_page': '.home',
+    'show_perfil_page': '.perfil',
+    'show_setores_page': '.setores',
+    'show_gerenciamento_page': '.gerenciamento',
+    'show_permissoes_page': '.permissoes',
+    'show_logs_page': '.logs',
+    'show_personalizacao_page': '.personalizacao',
+    'show_reset_page': '.reset',
+    'show_desempenho_page': '.desempenho',
+}
+
+__all__ = list(_PAGE_MODULES)
+
+
+def __getattr__(name):
+    module_name = _PAGE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    function = getattr(importlib.import_module(module_name, __name__), name)
+    # Registra a página renderizada nas métricas do rerun (show_home_page -> page_home)
+    function = instrument_page(function, "page_" + name[len("show_"):-len("_page")])
+    globals()[name] = function
+    return function
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
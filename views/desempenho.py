@@ -0,0 +1,157 @@
+# --------------------------------------------------------------------------------
+# desempenho.py (Módulo da Página de Desempenho)
+#
+# Descrição:
+# Página de administração com as métricas coletadas pela instrumentação de
+# cada rerun: tempo por página (p50/p95), tempo gasto no banco, consultas e
+# linhas lidas, funções do pacote 'database' mais custosas, as consultas mais
+# lentas e as estatísticas por assinatura de comando SQL (memória deste
+# processo), os contadores das instruções preparadas, as verificações recentes
+# das impressoras (latência e handshakes IPP), além das consultas lentas
+# gravadas em 'slow_queries'.
+# --------------------------------------------------------------------------------
+
+import streamlit as st
+import pandas as pd
+import database as db
+
+
+def _resumo_por_pagina(reruns_df):
+    agrupado = reruns_df.groupby('pagina')
+    resumo = pd.DataFrame({
+        'Reruns': agrupado.size(),
+        'p50 (ms)': agrupado['total_ms'].quantile(0.5),
+        'p95 (ms)': agrupado['total_ms'].quantile(0.95),
+        'Banco p50 (ms)': agrupado['banco_ms'].quantile(0.5),
+        'Consultas (média)': agrupado['consultas'].mean(),
+        'Linhas (média)': agrupado['linhas'].mean(),
+    })
+    return resumo.sort_values('p95 (ms)', ascending=False).round(2)
+
+
+def _resumo_por_funcao(registros):
+    totais = {}
+    for registro in registros:
+        for nome, (chamadas, tempo_ms) in registro['chamadas'].items():
+            acumulado = totais.setdefault(nome, [0, 0.0])
+            acumulado[0] += chamadas
+            acumulado[1] += tempo_ms
+    funcoes_df = pd.DataFrame(
+        [(nome, chamadas, tempo_ms, tempo_ms / chamadas) for nome, (chamadas, tempo_ms) in totais.items()],
+        columns=['Função', 'Chamadas', 'Tempo total (ms)', 'Tempo médio (ms)']
+    )
+    return funcoes_df.sort_values('Tempo total (ms)', ascending=False).round(3)
+
+
+def _consultas_mais_lentas(registros, limite=20):
+    consultas = [
+        (tempo_ms, registro['pagina'], consulta)
+        for registro in registros
+        for tempo_ms, consulta in registro['consultas_lentas']
+    ]
+    consultas.sort(reverse=True)
+    return pd.DataFrame(consultas[:limite], columns=['Tempo (ms)', 'Página', 'Consulta']).round(3)
+
+
+def _verificacoes_impressoras():
+    """Última verificação de status das impressoras e o histórico recente deste processo."""
+    # Importado só aqui: o pyipp e o aiohttp não pesam nas demais páginas
+    import network_utils
+
+    st.subheader("Verificação das impressoras")
+    st.caption("Latência por impressora consultada e conexões IPP abertas (handshakes) x reaproveitadas.")
+    relatorios = network_utils.get_poll_reports()
+    if not relatorios:
+        st.info("Nenhuma verificação de status executada por este processo.")
+        return
+
+    ultimo = relatorios[-1]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Duração", f"{ultimo['duracao_segundos']:.2f} s")
+    col2.metric("Latência p95", f"{ultimo['latencia_p95_ms']:.0f} ms")
+    col3.metric("Handshakes", ultimo['handshakes'])
+    col4.metric("Conexões reaproveitadas", ultimo['conexoes_reaproveitadas'])
+
+    verificacoes_df = pd.DataFrame(relatorios[::-1]).rename(columns={
+        'inicio': 'Início', 'duracao_segundos': 'Duração (s)', 'impressoras': 'Impressoras',
+        'consultadas': 'Consultadas', 'latencia_p50_ms': 'Latência p50 (ms)', 'latencia_p95_ms': 'Latência p95 (ms)',
+        'handshakes': 'Handshakes', 'conexoes_reaproveitadas': 'Reaproveitadas'
+    })
+    st.dataframe(verificacoes_df, use_container_width=True, hide_index=True)
+
+
+def show_desempenho_page(conn):
+    """Renderiza a página de métricas de desempenho por rerun."""
+
+    user_info = st.session_state.get("user_info", {})
+    if user_info.get("permission_level") != "admin":
+        st.error("Acesso negado. Apenas administradores podem ver as métricas de desempenho.")
+        st.stop()
+
+    st.header("Desempenho")
+    st.caption("Métricas dos últimos reruns atendidos por este processo (o rerun atual ainda não aparece).")
+
+    registros = db.get_perf_records()
+    if not registros:
+        st.info("Ainda não há reruns registrados.")
+        st.stop()
+
+    reruns_df = pd.DataFrame(
+        [{k: r[k] for k in ('inicio', 'pagina', 'total_ms', 'banco_ms', 'consultas', 'linhas')} for r in registros]
+    )
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Reruns", len(reruns_df))
+    col2.metric("p50 geral", f"{reruns_df['total_ms'].quantile(0.5):.1f} ms")
+    col3.metric("p95 geral", f"{reruns_df['total_ms'].quantile(0.95):.1f} ms")
+    col4.metric("Consultas por rerun", f"{reruns_df['consultas'].mean():.1f}")
+
+    st.subheader("Por página")
+    st.dataframe(_resumo_por_pagina(reruns_df), use_container_width=True)
+
+    st.subheader("Consultas mais lentas")
+    st.dataframe(_consultas_mais_lentas(registros), use_container_width=True, hide_index=True)
+
+    st.subheader("Funções do banco")
+    st.dataframe(_resumo_por_funcao(registros), use_container_width=True, hide_index=True)
+
+    st.subheader("Assinaturas de consultas")
+    st.caption("Comandos SQL agregados com os literais removidos, desde o início deste processo.")
+    assinaturas_df = pd.DataFrame(db.get_query_fingerprint_stats())
+    if not assinaturas_df.empty:
+        assinaturas_df = assinaturas_df.rename(columns={
+            'assinatura': 'Assinatura', 'execucoes': 'Execuções', 'total_ms': 'Total (ms)',
+            'medio_ms': 'Médio (ms)', 'max_ms': 'Máximo (ms)', 'p95_ms': 'p95 (ms)'
+        }).round(3)
+    st.dataframe(assinaturas_df, use_container_width=True, hide_index=True)
+
+    st.subheader("Instruções preparadas")
+    st.caption("Consultas frequentes preparadas uma vez por conexão; 'Preparações' cresce só em conexões novas ou refeitas.")
+    preparadas_df = pd.DataFrame(db.get_statement_metrics()).rename(columns={
+        'instrucao': 'Instrução', 'execucoes': 'Execuções', 'preparacoes': 'Preparações', 'erros': 'Erros'
+    })
+    st.dataframe(preparadas_df, use_container_width=True, hide_index=True)
+
+    _verificacoes_impressoras()
+
+    st.subheader("Consultas lentas capturadas")
+    st.caption(f"Comandos acima de {db.SLOW_QUERY_THRESHOLD_MS:.0f} ms, com parâmetros e plano de execução (EXPLAIN).")
+    lentas = db.get_slow_queries(conn)
+    if not lentas:
+        st.info("Nenhuma consulta lenta capturada.")
+    for lenta in lentas:
+        with st.expander(f"{float(lenta['duration_ms']):.1f} ms · {lenta['page'] or '-'} · {lenta['captured_at']}"):
+            st.code(lenta['fingerprint'], language="sql")
+            st.caption(f"Parâmetros: {lenta['params']}")
+            if lenta['explain_plan']:
+                st.json(lenta['explain_plan'], expanded=False)
+
+    st.divider()
+    persistir = db.get_setting(conn, 'perf_persist_enabled') == '1'
+    novo_valor = st.toggle("Gravar as métricas na tabela 'perf_reruns' (em lotes)", value=persistir)
+    if novo_valor != persistir:
+        success, message = db.set_setting(conn, 'perf_persist_enabled', '1' if novo_valor else '0', user_info.get("id"))
+        if success:
+            st.rerun()
+        else:
+            st.error(message)
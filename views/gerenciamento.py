@@ -10,9 +10,118 @@
 # --------------------------------------------------------------------------------
 
 import streamlit as st
+import pandas as pd
 import database as db
 import re
-from utils.email_utils import enviar_email_senha
+from utils.email_utils import enfileirar_email_senha, enfileirar_emails
+
+EMAIL_REGEX = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+PHONE_REGEX = r'^\(?\d{2}\)?[\s-]?9?\d{4}[\s-]?\d{4}$'
+PERMISSION_LEVELS = ["padrão", "admin", "técnico"]
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+
+ASSUNTO_BOAS_VINDAS = "Bem-vindo ao Sistema de Gestão!"
+
+
+def _corpo_boas_vindas(nome):
+    """Monta o modelo do email de boas-vindas; o marcador {senha} é preenchido no envio."""
+    primeiro_nome = nome.split()[0] if nome.split() else nome
+    return f"""
+Olá {primeiro_nome},
+
+A sua conta foi criada no nosso Sistema de Gestão de Impressoras.
+
+Para aceder, utilize a sua senha temporária abaixo:
+Senha: {{senha}}
+
+Por motivos de segurança, ser-lhe-á pedido que altere esta senha no seu primeiro login.
+
+Atenciosamente,
+A Administração
+"""
+
+
+def _validar_importacao(conn, df):
+    """
+    Valida o arquivo inteiro de forma vetorizada e retorna o DataFrame com a
+    coluna 'erro' (vazia nas linhas válidas).
+    """
+    df = df.rename(columns=lambda c: c.strip().lower())
+    for column in ("nome", "telefone", "email", "nivel_permissao"):
+        if column not in df.columns:
+            df[column] = ""
+    df = df[["nome", "telefone", "email", "nivel_permissao"]].fillna("").astype(str)
+    df["nome"] = df["nome"].str.strip()
+    df["telefone"] = df["telefone"].str.strip()
+    df["email"] = df["email"].str.strip().str.lower()
+    df["nivel_permissao"] = df["nivel_permissao"].str.strip().str.lower().replace("", "padrão")
+
+    existing = db.find_existing_emails(conn, df.loc[df["email"] != "", "email"].unique())
+
+    # A primeira regra violada de cada linha é a que aparece na coluna 'erro'
+    rules = [
+        ((df["nome"] == "") | (df["email"] == ""), "Nome e email são obrigatórios"),
+        (~df["email"].str.match(EMAIL_REGEX), "Email inválido"),
+        ((df["telefone"] != "") & ~df["telefone"].str.match(PHONE_REGEX), "Telefone inválido"),
+        (~df["nivel_permissao"].isin(PERMISSION_LEVELS), "Nível de permissão inválido"),
+        (df["email"].duplicated(keep="first"), "Email repetido no arquivo"),
+        (df["email"].isin(existing), "Email já cadastrado"),
+    ]
+    df["erro"] = ""
+    for mask, message in reversed(rules):
+        df.loc[mask, "erro"] = message
+    return df
+
+
+def _show_bulk_import(conn, admin_id):
+    """Importação de utilizadores em lote a partir de um arquivo CSV."""
+    with st.expander("📤 Importar Usuários (CSV)"):
+        st.info("O arquivo deve ter as colunas: nome, telefone, email, nivel_permissao "
+                "(padrão, admin ou técnico; vazio = padrão). Cada usuário recebe uma senha temporária por email.",
+                icon="ℹ️")
+        uploaded_file = st.file_uploader("Arquivo CSV", type=["csv"], key="bulk_users_csv")
+        if uploaded_file is None:
+            return
+
+        try:
+            raw_df = pd.read_csv(uploaded_file, dtype=str, sep=None, engine="python")
+        except (pd.errors.ParserError, UnicodeDecodeError, ValueError) as e:
+            st.error(f"Não foi possível ler o arquivo: {e}")
+            return
+
+        validated_df = _validar_importacao(conn, raw_df)
+        valid_df = validated_df[validated_df["erro"] == ""]
+        invalid_df = validated_df[validated_df["erro"] != ""]
+
+        st.write(f"**{len(valid_df)}** linha(s) válida(s), **{len(invalid_df)}** com erro.")
+        if not invalid_df.empty:
+            st.dataframe(invalid_df, use_container_width=True, hide_index=True)
+
+        if valid_df.empty:
+            return
+        if st.button(f"Importar {len(valid_df)} usuário(s)", type="primary", key="bulk_users_import"):
+            with st.spinner("A gerar senhas e a cadastrar usuários..."):
+                passwords = db.generate_hashed_passwords(len(valid_df))
+                users = [
+                    {'name': row.nome, 'phone': row.telefone, 'email': row.email,
+                     'permission_level': row.nivel_permissao, 'password_hash': hashed}
+                    for row, (_, hashed) in zip(valid_df.itertuples(), passwords)
+                ]
+                success, message = db.add_users_bulk(conn, users, admin_id)
+
+            if not success:
+                st.error(message)
+                return
+
+            emails = [
+                (user['email'], ASSUNTO_BOAS_VINDAS, _corpo_boas_vindas(user['name']), plain)
+                for user, (plain, _) in zip(users, passwords)
+            ]
+            if enfileirar_emails(conn, emails):
+                st.success(f"{message} Os emails de boas-vindas foram enfileirados.")
+            else:
+                st.warning(f"{message} Porém, falhou o enfileiramento dos emails; redefina as senhas manualmente.")
+
 
 def show_gerenciamento_page(conn):
     """Renderiza a página de gerenciamento de usuários."""
@@ -44,19 +153,16 @@ def show_gerenciamento_page(conn):
             nome = st.text_input("Nome Completo *")
             telefone = st.text_input("Telefone (opcional)", placeholder="(XX) XXXXX-XXXX")
             email = st.text_input("Email *").lower()
-            nivel_permissao = st.selectbox("Nível de Permissão *", ["padrão", "admin", "técnico"])
+            nivel_permissao = st.selectbox("Nível de Permissão *", PERMISSION_LEVELS)
 
             submitted = st.form_submit_button("Cadastrar e Enviar Email")
 
             if submitted:
-                email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                phone_regex = r'^\(?\d{2}\)?[\s-]?9?\d{4}[\s-]?\d{4}$'
-
                 if not (nome and email):
                     st.warning("Por favor, preencha todos os campos com *.")
-                elif not re.match(email_regex, email):
+                elif not re.match(EMAIL_REGEX, email):
                     st.error("Por favor, insira um endereço de email válido.")
-                elif telefone and not re.match(phone_regex, telefone):
+                elif telefone and not re.match(PHONE_REGEX, telefone):
                     st.error("Formato de telefone inválido. Use o formato (XX) XXXXX-XXXX.")
                 else:
                     try:
@@ -67,30 +173,16 @@ def show_gerenciamento_page(conn):
                         if success_db:
                             st.write(message_db)  # "Usuário criado com sucesso!"
 
-                            assunto_boas_vindas = "Bem-vindo ao Sistema de Gestão!"
-                            corpo_boas_vindas = f"""
-Olá {nome.split()[0]},
-
-A sua conta foi criada no nosso Sistema de Gestão de Impressoras.
-
-Para aceder, utilize a sua senha temporária abaixo:
-Senha: {senha_temp}
-
-Por motivos de segurança, ser-lhe-á pedido que altere esta senha no seu primeiro login.
-
-Atenciosamente,
-A Administração
-"""
-                            with st.spinner(f"A enviar email de boas-vindas para {email}..."):
-                                email_sent = enviar_email_senha(
-                                    email_destinatario=email,
-                                    senha_temporaria=senha_temp,
-                                    assunto=assunto_boas_vindas,
-                                    corpo_template=corpo_boas_vindas
-                                )
+                            email_sent = enfileirar_email_senha(
+                                conn,
+                                email_destinatario=email,
+                                senha_temporaria=senha_temp,
+                                assunto=ASSUNTO_BOAS_VINDAS,
+                                corpo_template=_corpo_boas_vindas(nome)
+                            )
 
                             if email_sent:
-                                st.success(f"Email enviado com sucesso para {email}!")
+                                st.success(f"Email de boas-vindas enfileirado para {email}!")
                                 st.balloons()
                                 st.rerun()
                             else:
@@ -105,35 +197,40 @@ A Administração
                     except Exception as e:
                         st.error(f"Ocorreu um erro inesperado: {e}")
 
+    _show_bulk_import(conn, admin_id)
+
     st.divider()
 
     # --- 2. BUSCA E EXPORTAÇÃO DE UTILIZADORES ---
     st.subheader("Usuários Cadastrados")
 
-    users_df = db.get_all_users(conn)
-
-    col_search, col_export = st.columns([4, 1])
+    col_search, col_page_size, col_export = st.columns([4, 1, 1])
     with col_search:
         search_term = st.text_input("Buscar Usuário (por nome, email ou telefone):", key="search_user_manag")
+    with col_page_size:
+        page_size = st.selectbox("Por página", PAGE_SIZE_OPTIONS, index=1, key="users_page_size")
 
-    if search_term:
-        mask = users_df.apply(lambda row:
-                              search_term.lower() in str(row.get('name', '')).lower() or
-                              search_term.lower() in str(row.get('email', '')).lower() or
-                              search_term.lower() in str(row.get('phone', '')).lower(),
-                              axis=1
-                              )
-        filtered_df = users_df[mask]
-    else:
-        filtered_df = users_df
+    # Volta para a primeira página quando a busca ou o tamanho da página mudam
+    if st.session_state.get('users_page_key') != (search_term, page_size):
+        st.session_state['users_page_key'] = (search_term, page_size)
+        st.session_state['users_page'] = 1
+
+    # A busca e a paginação são feitas no banco: só a página visível é carregada
+    page = st.session_state.get('users_page', 1)
+    page_df, total_users = db.search_users(conn, search_term, limit=page_size, offset=(page - 1) * page_size)
+    total_pages = max(1, -(-total_users // page_size))
+    if page_df.empty and page > total_pages:
+        # A página atual deixou de existir (ex.: a lista diminuiu); volta para a última
+        st.session_state['users_page'] = total_pages
+        st.rerun()
 
     with col_export:
-        if not filtered_df.empty:
+        if total_users:
             st.write("")  # Espaçamento
-            csv = filtered_df.to_csv(index=False).encode('utf-8')
             st.download_button(
                 label="📥 Exportar para CSV",
-                data=csv,
+                # Gerado apenas no clique, com todos os resultados da busca (não só a página)
+                data=lambda: db.search_users(conn, search_term, limit=None)[0].to_csv(index=False).encode('utf-8'),
                 file_name='lista_utilizadores.csv',
                 mime='text/csv',
                 use_container_width=True
@@ -142,10 +239,19 @@ A Administração
     st.divider()
 
     # --- 3. LISTA E EDIÇÃO DE UTILIZADORES ---
-    if filtered_df.empty:
+    if page_df.empty:
         st.warning("Nenhum usuário encontrado.")
     else:
-        for index, user in filtered_df.iterrows():
+        col_prev, col_info, col_next = st.columns([1, 3, 1])
+        if col_prev.button("⬅️ Anterior", disabled=page <= 1, use_container_width=True, key="users_prev"):
+            st.session_state['users_page'] = page - 1
+            st.rerun()
+        col_info.caption(f"Página {page} de {total_pages} — {total_users} usuário(s) encontrado(s)")
+        if col_next.button("Próxima ➡️", disabled=page >= total_pages, use_container_width=True, key="users_next"):
+            st.session_state['users_page'] = page + 1
+            st.rerun()
+
+        for index, user in page_df.iterrows():
             user_id_int = int(user['id'])
 
             with st.container(border=True):
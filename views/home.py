@@ -1,9 +1,145 @@
 import streamlit as st
+import pandas as pd
 import database as db
+from datetime import timedelta
+
+# Intervalo de atualização do painel de status (em segundos)
+REFRESH_SECONDS = 10
+# Janela de sobreposição do feed incremental: cobre transações gravadas com
+# 'updated_at' ligeiramente anterior à marca já lida por esta sessão
+FEED_OVERLAP = timedelta(seconds=2)
+
+
+def _merge_printer_changes(conn):
+    """Busca apenas as impressoras alteradas desde a última leitura e mescla no DataFrame da sessão."""
+    cached_df = st.session_state.get('printer_grid_df')
+    since = st.session_state.get('printer_grid_since')
+
+    if cached_df is None or since is None:
+        changes_df = db.get_printers_changed_since(conn)
+        merged_df = changes_df
+    else:
+        changes_df = db.get_printers_changed_since(conn, since - FEED_OVERLAP)
+        if changes_df.empty:
+            return cached_df
+        unchanged_df = cached_df[~cached_df['id'].isin(changes_df['id'])]
+        merged_df = pd.concat([unchanged_df, changes_df], ignore_index=True)
+
+    if not changes_df.empty:
+        st.session_state['printer_grid_since'] = pd.Timestamp(changes_df['updated_at'].max()).to_pydatetime()
+    st.session_state['printer_grid_df'] = merged_df
+    return merged_df
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def _printer_status_grid(conn):
+    """Painel de status que se atualiza sozinho, sem reexecutar o restante do app."""
+    printers_df = _merge_printer_changes(conn)
+
+    if printers_df.empty:
+        st.info("Nenhuma impressora cadastrada.")
+        return
+
+    online = int((printers_df['status'] == 'Online').sum())
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Impressoras", len(printers_df))
+    col2.metric("Online", online)
+    col3.metric("Offline / Desconhecido", len(printers_df) - online)
+
+    grid_df = printers_df.sort_values(['status', 'nome'], ascending=[False, True])
+    st.dataframe(
+        grid_df[['status', 'nome', 'setor', 'endereco_ip', 'status_detalhado', 'toner_preto', 'toner_ciano',
+                 'toner_magenta', 'toner_amarelo', 'contagem_paginas', 'updated_at']],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'status': "Status",
+            'nome': "Impressora",
+            'setor': "Setor",
+            'endereco_ip': "IP",
+            'status_detalhado': "Detalhes",
+            'toner_preto': st.column_config.ProgressColumn("Preto", min_value=0, max_value=100, format="%d%%"),
+            'toner_ciano': st.column_config.ProgressColumn("Ciano", min_value=0, max_value=100, format="%d%%"),
+            'toner_magenta': st.column_config.ProgressColumn("Magenta", min_value=0, max_value=100, format="%d%%"),
+            'toner_amarelo': st.column_config.ProgressColumn("Amarelo", min_value=0, max_value=100, format="%d%%"),
+            'contagem_paginas': "Páginas",
+            # O feed só traz as impressoras alteradas: a hora exibida é a da última mudança de estado
+            'updated_at': st.column_config.DatetimeColumn("Última Alteração", format="DD/MM/YYYY HH:mm"),
+        }
+    )
+    st.caption(f"Atualizado automaticamente a cada {REFRESH_SECONDS} segundos.")
+
+
+def _discovery_panel(conn, admin_id):
+    """Faixas de rede da descoberta automática e execução sob demanda (apenas administradores)."""
+    # Importado só aqui: a varredura (e o pyipp) não pesa no dashboard dos demais usuários
+    import discovery_utils as discovery
+
+    with st.expander("🔎 Descobrir impressoras na rede"):
+        current_ranges = db.get_setting(conn, 'discovery_cidr_ranges') or ""
+        with st.form("discovery_form"):
+            ranges_text = st.text_area(
+                "Faixas de rede (CIDR)", value=current_ranges, placeholder="10.0.0.0/24, 10.0.1.0/24",
+                help="Separe as faixas por vírgula ou por linha. Impressoras novas são cadastradas "
+                     "e as que mudaram de IP (mesmo nome/host) são atualizadas."
+            )
+            col1, col2 = st.columns(2)
+            save = col1.form_submit_button("Salvar Faixas", use_container_width=True)
+            run = col2.form_submit_button("Salvar e Descobrir Agora", type="primary", use_container_width=True)
+
+        if not (save or run):
+            return
+        try:
+            networks = discovery.parse_cidr_ranges(ranges_text)
+        except ValueError as e:
+            st.error(f"Faixa de rede inválida: {e}")
+            return
+        address_count = sum(network.num_addresses for network in networks)
+        if address_count > discovery.MAX_DISCOVERY_ADDRESSES:
+            st.error(f"As faixas somam {address_count} endereços; o limite é {discovery.MAX_DISCOVERY_ADDRESSES}.")
+            return
+
+        normalized = ", ".join(str(network) for network in networks)
+        if normalized != current_ranges:
+            success, message = db.set_setting(conn, 'discovery_cidr_ranges', normalized, admin_id)
+            if not success:
+                st.error(message)
+                return
+        if not run:
+            st.success("Faixas de rede salvas.")
+            return
+        if not networks:
+            st.warning("Informe ao menos uma faixa de rede.")
+            return
+
+        with st.spinner(f"Varrendo {address_count} endereços..."):
+            success, message, summary = discovery.discover_printers(conn, admin_id, normalized)
+        if success and summary.get('nao_sondados'):
+            st.warning(message)
+        elif success:
+            st.success(message)
+        else:
+            st.error(message)
+        if summary:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Encontradas", summary['encontradas'])
+            col2.metric("Novas", summary['novas'])
+            col3.metric("IPs Alterados", summary['ips_alterados'])
 
 
 def show_home_page(conn):
     """Renderiza o dashboard de monitoramento de impressoras."""
     st.header("Bem vindo ao Sistema Padrão")
 
-    
\ No newline at end of file
+    _printer_status_grid(conn)
+
+    # --- Impressoras ignoradas pelo disjuntor (circuito aberto) ---
+    skipped_df = db.get_skipped_printers(conn)
+    if not skipped_df.empty:
+        with st.expander(f"⛔ {len(skipped_df)} impressora(s) fora da verificação automática"):
+            st.caption("Estas impressoras falharam repetidamente e só serão sondadas novamente após o horário indicado.")
+            st.dataframe(skipped_df, use_container_width=True, hide_index=True)
+
+    user_info = st.session_state.get("user_info", {})
+    if user_info.get("permission_level") == "admin":
+        _discovery_panel(conn, user_info.get("id"))
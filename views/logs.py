@@ -6,38 +6,182 @@
 #
 # Descrição:
 # Página de administração para visualizar, filtrar e exportar a trilha
-# de auditoria do sistema.
+# de auditoria do sistema, com gráficos de atividade lidos do agregado
+# diário 'user_logs_daily'.
 # --------------------------------------------------------------------------------
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import database as db
-from datetime import datetime, time
+from datetime import date, datetime, time, timedelta
+
+SEARCH_PAGE_SIZE = 50
+
+ENTITY_TYPES = {"Usuário": db.ENTITY_USER, "Impressora": db.ENTITY_PRINTER, "Setor": db.ENTITY_SECTOR,
+                "Configuração": db.ENTITY_SETTING, "Permissão de página": db.ENTITY_PAGE_PERMISSION}
+
+ACTIVITY_PERIODS = {"Últimos 30 dias": 30, "Últimos 90 dias": 90, "Último ano": 365}
+
+# Ações que não alteram dados (ficam fora do gráfico de alterações por administrador)
+NON_CHANGE_ACTIONS = ('USER_LOGIN', 'USER_LOGOUT', 'PASSWORD_RESET_REQUESTED')
+
+
+def _show_activity(conn):
+    """Gráficos de atividade: só lê o agregado diário, nunca a trilha completa."""
+    period = st.selectbox("Período:", list(ACTIVITY_PERIODS), index=2)
+    start_date = date.today() - timedelta(days=ACTIVITY_PERIODS[period] - 1)
+
+    success, message = db.refresh_logs_rollup(conn)
+    if not success:
+        st.warning(message)
+
+    activity_df = db.get_logs_activity(conn, start_date)
+    if activity_df.empty:
+        st.info("Nenhuma atividade registrada no período.")
+        return
+
+    days = pd.date_range(start_date, date.today(), freq='D')
+
+    st.subheader("Logins por dia")
+    logins = activity_df[(activity_df['Ação'] == 'USER_LOGIN').to_numpy()]
+    st.bar_chart(logins.groupby('Dia')['Quantidade'].sum().reindex(days, fill_value=0).rename("Logins"))
+
+    st.subheader("Redefinições de senha por semana")
+    resets = activity_df[(activity_df['Ação'] == 'PASSWORD_RESET_REQUESTED').to_numpy()]
+    resets_per_day = resets.groupby('Dia')['Quantidade'].sum().reindex(days, fill_value=0)
+    st.bar_chart(resets_per_day.resample('W-MON', label='left', closed='left').sum().rename("Redefinições"))
+
+    st.subheader("Alterações por administrador")
+    changes_mask = (activity_df['Nível'] == 'admin').to_numpy() & ~activity_df['Ação'].isin(NON_CHANGE_ACTIONS).to_numpy()
+    changes = activity_df[changes_mask].groupby('Usuário', observed=True)['Quantidade'].sum()
+    if changes.empty:
+        st.caption("Nenhuma alteração feita por administradores no período.")
+    else:
+        st.bar_chart(changes.sort_values(ascending=False).rename("Alterações"), horizontal=True)
+
+
+def _entity_options(conn, entity_type):
+    """Opções do seletor de histórico: {rótulo exibido: entity_id}."""
+    if entity_type == db.ENTITY_USER:
+        users_df = db.get_all_users(conn)
+        return {f"{row.name} ({row.email})": row.id for row in users_df.itertuples()}
+    if entity_type == db.ENTITY_PRINTER:
+        printers_df = db.get_all_printers(conn)
+        return {f"{row.nome} ({row.patrimonio})": row.id for row in printers_df.itertuples()}
+    if entity_type == db.ENTITY_SECTOR:
+        sectors_df = db.get_all_sectors(conn)
+        return {row.sector_name: row.id for row in sectors_df.itertuples()}
+    if entity_type == db.ENTITY_SETTING:
+        return {key: key for key in sorted(db.get_all_settings(conn))}
+    permissions_df = db.get_all_page_permissions(conn)
+    return {f"{row.page_name} / {row.permission_level}": f"{row.page_name}:{row.permission_level}"
+            for row in permissions_df.itertuples()}
+
+
+def _show_entity_history(conn):
+    """Histórico de um registro específico, lido pelo índice (entity_type, entity_id)."""
+    col_type, col_entity = st.columns([1, 3])
+    with col_type:
+        entity_label = st.selectbox("Tipo:", list(ENTITY_TYPES))
+    entity_type = ENTITY_TYPES[entity_label]
+    options = _entity_options(conn, entity_type)
+    with col_entity:
+        selected = st.selectbox("Registro:", list(options), index=None, placeholder="Selecione...")
+    if selected is None:
+        return
+
+    history_df = db.get_entity_history(conn, entity_type, options[selected])
+    if history_df.empty:
+        st.info("Nenhum registro de auditoria para este item.")
+        return
+    st.subheader(f"{len(history_df)} evento(s)")
+    st.dataframe(history_df, use_container_width=True, hide_index=True)
+
+
+def _show_search_results(conn, search_term, selected_user, selected_action, start_datetime, end_datetime):
+    """Busca textual paginada no banco (índice FULLTEXT), com os filtros da página."""
+    filters = dict(
+        user_name=None if selected_user == "Todos" else selected_user,
+        action_type=None if selected_action == "Todos" else selected_action,
+        start=start_datetime, end=end_datetime,
+    )
+
+    # Volta para a primeira página quando a busca ou os filtros mudam
+    page_key = (search_term, tuple(filters.values()))
+    if st.session_state.get('logs_page_key') != page_key:
+        st.session_state['logs_page_key'] = page_key
+        st.session_state['logs_page'] = 1
+
+    page = st.session_state.get('logs_page', 1)
+    page_df, total = db.search_logs(conn, search_term, limit=SEARCH_PAGE_SIZE,
+                                    offset=(page - 1) * SEARCH_PAGE_SIZE, **filters)
+    total_pages = max(1, -(-total // SEARCH_PAGE_SIZE))
+
+    st.divider()
+
+    col_info, col_export = st.columns([3, 1])
+    with col_info:
+        st.subheader(f"{total} registro(s) encontrado(s)")
+    with col_export:
+        if total:
+            st.download_button(
+                label="📥 Exportar para CSV",
+                # Gerado apenas no clique, com todos os resultados da busca (não só a página)
+                data=lambda: db.search_logs(conn, search_term, limit=None, **filters)[0].to_csv(index=False).encode('utf-8'),
+                file_name=f'logs_busca_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
+                mime='text/csv',
+                use_container_width=True
+            )
+
+    if page_df.empty:
+        st.warning("Nenhum registro encontrado.")
+        return
+
+    col_prev, col_page, col_next = st.columns([1, 3, 1])
+    if col_prev.button("⬅️ Anterior", disabled=page <= 1, use_container_width=True, key="logs_prev"):
+        st.session_state['logs_page'] = page - 1
+        st.rerun()
+    col_page.caption(f"Página {page} de {total_pages}")
+    if col_next.button("Próxima ➡️", disabled=page >= total_pages, use_container_width=True, key="logs_next"):
+        st.session_state['logs_page'] = page + 1
+        st.rerun()
+
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+
 
 def show_logs_page(conn):
     """Renderiza a página para visualizar e filtrar a trilha de auditoria."""
 
     st.header("Auditoria")
 
+    mode = st.radio("Visualização:", ["Registros", "Atividade", "Histórico"], horizontal=True, label_visibility="collapsed")
+    if mode == "Atividade":
+        _show_activity(conn)
+        return
+    if mode == "Histórico":
+        _show_entity_history(conn)
+        return
+
     logs_df = db.get_all_logs(conn)
 
     if logs_df.empty:
         st.info("Nenhum registro de log encontrado.")
         st.stop()
-    
-    if not pd.api.types.is_datetime64_any_dtype(logs_df['Data e Hora']):
-        logs_df['Data e Hora'] = pd.to_datetime(logs_df['Data e Hora'])
 
     # --- Filtros ---
-    
+
+    search_term = st.text_input("Buscar nos detalhes (ex.: RH-01, usuario@empresa.com):", key="logs_search")
+
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        user_list = ["Todos"] + sorted(logs_df['Nome do Usuário'].dropna().unique())
+        # Colunas categóricas: os valores distintos já estão nas categorias
+        user_list = ["Todos"] + sorted(logs_df['Nome do Usuário'].cat.categories)
         selected_user = st.selectbox("Filtrar por Usuário:", user_list)
 
     with col2:
-        action_list = ["Todos"] + sorted(logs_df['Tipo de Ação'].unique())
+        action_list = ["Todos"] + sorted(logs_df['Tipo de Ação'].cat.categories)
         selected_action = st.selectbox("Filtrar por Ação:", action_list)
         
     with col3:
@@ -50,23 +194,30 @@ def show_logs_page(conn):
             max_value=max_date
         )
 
+    start_datetime = end_datetime = None
+    if len(date_range) == 2:
+        start_datetime = datetime.combine(date_range[0], time.min)
+        end_datetime = datetime.combine(date_range[1], time.max)
+
+    if search_term.strip():
+        _show_search_results(conn, search_term, selected_user, selected_action, start_datetime, end_datetime)
+        return
+
     # --- Aplicação dos Filtros ---
-    filtered_df = logs_df.copy()
+    # Os filtros são combinados em uma única máscara e aplicados uma vez; o
+    # DataFrame do cache compartilhado nunca é copiado nem alterado.
+    mask = np.ones(len(logs_df), dtype=bool)
 
     if selected_user != "Todos":
-        filtered_df = filtered_df[filtered_df['Nome do Usuário'] == selected_user]
-    
+        mask &= (logs_df['Nome do Usuário'] == selected_user).to_numpy()
+
     if selected_action != "Todos":
-        filtered_df = filtered_df[filtered_df['Tipo de Ação'] == selected_action]
+        mask &= (logs_df['Tipo de Ação'] == selected_action).to_numpy()
 
-    if len(date_range) == 2:
-        start_date, end_date = date_range
-        start_datetime = datetime.combine(start_date, time.min)
-        end_datetime = datetime.combine(end_date, time.max)
-        filtered_df = filtered_df[
-            (filtered_df['Data e Hora'] >= start_datetime) & 
-            (filtered_df['Data e Hora'] <= end_datetime)
-        ]
+    if start_datetime is not None:
+        mask &= logs_df['Data e Hora'].between(start_datetime, end_datetime).to_numpy()
+
+    filtered_df = logs_df if mask.all() else logs_df[mask]
 
     st.divider()
 
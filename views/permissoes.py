@@ -41,7 +41,8 @@ def show_permissoes_page(conn):
         "page_permissoes": "Gerenciar Permissões",
         "page_gerenciamento": "Gerenciar Usuários",
         "page_logs": "Gerenciar Logs",
-        "page_personalizacao": "Personalizar"
+        "page_personalizacao": "Personalizar",
+        "page_desempenho": "Desempenho"
     }
 
     # Agrupa as permissões por página para exibição
@@ -79,9 +79,7 @@ def show_personalizacao_page(conn):
 
             if success:
                 st.success(message)
-                # Limpa os caches para que a mudança seja refletida em toda a aplicação
-                db.get_all_settings.clear()
-                db.get_setting.clear()
+                # set_multiple_settings já limpa os caches deste processo e avisa os demais
                 st.rerun()
             else:
                 st.error(message)
@@ -11,8 +11,7 @@
 
 import streamlit as st
 import database as db
-from utils.email_utils import enviar_email_senha  # Importa a função de envio de email
-import time
+from utils.email_utils import enfileirar_email_senha  # Enfileira o e-mail para envio em segundo plano
 
 
 def show_reset_page(conn):
@@ -38,14 +37,12 @@ def show_reset_page(conn):
 
                         if success_db:
                             senha_temporaria = senha_ou_erro
-                            email_sent = enviar_email_senha(email_usuario, senha_temporaria)
+                            email_sent = enfileirar_email_senha(conn, email_usuario, senha_temporaria)
 
                             if email_sent:
-                                st.success(
+                                # Volta imediatamente para o login; o aviso é exibido lá
+                                st.session_state['login_notice'] = (
                                     "Sucesso! Uma senha temporária foi enviada para o seu email. Por favor, verifique a sua caixa de entrada (e spam).")
-                                st.info("Você será redirecionado para a tela de login em breve...")
-                                time.sleep(5)
-                                # Volta para o login definindo o estado e recarregando
                                 st.session_state['show_reset_view'] = False
                                 st.rerun()
                             else:
@@ -73,8 +73,15 @@ def show_setores_page(conn):
         search_term = st.text_input("🔎 Buscar setor:")
     
     if search_term:
-        mask = sectors_df.apply(lambda row: any(search_term.lower() in str(cell).lower() for cell in row), axis=1)
-        filtered_df = sectors_df[mask]
+        # Busca no índice de trigramas compartilhado; a ordem segue a relevância
+        ranked_ids = db.search_ids(conn, 'sectors', search_term)
+        if ranked_ids is None:
+            mask = sectors_df.apply(lambda row: any(search_term.lower() in str(cell).lower() for cell in row), axis=1)
+            filtered_df = sectors_df[mask]
+        else:
+            order = {sector_id: position for position, sector_id in enumerate(ranked_ids)}
+            filtered_df = sectors_df[sectors_df['id'].isin(order)].sort_values(
+                'id', key=lambda ids: ids.map(order))
     else:
         filtered_df = sectors_df
 